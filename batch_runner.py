@@ -0,0 +1,281 @@
+"""
+FitTelligence - Batch Pipeline Runner
+
+Runs the full five-agent pipeline over a file of client profiles (JSONL or
+CSV) with bounded concurrency. Each record uses the same keys as
+demo.format_client_message; missing fields fall back to the defaults of the
+interactive intake.
+
+Results are appended to an output JSONL file as each client completes, and the
+ids of completed clients are appended to a checkpoint file next to it, so an
+interrupted run can simply be restarted with the same arguments and will skip
+clients that already finished. Failed clients are retried on restart, so their
+results go to a separate failures file instead (one line per failed attempt,
+stamped with failed_at); the output file holds each client at most once.
+
+Usage:
+    python batch_runner.py clients.jsonl --output results.jsonl --concurrency 4
+    python batch_runner.py checkins.jsonl --output checkins_results.jsonl --replan
+"""
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add current directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from demo import DEFAULT_STAGE_TIMEOUT, run_pipeline
+from shared.agent_registry import PIPELINE_AGENT_NAMES, get_agent_registry
+from shared.replanning import plan_client_id
+from shared.session_manager import create_session_service, get_session_manager, release_session_manager
+
+
+# Defaults mirror collect_client_information() in demo.py
+CLIENT_INFO_DEFAULTS = {
+    'name': 'Client',
+    'age': '30',
+    'weight': '70',
+    'height': '170',
+    'gender': 'Male',
+    'activity_level': 'Moderately Active',
+    'fitness_goals': 'Build muscle, Lose weight/fat',
+    'experience': 'Intermediate (6 months - 2 years)',
+    'equipment': 'Full gym access',
+    'medical_conditions': 'None',
+    'additional_notes': 'None',
+}
+
+DEFAULT_CONCURRENCY = 4
+
+# Agent names double as app names, so no agent has to be loaded to list them
+PIPELINE_APP_NAMES = list(PIPELINE_AGENT_NAMES)
+
+
+def normalize_client_info(record: dict) -> dict:
+    """Fill missing client_info fields with intake defaults and coerce values to strings"""
+    client_info = {}
+    for key, default in CLIENT_INFO_DEFAULTS.items():
+        value = record.get(key)
+        value = str(value).strip() if value is not None else ""
+        client_info[key] = value or default
+    return client_info
+
+
+def client_record_id(record: dict, client_info: dict) -> str:
+    """Use the record's client_id if present, otherwise a hash of its normalized fields"""
+    explicit_id = str(record.get('client_id', '') or '').strip()
+    if explicit_id:
+        return explicit_id
+    canonical = json.dumps(client_info, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+def load_client_records(path: Path) -> list:
+    """
+    Load client records from a JSONL or CSV file.
+
+    Returns:
+        List of (client_id, client_info, plan_id) tuples in file order, where
+        plan_id is the stable identity re-planning looks up (see plan_client_id)
+    """
+    if path.suffix.lower() == '.csv':
+        with open(path, newline='', encoding='utf-8') as f:
+            raw_records = list(csv.DictReader(f))
+    else:
+        with open(path, encoding='utf-8') as f:
+            raw_records = [json.loads(line) for line in f if line.strip()]
+
+    records = []
+    for record in raw_records:
+        client_info = normalize_client_info(record)
+        records.append((client_record_id(record, client_info), client_info, plan_client_id(record)))
+    return records
+
+
+def checkpoint_path_for(output_path: Path) -> Path:
+    return output_path.with_name(output_path.name + '.checkpoint')
+
+
+def failures_path_for(output_path: Path) -> Path:
+    return output_path.with_name(output_path.name + '.failures')
+
+
+def load_checkpoint(checkpoint_path: Path) -> set:
+    """Return the ids of clients that completed in a previous run"""
+    if not checkpoint_path.exists():
+        return set()
+    with open(checkpoint_path, encoding='utf-8') as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+class BatchWriter:
+    """Appends results, failures and checkpoint entries, flushing after every client"""
+
+    def __init__(self, output_path: Path, checkpoint_path: Path, failures_path: Path):
+        self._output = open(output_path, 'a', encoding='utf-8')
+        self._checkpoint = open(checkpoint_path, 'a', encoding='utf-8')
+        self._failures = open(failures_path, 'a', encoding='utf-8')
+
+    @staticmethod
+    def _append(f, line: str):
+        f.write(line + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+    def write(self, result: dict):
+        # Only successful clients are checkpointed. Failed ones are retried on resume,
+        # so they are logged per attempt and never duplicate a client in the output
+        if result['status'] == 'ok':
+            self._append(self._output, json.dumps(result, ensure_ascii=False))
+            self._append(self._checkpoint, result['client_id'])
+        else:
+            failure = dict(result, failed_at=time.strftime('%Y-%m-%dT%H:%M:%S%z'))
+            self._append(self._failures, json.dumps(failure, ensure_ascii=False))
+
+    def close(self):
+        self._output.close()
+        self._checkpoint.close()
+        self._failures.close()
+
+
+async def run_client(client_id: str, client_info: dict, session_service, stage_timeout: float, variant: str = 'full',
+                     plan_id: str = "") -> dict:
+    """Run the pipeline for one client and release its sessions afterwards"""
+    # Memory is scoped by user_id, so use the stable client identity the plan history uses
+    user_id = plan_id or client_id
+    session_id = f"batch_{client_id}"
+    timings = {}
+    stage_status = {}
+    start = time.perf_counter()
+
+    def record_status(stage_result):
+        empty = stage_result.agent_name and stage_result.status == 'ok' and not stage_result.text.strip()
+        stage_status[stage_result.key] = 'empty' if empty else stage_result.status
+
+    try:
+        if variant == 'replan' and not plan_id:
+            raise ValueError("Re-planning needs a client_id or name to find the client's previous run")
+        responses = await run_pipeline(
+            client_info, session_id, user_id, session_service, variant,
+            stage_timeout=stage_timeout, verbose=False, timings_sink=timings,
+            on_stage_done=record_status, client_id=plan_id or None
+        )
+        # The head coach still runs on empty inputs when a team stage failed,
+        # so a client is only done (and checkpointed) if every stage produced output
+        failed = [stage for stage, status in stage_status.items() if status not in ('ok', 'fast_path')]
+        result = {
+            'client_id': client_id,
+            'status': 'error' if failed else 'ok',
+            'client_info': client_info,
+            'responses': responses,
+            'stage_status': stage_status,
+        }
+        if failed:
+            result['error'] = f"Stages failed: {', '.join(failed)}"
+    except Exception as e:
+        result = {
+            'client_id': client_id,
+            'status': 'error',
+            'client_info': client_info,
+            'error': str(e),
+        }
+    finally:
+        manager = get_session_manager(session_service)
+        for app_name in PIPELINE_APP_NAMES:
+            try:
+                await session_service.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+            except Exception:
+                pass
+            manager.forget_session(app_name, user_id, session_id)
+    result['stage_seconds'] = {stage: round(elapsed, 3) for stage, elapsed in timings.items()}
+    result['total_seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+async def run_batch(input_path: Path, output_path: Path, concurrency: int = DEFAULT_CONCURRENCY,
+                    stage_timeout: float = DEFAULT_STAGE_TIMEOUT, variant: str = 'full') -> dict:
+    """
+    Push every pending client record through the pipeline.
+
+    With variant="replan" each client reruns only the stages affected by the
+    fields that changed since its previous run (shared/replanning.py). The
+    previous run is found by the record's client_id, else its name; records
+    with neither fail.
+
+    Returns:
+        Summary counts for the run
+    """
+    records = load_client_records(input_path)
+    checkpoint_path = checkpoint_path_for(output_path)
+    completed = load_checkpoint(checkpoint_path)
+
+    seen = set()
+    pending = []
+    for client_id, client_info, plan_id in records:
+        if client_id in completed or client_id in seen:
+            continue
+        seen.add(client_id)
+        pending.append((client_id, client_info, plan_id))
+
+    print(f"📋 {len(records)} client records, {len(records) - len(pending)} already completed, {len(pending)} to run")
+    print(f"⚙️  Concurrency limit: {concurrency}\n")
+
+    session_service = create_session_service()
+    semaphore = asyncio.Semaphore(concurrency)
+    writer = BatchWriter(output_path, checkpoint_path, failures_path_for(output_path))
+    summary = {'total': len(records), 'skipped': len(records) - len(pending), 'ok': 0, 'error': 0}
+    batch_start = time.perf_counter()
+
+    async def worker(client_id, client_info, plan_id):
+        async with semaphore:
+            result = await run_client(client_id, client_info, session_service, stage_timeout, variant, plan_id)
+        writer.write(result)
+        summary[result['status']] += 1
+        icon = "✅" if result['status'] == 'ok' else "❌"
+        done = summary['ok'] + summary['error']
+        print(f"{icon} [{done}/{len(pending)}] {client_id} ({result['total_seconds']:.1f}s)")
+
+    try:
+        await asyncio.gather(*(worker(*record) for record in pending))
+    finally:
+        writer.close()
+        release_session_manager(session_service)
+
+    elapsed = time.perf_counter() - batch_start
+    summary['elapsed_seconds'] = round(elapsed, 3)
+    print(f"\n🏁 Batch finished in {elapsed:.1f}s: {summary['ok']} ok, {summary['error']} failed, {summary['skipped']} skipped")
+    if summary['error']:
+        print(f"📝 Failed clients logged to {failures_path_for(output_path)}; rerun to retry them")
+    print(get_agent_registry().startup_report())
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the FitTelligence pipeline over a file of client profiles")
+    parser.add_argument('input', type=Path, help="Client records (.jsonl or .csv)")
+    parser.add_argument('--output', '-o', type=Path, default=Path('batch_results.jsonl'),
+                        help="Output JSONL file (appended to; .checkpoint and .failures files are kept next to it)")
+    parser.add_argument('--concurrency', '-c', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Maximum number of clients in flight (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument('--stage-timeout', type=float, default=DEFAULT_STAGE_TIMEOUT,
+                        help=f"Per-stage timeout in seconds (default: {DEFAULT_STAGE_TIMEOUT:.0f})")
+    parser.add_argument('--replan', action='store_true',
+                        help="Rerun only the stages affected by fields changed since each client's previous run")
+    args = parser.parse_args()
+
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    asyncio.run(run_batch(args.input, args.output, args.concurrency, args.stage_timeout,
+                          'replan' if args.replan else 'full'))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+FitTelligence - Pipeline Benchmark
+
+Drives the demo pipeline (sequential and concurrent modes) over N synthetic
+client profiles and reports per-agent and end-to-end p50/p95/p99 latency,
+throughput in clients/minute, peak RSS and event counts.
+
+By default the benchmark runs against the offline fake model backend with the
+response cache disabled, so numbers are reproducible and measure the
+framework overhead of the pipeline itself. Results are written as JSON; pass a
+previous results file with --baseline to print the change per metric.
+
+Usage:
+    python benchmark.py --clients 20 --output bench_results.json
+    python benchmark.py --clients 20 --baseline bench_results.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+DEFAULT_CLIENTS = 10
+MODES = ('sequential', 'parallel')
+
+_ACTIVITY_LEVELS = ["Sedentary", "Lightly Active", "Moderately Active", "Very Active", "Extremely Active"]
+_GOALS = ["Build muscle", "Lose weight/fat", "Improve endurance", "Increase strength", "Improve flexibility", "General fitness"]
+_EXPERIENCE = ["Beginner (0-6 months)", "Intermediate (6 months - 2 years)", "Advanced (2+ years)"]
+_EQUIPMENT = [
+    "Full gym access",
+    "Home gym (weights, bench, etc.)",
+    "Limited equipment (dumbbells, resistance bands)",
+    "Bodyweight only",
+]
+_MEDICAL = ["None", "None", "None", "Lower back pain", "Previous knee injury", "Mild asthma"]
+
+
+def synthetic_clients(count: int, seed: int = 0) -> list:
+    """Generate reproducible client_info dicts covering the intake options"""
+    rng = random.Random(seed)
+    clients = []
+    for i in range(count):
+        clients.append({
+            'name': f"Bench Client {i}",
+            'age': str(rng.randint(18, 65)),
+            'weight': str(rng.randint(50, 110)),
+            'height': str(rng.randint(150, 195)),
+            'gender': rng.choice(["Male", "Female"]),
+            'activity_level': rng.choice(_ACTIVITY_LEVELS),
+            'fitness_goals': ", ".join(rng.sample(_GOALS, rng.randint(1, 3))),
+            'experience': rng.choice(_EXPERIENCE),
+            'equipment': rng.choice(_EQUIPMENT),
+            'medical_conditions': rng.choice(_MEDICAL),
+            'additional_notes': "None",
+        })
+    return clients
+
+
+def percentile(values: list, q: float) -> float:
+    """Linear-interpolated percentile (q in [0, 100]) of a non-empty list"""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def latency_summary(values: list) -> dict:
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'mean': sum(values) / len(values),
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'max': max(values),
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and KiB elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=Path(__file__).parent, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def run_mode(demo, mode: str, clients: list, warmup: int) -> dict:
+    """Run every client through one pipeline mode and summarize the recorded metrics"""
+    # Imported here so the model backend is configured before anything touches google.adk
+    from shared.run_metrics import clear_recorded_runs, recorded_runs
+    from shared.session_manager import create_session_service, release_session_manager
+
+    session_service = create_session_service()
+    end_to_end = []
+    per_agent = {}
+    events = {}
+
+    for index, client_info in enumerate(warmup * clients[:1] + clients):
+        measured = index >= warmup
+        user_id = f"bench_{mode}_{index}"
+        session_id = f"bench_session_{index}"
+        clear_recorded_runs()
+        start = time.perf_counter()
+        # The pipelines print every response; keep the benchmark output readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            if mode == 'sequential':
+                demo.run_sequential_pipeline(client_info, session_id, user_id, session_service)
+            else:
+                asyncio.run(demo.run_parallel_pipeline(client_info, session_id, user_id, session_service, verbose=False))
+        elapsed = time.perf_counter() - start
+        if not measured:
+            continue
+        end_to_end.append(elapsed)
+        for run in recorded_runs():
+            per_agent.setdefault(run.agent_name, []).append(run.total_time)
+            events[run.agent_name] = events.get(run.agent_name, 0) + run.events
+    release_session_manager(session_service)
+
+    wall_clock = sum(end_to_end)
+    return {
+        'clients': len(end_to_end),
+        'end_to_end_s': latency_summary(end_to_end),
+        'per_agent_s': {name: latency_summary(values) for name, values in sorted(per_agent.items())},
+        'throughput_clients_per_min': len(end_to_end) / wall_clock * 60 if wall_clock else 0.0,
+        'events': events,
+        'total_events': sum(events.values()),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def print_mode_report(mode: str, result: dict):
+    e2e = result['end_to_end_s']
+    print(f"\n📊 {mode} ({result['clients']} clients)")
+    print(f"  {'Stage':<22} {'p50':>8} {'p95':>8} {'p99':>8} {'events':>8}")
+    for agent_name, summary in result['per_agent_s'].items():
+        print(f"  {agent_name:<22} {summary['p50']:>7.3f}s {summary['p95']:>7.3f}s {summary['p99']:>7.3f}s "
+              f"{result['events'].get(agent_name, 0):>8}")
+    if e2e['count']:
+        print(f"  {'End to end':<22} {e2e['p50']:>7.3f}s {e2e['p95']:>7.3f}s {e2e['p99']:>7.3f}s {result['total_events']:>8}")
+    print(f"  Throughput: {result['throughput_clients_per_min']:.1f} clients/min, peak RSS: {result['peak_rss_mb']:.1f} MiB")
+
+
+def print_baseline_comparison(results: dict, baseline: dict):
+    """Print the relative change of end-to-end latency and throughput against a previous run"""
+    print(f"\n🔁 Compared with baseline {baseline.get('metadata', {}).get('commit', '?')}:")
+    for mode, result in results['modes'].items():
+        previous = baseline.get('modes', {}).get(mode)
+        if not previous or not result['end_to_end_s']['count'] or not previous['end_to_end_s'].get('count'):
+            continue
+        for metric in ('p50', 'p95', 'p99'):
+            old, new = previous['end_to_end_s'][metric], result['end_to_end_s'][metric]
+            change = (new - old) / old * 100 if old else 0.0
+            print(f"  {mode:<10} end-to-end {metric}: {old:.3f}s → {new:.3f}s ({change:+.1f}%)")
+        old, new = previous['throughput_clients_per_min'], result['throughput_clients_per_min']
+        change = (new - old) / old * 100 if old else 0.0
+        print(f"  {mode:<10} throughput: {old:.1f} → {new:.1f} clients/min ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the FitTelligence pipeline")
+    parser.add_argument('--clients', '-n', type=int, default=DEFAULT_CLIENTS, help=f"Synthetic clients per mode (default: {DEFAULT_CLIENTS})")
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES), help="Pipeline modes to run")
+    parser.add_argument('--warmup', type=int, default=1, help="Unmeasured warm-up clients per mode (default: 1)")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for synthetic profiles and the fake model")
+    parser.add_argument('--backend', choices=('fake', 'gemini'), default='fake', help="Model backend (default: fake)")
+    parser.add_argument('--with-cache', action='store_true', help="Keep the response cache enabled")
+    parser.add_argument('--output', '-o', type=Path, default=Path('bench_results.json'), help="Results JSON file")
+    parser.add_argument('--baseline', type=Path, help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    # Agents resolve their model at import time, so configure the backend before importing demo
+    os.environ['FITTELLIGENCE_MODEL_BACKEND'] = args.backend
+    os.environ.setdefault('FITTELLIGENCE_FAKE_SEED', str(args.seed))
+    if not args.with_cache:
+        os.environ['FITTELLIGENCE_RESPONSE_CACHE'] = 'off'
+        os.environ['FITTELLIGENCE_SEARCH_CACHE'] = 'off'
+    # A fresh memory index per run keeps runs comparable
+    os.environ.setdefault('FITTELLIGENCE_MEMORY_DIR', tempfile.mkdtemp(prefix='fittelligence-bench-memory-'))
+    # Synthetic clients stay out of the re-planning store
+    os.environ.setdefault('FITTELLIGENCE_PLAN_DB', 'off')
+
+    sys.path.insert(0, str(Path(__file__).parent))
+    import_start = time.perf_counter()
+    import demo
+    import_seconds = time.perf_counter() - import_start
+
+    clients = synthetic_clients(args.clients, args.seed)
+    results = {
+        'metadata': {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'backend': args.backend,
+            'response_cache': args.with_cache,
+            'clients': args.clients,
+            'warmup': args.warmup,
+            'seed': args.seed,
+            'fake_settings': {k: v for k, v in os.environ.items() if k.startswith('FITTELLIGENCE_FAKE_')},
+            'import_seconds': import_seconds,
+        },
+        'modes': {},
+    }
+
+    print(f"🏋️ Benchmarking {args.clients} clients per mode on the {args.backend} backend (commit {results['metadata']['commit']})")
+    for mode in args.modes:
+        results['modes'][mode] = run_mode(demo, mode, clients, args.warmup)
+        print_mode_report(mode, results['modes'][mode])
+    # Agents load on first use, so their cold-start cost is only known after the first run
+    from shared.agent_registry import get_agent_registry
+    results['metadata']['agent_load_seconds'] = get_agent_registry().load_times()
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results written to {args.output}")
+
+    if baseline is not None:
+        print_baseline_comparison(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
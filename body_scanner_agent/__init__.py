@@ -1,3 +1,12 @@
-from . import agent
-from .agent import body_scanner_agent, root_agent
+import importlib
 
+# The agent module (and its Agent) is imported on first attribute access, so
+# importing the package stays cheap; see shared/agent_registry.py
+__all__ = ['agent', 'body_scanner_agent', 'root_agent']
+
+
+def __getattr__(name):
+    if name in __all__:
+        module = importlib.import_module('.agent', __name__)
+        return module if name == 'agent' else getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -7,12 +7,17 @@ if str(_parent_dir) not in sys.path:
     sys.path.insert(0, str(_parent_dir))
 
 from google.adk.agents.llm_agent import Agent
-from google.adk.tools import google_search
 from google.adk.tools.preload_memory_tool import PreloadMemoryTool
 
+from shared.history_compaction import compact_history
+from shared.mobility_scoring import score_mobility_tests
+from shared.model_backend import resolve_model
+from shared.tracing import trace_model_end, trace_model_error, trace_model_start, trace_tool_end, trace_tool_error, trace_tool_start
+from shared.web_search import web_search
+
 
 body_scanner_agent = Agent(
-    model='gemini-2.5-flash',  # Using flash model (works with API key)
+    model=resolve_model('gemini-2.5-flash'),  # Using flash model (works with API key)
     name='body_scanner_agent',
     description='A master in kinesiology and performance who analyzes body images, conducts mobility tests, and provides movement assessments.',
     instruction="""You are a master in kinesiology, biomechanics, and performance analysis specializing in body assessment and movement analysis.
@@ -57,13 +62,20 @@ When creating mobility tests:
 - Design tests specific to client's goals and limitations
 - Include tests for major joints and movement patterns
 - Provide clear instructions for test execution
-- Include assessment criteria and scoring
+- Include assessment criteria; measurements are scored by score_mobility_tests, not by you
 - Make recommendations based on results
 
+When the client reports mobility test results:
+- Call score_mobility_tests once with every measurement (one test and side per item) and the client's name as client_id
+- Report its scores, ratings, asymmetries and FMS total instead of judging the numbers yourself
+- For follow-up assessments, use its change since the previous assessment; do not compare from memory
+
 You have access to:
-1. Google Search - For current kinesiology research, assessment protocols, and movement analysis techniques
+1. web_search (Google Search, cached and shared across clients) - For current kinesiology research, assessment protocols, and movement analysis techniques
 2. Memory - To remember client assessments, test results, and progression tracking
 3. Vision capabilities - To analyze body images uploaded by clients
+4. score_mobility_tests - Scores range-of-motion, field test and FMS measurements against normative tables
+   and reports the change since the client's previous assessment (for one or several clients at once)
 
 Your analysis should include:
 - Detailed observations and findings
@@ -75,10 +87,17 @@ Your analysis should include:
 
 Always prioritize safety and provide evidence-based recommendations. Work collaboratively with the head coach to integrate your findings into the overall program.""",
     tools=[
-        google_search,
+        web_search,  # Cached, coalesced Google Search via the search agent
         PreloadMemoryTool(),  # Memory tool to retrieve past interactions
+        score_mobility_tests,  # Normative mobility scoring with per-client history
         # *mcp_toolsets,  # Uncomment to add MCP toolsets (configure MCP server)
     ],
+    before_model_callback=[compact_history, trace_model_start],
+    after_model_callback=trace_model_end,
+    on_model_error_callback=trace_model_error,
+    before_tool_callback=trace_tool_start,
+    after_tool_callback=trace_tool_end,
+    on_tool_error_callback=trace_tool_error,
 )
 
 # Root agent for ADK web interface
@@ -18,9 +18,11 @@ This demo script demonstrates the key ADK concepts for Kaggle submission:
 Run this script to see all agents working together in a sequential flow.
 """
 
+import asyncio
 import os
 import sys
 import time
+from dataclasses import replace
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -30,16 +32,22 @@ load_dotenv(override=True)
 # Add current directory to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from google.adk import Runner
-from google.adk.sessions import InMemorySessionService
-from google.genai.types import Content, Part
+from shared.agent_registry import get_agent, get_agent_registry
+from shared.artifact_store import get_artifact_store
+from shared.client_profile import ClientProfile, register_profile
+from shared.model_backend import is_fake_backend
+from shared.mobility_scoring import mobility_history_line
+from shared.nutrition_calculator import energy_targets_line
+from shared.pipeline import Pipeline, PipelineContext, Stage
+from shared.replanning import get_plan_history, plan_client_id, plan_replan
+from shared.response_cache import cache_key_for_agent, get_response_cache
+from shared.run_metrics import ResponseCollector, format_run_metrics
+from shared.session_manager import create_session_service, get_memory_service, get_session_manager
+from shared.tracing import trace_span
+from shared.web_search import get_search_layer
 
-# Import all agents
-from reception_agent import reception_agent
-from body_scanner_agent import body_scanner_agent
-from pt_agent import pt_agent
-from nutrition_agent import nutrition_agent
-from head_coach_agent import head_coach_agent
+# Default per-stage timeout (seconds) for the concurrent pipeline
+DEFAULT_STAGE_TIMEOUT = 300.0
 
 
 def print_section(title: str):
@@ -49,92 +57,132 @@ def print_section(title: str):
     print("="*70 + "\n")
 
 
-def run_agent_demo(agent, agent_name: str, message: str, session_id: str, user_id: str = "demo_user", session_service=None):
-    """Run an agent and display the response"""
+def extract_event_text(event) -> str:
+    """Extract the text carried by a single runner event"""
+    text = ""
+    if hasattr(event, 'content') and hasattr(event.content, 'parts'):
+        for part in event.content.parts or []:
+            if getattr(part, 'text', None):
+                text += part.text
+    elif hasattr(event, 'text'):
+        text += event.text
+    elif hasattr(event, 'message') and hasattr(event.message, 'parts'):
+        for part in event.message.parts:
+            if getattr(part, 'text', None):
+                text += part.text
+    return text
+
+
+def run_agent_demo(agent, agent_name: str, message: str, session_id: str, user_id: str = "demo_user", session_service=None,
+                   stream: bool = False, metrics_sink: list = None, raise_errors: bool = False):
+    """
+    Run an agent and display the response.
+    
+    With stream=True the agent runs with ADK's SSE streaming run config and
+    partial text is printed as it arrives. Time-to-first-token and tokens per
+    second are recorded either way and appended to metrics_sink if given.
+    
+    A failed run prints the error and returns the partial text, or with
+    raise_errors=True re-raises it (used by the pipeline engine, which
+    retries and reports failed stages).
+    """
     print(f"🤖 {agent_name}")
     print(f"📝 Message: {message}")
     print("\n⏳ Processing...\n")
     
-    # Use provided session service or create a new one
-    if session_service is None:
-        session_service = InMemorySessionService()
+    # Runners and sessions are reused per session service
+    # (a process-wide default service is used when none is provided)
+    manager = get_session_manager(session_service)
     
     # Get the actual agent name from the agent object (e.g., 'reception_agent')
     actual_app_name = getattr(agent, 'name', agent_name)
     
-    # Ensure session exists - create if it doesn't exist
-    # ADK sessions use (user_id, session_id, app_name) as a composite key
-    session_created = False
-    try:
-        existing_session = session_service.get_session_sync(
-            user_id=user_id, 
-            session_id=session_id, 
-            app_name=actual_app_name
-        )
-        print(f"✓ Using existing session: {existing_session.id}")
-    except Exception:
-        # Session doesn't exist, create it
+    # Model and tool callbacks run on the Runner's thread and find this span through the session
+    attributes = {'gen_ai.agent.name': actual_app_name, 'prompt.chars': len(message), 'cache.hit': False}
+    with trace_span(f"agent {actual_app_name}", 'agent', attributes, session=(actual_app_name, user_id, session_id)) as span:
+        # Identical prompts to the same agent/model/instruction are served from the response cache
+        cache = get_response_cache()
+        cache_key = cache_key_for_agent(agent, message) if cache is not None else None
+        if cache is not None:
+            cached_text = cache.get(cache_key)
+            if cached_text is not None:
+                print(f"⚡ Served from response cache\n✅ Response:\n{cached_text}\n")
+                if span is not None:
+                    span.attributes.update({'cache.hit': True, 'response.chars': len(cached_text)})
+                return cached_text
+
+        # Ensure session exists - get or create, scoped by (app_name, user_id, session_id)
         try:
-            new_session = session_service.create_session_sync(
-                user_id=user_id, 
-                session_id=session_id, 
-                app_name=actual_app_name
-            )
-            print(f"✓ Created new session: {new_session.id} for app: {actual_app_name}")
-            session_created = True
-            
-            # Verify it was created - add small delay to ensure session is committed
-            time.sleep(0.1)
-            verify_session = session_service.get_session_sync(
-                user_id=user_id, 
-                session_id=session_id, 
-                app_name=actual_app_name
-            )
-            if verify_session:
-                print(f"✓ Session verified after creation: {verify_session.id}")
+            if manager.ensure_session(actual_app_name, user_id, session_id):
+                print(f"✓ Created new session: {session_id} for app: {actual_app_name}")
             else:
-                raise Exception("Session verification failed - session was not found after creation")
+                print(f"✓ Using existing session: {session_id}")
         except Exception as create_error:
             print(f"❌ Failed to create session: {create_error}")
             raise
-    
-    # Create runner (requires both app_name and agent, or just app)
-    runner = Runner(
-        agent=agent,
-        app_name=actual_app_name,
-        session_service=session_service
-    )
-    
-    # Create Content object from message string
-    content = Content(parts=[Part(text=message)], role="user")
-    
-    # Run the agent (pass user_id, session_id, and Content to run() method)
-    response_text = ""
-    try:
-        for event in runner.run(user_id=user_id, session_id=session_id, new_message=content):
-            # Extract text from event
-            if hasattr(event, 'content') and hasattr(event.content, 'parts'):
-                for part in event.content.parts:
-                    if hasattr(part, 'text'):
-                        response_text += part.text
-            elif hasattr(event, 'text'):
-                response_text += event.text
-            elif hasattr(event, 'message') and hasattr(event.message, 'parts'):
-                for part in event.message.parts:
-                    if hasattr(part, 'text'):
-                        response_text += part.text
-        
-        if response_text:
-            print(f"✅ Response:\n{response_text}\n")
-        else:
-            print("⚠️  No text response received. Check API credentials.\n")
-            
-    except Exception as e:
-        print(f"❌ Error: {str(e)}\n")
-        import traceback
-        traceback.print_exc()
-    
-    return response_text
+
+        with trace_span("runner setup"):
+            runner = manager.get_runner(agent)
+
+        from google.adk.agents.run_config import RunConfig, StreamingMode
+        from google.genai.types import Content, Part
+
+        # Create Content object from message string
+        content = Content(parts=[Part(text=message)], role="user")
+
+        def print_chunk(text):
+            if collector.metrics.chunks == 1:
+                print("✅ Response:")
+            print(text, end="", flush=True)
+
+        collector = ResponseCollector(actual_app_name, on_chunk=print_chunk if stream else None, text_of=extract_event_text)
+        run_config = RunConfig(streaming_mode=StreamingMode.SSE if stream else StreamingMode.NONE)
+
+        # Run the agent (pass user_id, session_id, and Content to run() method)
+        response_text = ""
+        succeeded = False
+        error = None
+        turn_started = time.time()
+        try:
+            for event in runner.run(user_id=user_id, session_id=session_id, new_message=content, run_config=run_config):
+                collector.add(event)
+            response_text = collector.text()
+            succeeded = True
+            # Index this turn so PreloadMemoryTool can recall it in later sessions
+            manager.remember_session(actual_app_name, user_id, session_id, since=turn_started)
+
+            if stream and response_text:
+                print("\n")
+            elif response_text:
+                print(f"✅ Response:\n{response_text}\n")
+            else:
+                print("⚠️  No text response received. Check API credentials.\n")
+
+        except Exception as e:
+            error = e
+            response_text = collector.text()
+            if span is not None:
+                span.set_error(f"{type(e).__name__}: {e}")
+            print(f"❌ Error: {str(e)}\n")
+            if not raise_errors:
+                import traceback
+                traceback.print_exc()
+
+        metrics = collector.finish()
+        if metrics_sink is not None:
+            metrics_sink.append(metrics)
+        if span is not None:
+            span.attributes['response.chars'] = len(response_text)
+        # Partial text from a failed run is never cached
+        if cache is not None and succeeded and response_text:
+            cache.put(cache_key, actual_app_name, response_text)
+        if metrics.time_to_first_token is not None:
+            rate = f", {metrics.tokens_per_second:.1f} tok/s" if metrics.tokens_per_second else ""
+            print(f"⏱️  First token after {metrics.time_to_first_token:.2f}s, done after {metrics.total_time:.2f}s{rate}\n")
+
+        if error is not None and raise_errors:
+            raise error
+        return response_text
 
 
 def collect_client_information():
@@ -266,6 +314,355 @@ Please help me create a personalized fitness and nutrition program."""
     return message
 
 
+def build_client_profile(client_info, reception_response: str = ""):
+    """
+    Parse client information into a registered ClientProfile.
+    
+    Returns:
+        Tuple of (profile, profile_id)
+    """
+    profile = ClientProfile.from_client_info(client_info)
+    if reception_response:
+        profile = profile.with_reception_digest(reception_response)
+    return profile, register_profile(profile)
+
+
+def remember_client_profile(user_id: str, profile):
+    """Store the compact client profile as a memory so later sessions can recall it"""
+    memory = get_memory_service()
+    if memory is not None:
+        memory.add_text('fittelligence', user_id, profile.to_compact(), author='client_profile')
+
+
+def build_body_scanner_message(profile):
+    """Build the body scanner prompt from the client profile and any mobility results on record"""
+    history = mobility_history_line(profile.name)
+    history_section = f"\n{history}" if history else ""
+    return f"""Provide a body analysis and movement assessment for this client.
+
+{profile.to_compact()}{history_section}
+
+Please provide:
+1. Postural assessment recommendations
+2. Mobility test suggestions
+3. Movement pattern analysis
+4. Areas of focus for their goals
+5. Any movement restrictions or considerations based on their profile"""
+
+
+def build_pt_message(profile):
+    """Build the PT agent prompt from the client profile"""
+    return f"""Create a personalized training plan for this client.
+
+{profile.to_compact()}
+
+Please create a comprehensive 4-week training program including:
+1. Weekly workout schedule
+2. Specific exercises with sets, reps, and rest periods
+3. Progression plan
+4. Form cues and safety considerations
+5. Modifications based on equipment availability and experience level"""
+
+
+def build_nutrition_message(profile):
+    """Build the nutrition agent prompt from the client profile and its precomputed energy targets"""
+    return f"""Create a personalized nutrition plan for this client.
+
+{profile.to_compact()}
+{energy_targets_line(profile)}
+
+Please create a comprehensive nutrition plan including:
+1. Daily calorie and macronutrient targets (use the energy targets above)
+2. Meal plan with specific foods
+3. Pre and post-workout nutrition
+4. Meal timing recommendations
+5. Supplement suggestions if appropriate
+6. Consider any dietary restrictions or preferences mentioned"""
+
+
+def build_head_coach_message(profile, profile_id: str, artifact_digests: str = ""):
+    """Build the head coach prompt from the client profile and digests of the team's outputs"""
+    artifacts_section = ""
+    if artifact_digests:
+        artifacts_section = f"""
+
+Team outputs from this session (digests; a team tool called with only client_profile_id returns the full text without running the agent again):
+{artifact_digests}"""
+    return f"""Based on all the information collected from the team, create a comprehensive integrated fitness and nutrition program.
+
+Client profile (id {profile_id}; pass it as client_profile_id when calling team tools):
+{profile.to_compact()}{artifacts_section}
+
+Please create a final integrated program that:
+1. Combines the training and nutrition plans from previous agents
+2. Ensures they work together harmoniously
+3. Addresses the client's specific goals
+4. Includes weekly schedule
+5. Provides progression guidelines
+6. Includes safety considerations based on their medical conditions and limitations
+7. Takes into account their equipment availability"""
+
+
+async def run_agent_async(agent, agent_name: str, message: str, session_id: str, user_id: str = "demo_user", session_service=None,
+                          stream: bool = False, metrics_sink: list = None):
+    """Run an agent with Runner.run_async and return its response text without printing"""
+    actual_app_name = getattr(agent, 'name', agent_name)
+    attributes = {'gen_ai.agent.name': actual_app_name, 'prompt.chars': len(message), 'cache.hit': False}
+    with trace_span(f"agent {actual_app_name}", 'agent', attributes, session=(actual_app_name, user_id, session_id)) as span:
+        cache = get_response_cache()
+        cache_key = cache_key_for_agent(agent, message) if cache is not None else None
+        if cache is not None:
+            cached_text = cache.get(cache_key)
+            if cached_text is not None:
+                if span is not None:
+                    span.attributes.update({'cache.hit': True, 'response.chars': len(cached_text)})
+                return cached_text
+
+        with trace_span("runner setup"):
+            manager = get_session_manager(session_service)
+            await manager.ensure_session_async(actual_app_name, user_id, session_id)
+            runner = manager.get_runner(agent)
+
+        from google.adk.agents.run_config import RunConfig, StreamingMode
+        from google.genai.types import Content, Part
+
+        content = Content(parts=[Part(text=message)], role="user")
+        collector = ResponseCollector(actual_app_name, text_of=extract_event_text)
+        run_config = RunConfig(streaming_mode=StreamingMode.SSE if stream else StreamingMode.NONE)
+
+        turn_started = time.time()
+        try:
+            async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=content, run_config=run_config):
+                collector.add(event)
+        finally:
+            metrics = collector.finish()
+            if metrics_sink is not None:
+                metrics_sink.append(metrics)
+
+        await manager.remember_session_async(actual_app_name, user_id, session_id, since=turn_started)
+        response_text = collector.text()
+        if span is not None:
+            span.attributes['response.chars'] = len(response_text)
+        if cache is not None and response_text:
+            cache.put(cache_key, actual_app_name, response_text)
+        return response_text
+
+
+# Pipeline variants understood by build_pipeline
+PIPELINE_VARIANTS = ('full', 'intake', 'replan', 'nutrition')
+
+# Stage outputs the head coach's team tools can return from the artifact store
+TEAM_STAGES = ('reception', 'body_scanner', 'pt', 'nutrition')
+
+
+def _stored_output(text: str):
+    """Fast path returning an output stored by an earlier run"""
+    return lambda context: text
+
+
+def _build_profile_stage(context):
+    """Fast-path stage: parse the intake (plus any reception digest) into the shared client profile"""
+    profile, profile_id = build_client_profile(context.client_info, context.responses.get('reception', ""))
+    remember_client_profile(context.user_id, profile)
+    get_artifact_store().link_profile(profile_id, context.user_id, context.session_id)
+    context.state['profile'], context.state['profile_id'] = profile, profile_id
+    return profile_id
+
+
+def _head_coach_prompt(context):
+    digests = get_artifact_store().digest_section(context.user_id, context.session_id, TEAM_STAGES)
+    return build_head_coach_message(context.state['profile'], context.state['profile_id'], digests)
+
+
+PIPELINE_STAGES = {
+    'reception': Stage(
+        'reception', "Reception Agent", 'reception_agent',
+        prompt=lambda context: format_client_message(context.client_info),
+        description="Collecting Client Information",
+    ),
+    'profile': Stage(
+        'profile', "Client Profile", fast_path=_build_profile_stage, depends_on=('reception',),
+        description="Building the shared client profile",
+    ),
+    'body_scanner': Stage(
+        'body_scanner', "Body Scanner Agent", 'body_scanner_agent',
+        prompt=lambda context: build_body_scanner_message(context.state['profile']),
+        depends_on=('profile',), description="Body Analysis",
+    ),
+    'pt': Stage(
+        'pt', "PT Agent", 'pt_agent',
+        prompt=lambda context: build_pt_message(context.state['profile']),
+        depends_on=('profile',), description="Creating Training Plan",
+    ),
+    'nutrition': Stage(
+        'nutrition', "Nutrition Agent", 'nutrition_agent',
+        prompt=lambda context: build_nutrition_message(context.state['profile']),
+        depends_on=('profile',), description="Creating Nutrition Plan",
+    ),
+    'head_coach': Stage(
+        'head_coach', "Head Coach Agent", 'head_coach_agent',
+        prompt=_head_coach_prompt, depends_on=('body_scanner', 'pt', 'nutrition'),
+        description="Integrated Program",
+    ),
+}
+
+
+def build_pipeline(variant: str = 'full', reuse: dict = None) -> Pipeline:
+    """
+    Build one of the pipeline variants from the stage declarations.
+    
+    - full: all five agents; Body Scanner, PT and Nutrition run concurrently
+    - intake: Reception and the client profile only
+    - replan: all stages, but those in reuse (stage -> output stored by an
+      earlier run, see shared/replanning.py) return that output without the model
+    - nutrition: a nutrition plan from the intake alone, without Reception
+    
+    Raises:
+        ValueError: If the variant is unknown
+    """
+    stages = PIPELINE_STAGES
+    if variant == 'full':
+        selected = list(stages.values())
+    elif variant == 'intake':
+        selected = [stages['reception'], stages['profile']]
+    elif variant == 'replan':
+        reuse = reuse or {}
+        selected = [
+            replace(stage, fast_path=_stored_output(reuse[key])) if key in reuse else stage
+            for key, stage in stages.items()
+        ]
+    elif variant == 'nutrition':
+        selected = [replace(stages['profile'], depends_on=()), stages['nutrition']]
+    else:
+        raise ValueError(f"Unknown pipeline variant: {variant} (choose from {', '.join(PIPELINE_VARIANTS)})")
+    return Pipeline(variant, selected)
+
+
+def print_stage_timings(run, agent_metrics: list = None):
+    """Print the per-stage timing breakdown alongside the pipeline wall-clock time"""
+    print_section("Pipeline Timings")
+    if agent_metrics:
+        print(format_run_metrics(agent_metrics) + "\n")
+    print(run.breakdown() + "\n")
+    cache = get_response_cache()
+    if cache is not None:
+        print(f"  Response cache: {cache.stats['hits']} hits, {cache.stats['misses']} misses ({cache.hit_rate():.0%} hit rate)\n")
+    search = get_search_layer()
+    if search.stats['searches']:
+        print(f"  {search.summary()}\n")
+    artifacts = get_artifact_store()
+    if artifacts.stats['stored']:
+        print(f"  {artifacts.summary()}\n")
+    stage_total = sum(run.timings.values())
+    print(f"  {'-'*31}")
+    print(f"  {'Sum of stages':<22} {stage_total:8.2f}s")
+    print(f"  {'Wall clock':<22} {run.wall_clock:8.2f}s")
+    if run.wall_clock > 0:
+        print(f"  {'Speedup':<22} {stage_total / run.wall_clock:8.2f}x\n")
+
+
+async def run_pipeline(client_info, session_id: str, user_id: str, session_service, variant: str = 'full',
+                       concurrent: bool = True, stage_timeout: float = DEFAULT_STAGE_TIMEOUT, verbose: bool = True,
+                       stream: bool = True, timings_sink: dict = None, on_stage_start=None, on_stage_done=None,
+                       client_id: str = None):
+    """
+    Run a pipeline variant through the stage engine (shared/pipeline.py).
+    
+    Concurrently, every stage starts as soon as the stages it depends on have
+    finished, runs without printing and gets stage_timeout per attempt. With
+    concurrent=False the stages run one at a time in dependency order through
+    run_agent_demo, which prints each prompt and (streamed) response.
+    
+    Every finished agent stage is recorded in the session's artifact store,
+    and freshly computed outputs in the per-client plan history that the
+    replan variant reuses from.
+    
+    With verbose=False nothing but stage failures is printed (used by batch
+    runs). Per-stage timings are copied into timings_sink if given, and
+    on_stage_start(stage) / on_stage_done(StageResult) report progress (used
+    by service.py). client_id keys the plan history and must stay the same
+    across a client's runs (default: user_id; see replanning.plan_client_id).
+    
+    Returns:
+        Dictionary of stage responses keyed by stage
+    """
+    plan_history = get_plan_history()
+    plan_id = client_id or user_id
+    if variant == 'replan':
+        # Diff the intake against each stage's stored snapshot and rerun only what it affects
+        decision = plan_replan(plan_id, client_info, build_pipeline('full'), plan_history)
+        if verbose:
+            print(f"🔁 {decision.describe()}")
+        pipeline = build_pipeline(variant, decision.reused)
+    else:
+        pipeline = build_pipeline(variant)
+    context = PipelineContext(client_info, user_id, session_id, session_service)
+    agent_metrics = []
+    store = get_artifact_store()
+    
+    async def execute(stage, prompt, context):
+        if not concurrent:
+            print_section(f"{stage.title} - {stage.description}")
+            return await asyncio.to_thread(
+                run_agent_demo, get_agent(stage.agent_name), stage.title, prompt, session_id, user_id,
+                session_service=session_service, stream=stream, metrics_sink=agent_metrics, raise_errors=True
+            )
+        return await run_agent_async(get_agent(stage.agent_name), stage.title, prompt, session_id, user_id,
+                                     session_service, stream=True, metrics_sink=agent_metrics)
+    
+    def record_stage(result, context):
+        if result.agent_name:
+            store.put(user_id, session_id, result.key, result.text, result.agent_name)
+            if verbose and concurrent:
+                print(f"🤖 {result.title} ({result.elapsed:.2f}s)\n✅ Response:\n{result.text}\n")
+        if on_stage_done is not None:
+            on_stage_done(result)
+    
+    if verbose:
+        print_section(f"Pipeline '{pipeline.name}': {pipeline.describe()}")
+    run = await pipeline.run(
+        context, execute,
+        timeout=stage_timeout if concurrent else None,
+        max_concurrency=None if concurrent else 1,
+        on_stage_start=(lambda stage, context: on_stage_start(stage)) if on_stage_start is not None else None,
+        on_stage_done=record_stage,
+        verbose=verbose and concurrent,
+    )
+    if plan_history is not None:
+        # Only freshly computed outputs get the new intake as their snapshot
+        plan_history.save(plan_id, client_info, {
+            key: result.text for key, result in run.results.items() if result.agent_name and result.status == 'ok'
+        })
+    if timings_sink is not None:
+        timings_sink.update(run.timings)
+    if verbose:
+        print_stage_timings(run, agent_metrics)
+    return run.responses
+
+
+def run_sequential_pipeline(client_info, session_id: str, user_id: str, session_service, stream: bool = True,
+                            variant: str = 'full'):
+    """Run a pipeline variant strictly one stage after another, printing each response"""
+    return asyncio.run(run_pipeline(client_info, session_id, user_id, session_service, variant,
+                                    concurrent=False, stream=stream))
+
+
+async def run_parallel_pipeline(client_info, session_id: str, user_id: str, session_service, stage_timeout: float = DEFAULT_STAGE_TIMEOUT,
+                                verbose: bool = True, timings_sink: dict = None, variant: str = 'full', client_id: str = None):
+    """
+    Run a pipeline variant with independent stages fanned out concurrently.
+    
+    In the full pipeline the Body Scanner, PT and Nutrition prompts are built
+    only from the client profile, so those three stages run concurrently once
+    Reception has finished and are joined before the Head Coach stage.
+    
+    Returns:
+        Dictionary of stage responses keyed by stage
+    """
+    return await run_pipeline(client_info, session_id, user_id, session_service, variant,
+                              stage_timeout=stage_timeout, verbose=verbose, timings_sink=timings_sink, client_id=client_id)
+
+
 def main():
     """Main demo function demonstrating sequential multi-agent workflow"""
     
@@ -297,7 +694,9 @@ All agents work together in a sequential pattern:
     
     # Check API key
     api_key = os.getenv('GOOGLE_API_KEY')
-    if not api_key or api_key in ['your-api-key-here', 'your-api-key', '']:
+    if is_fake_backend():
+        print("🧪 Using the offline fake model backend (FITTELLIGENCE_MODEL_BACKEND=fake)\n")
+    elif not api_key or api_key in ['your-api-key-here', 'your-api-key', '']:
         print("⚠️  WARNING: GOOGLE_API_KEY not set!")
         print("   Set it with: export GOOGLE_API_KEY='your-api-key'")
         print("   Or add it to a .env file")
@@ -329,147 +728,31 @@ All agents work together in a sequential pattern:
     else:
         client_info = collect_client_information()
     
-    # Format the message for reception agent
-    reception_message = format_client_message(client_info)
+    # Memory and plan history are scoped by a stable client id; without one the name is
+    # the identity, so clients who share a name would share memories
+    client_id = input("Client ID (optional, keeps clients who share a name apart): ").strip()
     
     # Use consistent user_id and session_id for all agents
-    user_id = client_info.get('name', 'demo_user').lower().replace(' ', '_')
+    user_id = plan_client_id({'client_id': client_id, 'name': client_info.get('name')}) or 'demo_user'
     session_id = f"session_{int(time.time())}"
     
     # Create a single shared session service for all agents
-    session_service = InMemorySessionService()
-    print("\n✓ Created shared session service for all agents\n")
+    # (in memory, or the SQLite database named by FITTELLIGENCE_SESSION_DB)
+    session_service = create_session_service()
+    print(f"\n✓ Created shared {type(session_service).__name__} for all agents\n")
     
     # Note: Each agent will create its own session based on its app_name
     # They can share the same session_id, but sessions are scoped by (user_id, session_id, app_name)
     
-    # Step 1: Reception Agent
-    print_section("Step 1: Reception Agent - Collecting Client Information")
-    
-    reception_response = run_agent_demo(
-        reception_agent,
-        "Reception Agent",
-        reception_message,
-        session_id,
-        user_id,
-        session_service=session_service
-    )
-    
-    # Step 2: Body Scanner Agent (with context from reception)
-    print_section("Step 2: Body Scanner Agent - Body Analysis")
-    body_scanner_message = f"""Based on the client information collected, provide a body analysis and movement assessment. 
-
-The client is:
-- {client_info['age']} years old {client_info['gender']}
-- {client_info['weight']} kg, {client_info['height']} cm
-- {client_info['activity_level']} activity level
-- Goals: {client_info['fitness_goals']}
-- Experience: {client_info['experience']}
-- Equipment: {client_info['equipment']}
-- Medical/Limitations: {client_info['medical_conditions']}
-
-Please provide:
-1. Postural assessment recommendations
-2. Mobility test suggestions
-3. Movement pattern analysis
-4. Areas of focus for their goals
-5. Any movement restrictions or considerations based on their profile"""
-    
-    body_scanner_response = run_agent_demo(
-        body_scanner_agent,
-        "Body Scanner Agent",
-        body_scanner_message,
-        session_id,
-        user_id,
-        session_service=session_service
-    )
-    
-    # Step 3: PT Agent (with context from previous agents)
-    print_section("Step 3: PT Agent - Creating Training Plan")
-    pt_message = f"""Create a personalized training plan for this client:
-
-Client Profile:
-- {client_info['age']} years old {client_info['gender']}, {client_info['weight']} kg, {client_info['height']} cm
-- {client_info['activity_level']} activity level
-- Goals: {client_info['fitness_goals']}
-- Experience: {client_info['experience']}
-- Equipment: {client_info['equipment']}
-- Medical/Limitations: {client_info['medical_conditions']}
-
-Please create a comprehensive 4-week training program including:
-1. Weekly workout schedule
-2. Specific exercises with sets, reps, and rest periods
-3. Progression plan
-4. Form cues and safety considerations
-5. Modifications based on equipment availability and experience level"""
-    
-    pt_response = run_agent_demo(
-        pt_agent,
-        "PT Agent",
-        pt_message,
-        session_id,
-        user_id,
-        session_service=session_service
-    )
-    
-    # Step 4: Nutrition Agent (with context from all previous agents)
-    print_section("Step 4: Nutrition Agent - Creating Nutrition Plan")
-    nutrition_message = f"""Create a personalized nutrition plan for this client:
-
-Client Profile:
-- {client_info['age']} years old {client_info['gender']}, {client_info['weight']} kg, {client_info['height']} cm
-- {client_info['activity_level']} activity level
-- Goals: {client_info['fitness_goals']}
-- Training: Based on {client_info['activity_level']} activity level
-- Medical/Dietary: {client_info['medical_conditions']}
-- Additional Notes: {client_info['additional_notes']}
-
-Please create a comprehensive nutrition plan including:
-1. Daily calorie and macronutrient targets
-2. Meal plan with specific foods
-3. Pre and post-workout nutrition
-4. Meal timing recommendations
-5. Supplement suggestions if appropriate
-6. Consider any dietary restrictions or preferences mentioned"""
-    
-    nutrition_response = run_agent_demo(
-        nutrition_agent,
-        "Nutrition Agent",
-        nutrition_message,
-        session_id,
-        user_id,
-        session_service=session_service
-    )
-    
-    # Step 5: Head Coach Agent (integrates everything)
-    print_section("Step 5: Head Coach Agent - Integrated Program")
-    head_coach_message = f"""Based on all the information collected from the team, create a comprehensive integrated fitness and nutrition program:
-
-Client Information:
-- {client_info['name']}: {client_info['age']} years old {client_info['gender']}, {client_info['weight']} kg, {client_info['height']} cm
-- Goals: {client_info['fitness_goals']}
-- Experience: {client_info['experience']}
-- Activity Level: {client_info['activity_level']}
-- Equipment: {client_info['equipment']}
-- Medical/Limitations: {client_info['medical_conditions']}
-
-Please create a final integrated program that:
-1. Combines the training and nutrition plans from previous agents
-2. Ensures they work together harmoniously
-3. Addresses the client's specific goals: {client_info['fitness_goals']}
-4. Includes weekly schedule
-5. Provides progression guidelines
-6. Includes safety considerations based on: {client_info['medical_conditions']}
-7. Takes into account equipment availability: {client_info['equipment']}"""
-    
-    head_coach_response = run_agent_demo(
-        head_coach_agent,
-        "Head Coach Agent",
-        head_coach_message,
-        session_id,
-        user_id,
-        session_service=session_service
-    )
+    # Pipeline variant: full (default), intake, replan or nutrition
+    variant = os.getenv('FITTELLIGENCE_PIPELINE', 'full').strip().lower() or 'full'
+    use_parallel = input("Run independent agents concurrently? (y/n, default: y): ").strip().lower()
+    if use_parallel == 'n':
+        run_sequential_pipeline(client_info, session_id, user_id, session_service, variant=variant)
+    else:
+        stage_timeout = float(os.getenv('FITTELLIGENCE_STAGE_TIMEOUT', DEFAULT_STAGE_TIMEOUT))
+        asyncio.run(run_parallel_pipeline(client_info, session_id, user_id, session_service, stage_timeout, variant=variant))
+    print(f"\n{get_agent_registry().startup_report()}")
     
     # Summary
     print_section("Demo Complete!")
@@ -7,15 +7,20 @@ if str(_parent_dir) not in sys.path:
     sys.path.insert(0, str(_parent_dir))
 
 from google.adk.agents.llm_agent import Agent
-from google.adk.tools import google_search
 from google.adk.tools.preload_memory_tool import PreloadMemoryTool
 
+from shared.history_compaction import compact_history
+from shared.model_backend import resolve_model
+from shared.tracing import trace_model_end, trace_model_error, trace_model_start, trace_tool_end, trace_tool_error, trace_tool_start
+from shared.web_search import web_search
+
 # Import agent communication tools
+# The async variants reuse pooled Runners and run on the head coach's event loop
 from shared.agent_communication import (
-    get_training_plan_from_pt_agent,
-    get_nutrition_plan_from_nutrition_agent,
-    get_client_information_from_reception,
-    get_body_analysis_from_scanner,
+    get_training_plan_from_pt_agent_async,
+    get_nutrition_plan_from_nutrition_agent_async,
+    get_client_information_from_reception_async,
+    get_body_analysis_from_scanner_async,
 )
 
 # To add MCP toolsets (e.g., calculator, filesystem, database), configure MCP server:
@@ -24,26 +29,26 @@ from shared.agent_communication import (
 
 
 head_coach_agent = Agent(
-    model='gemini-2.5-flash',
+    model=resolve_model('gemini-2.5-flash'),
     name='head_coach_agent',
     description='A master coach coordinating fitness and nutrition plans for comprehensive health goals.',
     instruction="""You are a master coach coordinating comprehensive fitness and nutrition programs. You are the main coordinator that works with a team of specialized agents.
 
 You have access to:
-1. Reception Agent (get_client_information tool) - For gathering comprehensive client information
-2. Body Scanner Agent (get_body_analysis tool) - For body image analysis, mobility testing, and kinesiology assessments
-3. PT Agent (get_training_plan tool) - For creating personalized workout/training plans
-4. Nutrition Agent (get_nutrition_plan tool) - For creating personalized meal/diet plans
-5. Google Search - For finding current information
+1. Reception Agent (get_client_information_from_reception_async tool) - For gathering comprehensive client information
+2. Body Scanner Agent (get_body_analysis_from_scanner_async tool) - For body image analysis, mobility testing, and kinesiology assessments
+3. PT Agent (get_training_plan_from_pt_agent_async tool) - For creating personalized workout/training plans
+4. Nutrition Agent (get_nutrition_plan_from_nutrition_agent_async tool) - For creating personalized meal/diet plans
+5. web_search (Google Search, cached and shared across clients) - For finding current information
 6. Memory - To remember past interactions, client profiles, and preferences
 
 Your workflow should be:
 1. **Initial Client Intake:**
-   - Use get_client_information to have the reception agent gather all client details
+   - Use get_client_information_from_reception_async to have the reception agent gather all client details
    - Collect: health history, fitness background, nutrition preferences, goals, lifestyle factors
 
 2. **Body Assessment:**
-   - Use get_body_analysis to have the body scanner agent:
+   - Use get_body_analysis_from_scanner_async to have the body scanner agent:
      - Analyze body images (if provided) for postural assessment
      - Conduct mobility tests and movement analysis
      - Provide kinesiology-based recommendations
@@ -51,8 +56,8 @@ Your workflow should be:
 
 3. **Program Creation:**
    - Based on client information and body analysis, create comprehensive plans:
-     - Call PT Agent for personalized training plan
-     - Call Nutrition Agent for personalized nutrition plan
+     - Call get_training_plan_from_pt_agent_async for a personalized training plan
+     - Call get_nutrition_plan_from_nutrition_agent_async for a personalized nutrition plan
    - Ensure plans address any restrictions or imbalances identified
 
 4. **Integration & Coordination:**
@@ -69,17 +74,28 @@ Your workflow should be:
    - Track progress and adjust plans as needed
    - Coordinate follow-up assessments with body scanner agent
 
+**Team results already produced:**
+   - When the prompt lists team outputs from this session, call the team tool with only client_profile_id to get that stored text without running the agent again
+   - Pass goals, preferences or other requirements only when they differ from the client profile (e.g., a deload week, a new injury); such a request runs the agent again
+   - Call a team tool with refresh=True only to rerun an identical request
+
 Always prioritize safety and ensure all plans are appropriate for the client's specific situation. 
 Coordinate with all agents to provide the best possible integrated fitness and nutrition solution.""",
     tools=[
-        google_search,
+        web_search,  # Cached, coalesced Google Search via the search agent
         PreloadMemoryTool(),  # Memory tool to retrieve past interactions
-        get_client_information_from_reception,  # Tool to call Reception agent
-        get_body_analysis_from_scanner,         # Tool to call Body Scanner agent
-        get_training_plan_from_pt_agent,        # Tool to call PT agent
-        get_nutrition_plan_from_nutrition_agent, # Tool to call Nutrition agent
+        get_client_information_from_reception_async,  # Tool to call Reception agent
+        get_body_analysis_from_scanner_async,         # Tool to call Body Scanner agent
+        get_training_plan_from_pt_agent_async,        # Tool to call PT agent
+        get_nutrition_plan_from_nutrition_agent_async, # Tool to call Nutrition agent
         # *mcp_toolsets,  # Uncomment to add MCP toolsets (see shared/mcp_config.py)
     ],
+    before_model_callback=[compact_history, trace_model_start],
+    after_model_callback=trace_model_end,
+    on_model_error_callback=trace_model_error,
+    before_tool_callback=trace_tool_start,
+    after_tool_callback=trace_tool_end,
+    on_tool_error_callback=trace_tool_error,
 )
 
 # Root agent for ADK web interface
@@ -0,0 +1,237 @@
+"""
+FitTelligence - Service Load Test
+
+Submits synthetic client intakes to service.py from many concurrent clients,
+follows each job's server-sent events to completion and reports admission
+latency, 429 rejections, time to the first stage event, end-to-end latency
+percentiles and throughput.
+
+With --spawn the service is started as a subprocess on the offline fake model
+backend (response and search caches off, re-planning store and mobility
+history off, memory index in a temporary directory), so the test runs locally
+and measures the service and pipeline overhead rather than the model.
+
+Usage:
+    python load_test.py --spawn --clients 200 --concurrency 50 --workers 8 --queue-size 32
+    python load_test.py --url http://127.0.0.1:8080 --clients 50 --output load_results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from benchmark import latency_summary, synthetic_clients
+
+
+DEFAULT_URL = 'http://127.0.0.1:8080'
+DEFAULT_CLIENTS = 100
+DEFAULT_CONCURRENCY = 20
+
+# Times a client resubmits after a 429 before giving up
+MAX_SUBMIT_ATTEMPTS = 20
+
+
+async def http_request(host: str, port: int, method: str, path: str, payload: dict = None) -> tuple:
+    """Send one request and return (status, headers, parsed JSON body)"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b""
+        writer.write((f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                      f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode('latin-1') + body)
+        await writer.drain()
+        status, headers = await _read_head(reader)
+        data = await reader.read()
+        return status, headers, json.loads(data) if data else {}
+    finally:
+        writer.close()
+
+
+async def _read_head(reader: asyncio.StreamReader) -> tuple:
+    head = (await reader.readuntil(b"\r\n\r\n")).decode('latin-1').split("\r\n")
+    status = int(head[0].split(" ")[1])
+    headers = {}
+    for line in head[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    return status, headers
+
+
+async def follow_events(host: str, port: int, path: str, on_event) -> str:
+    """Read a server-sent event stream until a terminal event; return that event's name"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n".encode('latin-1'))
+        await writer.drain()
+        status, _ = await _read_head(reader)
+        if status != 200:
+            return 'failed'
+        event = None
+        async for raw_line in reader:
+            line = raw_line.decode('utf-8').rstrip("\n")
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line == "" and event:
+                on_event(event)
+                if event in ('done', 'failed'):
+                    return event
+                event = None
+        return 'failed'
+    finally:
+        writer.close()
+
+
+async def run_client(host: str, port: int, client_info: dict, results: list, counters: dict):
+    record = dict(client_info)
+    start = time.perf_counter()
+    for _ in range(MAX_SUBMIT_ATTEMPTS):
+        status, headers, body = await http_request(host, port, 'POST', '/pipelines', record)
+        if status != 429:
+            break
+        counters['rejected'] += 1
+        await asyncio.sleep(float(headers.get('retry-after', 1)))
+    admitted = time.perf_counter()
+    if status != 202:
+        counters['errors'] += 1
+        results.append({'outcome': f"http_{status}", 'admission': admitted - start})
+        return
+
+    first_stage = []
+
+    def on_event(event):
+        if event == 'stage_started' and not first_stage:
+            first_stage.append(time.perf_counter())
+
+    outcome = await follow_events(host, port, body['events_url'], on_event)
+    finished = time.perf_counter()
+    results.append({
+        'outcome': outcome,
+        'admission': admitted - start,
+        'first_stage': (first_stage[0] - start) if first_stage else None,
+        'total': finished - start,
+    })
+
+
+async def run_load(url: str, clients: int, concurrency: int, seed: int) -> dict:
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    semaphore = asyncio.Semaphore(concurrency)
+    results = []
+    counters = {'rejected': 0, 'errors': 0}
+
+    async def one(client_info):
+        async with semaphore:
+            try:
+                await run_client(host, port, client_info, results, counters)
+            except (OSError, asyncio.IncompleteReadError) as e:
+                counters['errors'] += 1
+                results.append({'outcome': f"connection_error: {e}"})
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(client_info) for client_info in synthetic_clients(clients, seed)))
+    elapsed = time.perf_counter() - start
+
+    _, _, health = await http_request(host, port, 'GET', '/health')
+    outcomes = {}
+    for result in results:
+        outcomes[result['outcome']] = outcomes.get(result['outcome'], 0) + 1
+    completed = [r for r in results if r['outcome'] == 'done']
+    return {
+        'clients': clients,
+        'concurrency': concurrency,
+        'elapsed_seconds': elapsed,
+        'throughput_per_minute': len(completed) / elapsed * 60 if elapsed > 0 else 0.0,
+        'outcomes': outcomes,
+        'rejections_429': counters['rejected'],
+        'admission_seconds': latency_summary([r['admission'] for r in results if 'admission' in r]),
+        'first_stage_seconds': latency_summary([r['first_stage'] for r in completed if r['first_stage'] is not None]),
+        'total_seconds': latency_summary([r['total'] for r in completed]),
+        'service': health,
+    }
+
+
+def print_report(report: dict):
+    print(f"\n📊 {report['clients']} clients, {report['concurrency']} concurrent, {report['elapsed_seconds']:.1f}s")
+    print(f"   Outcomes: {', '.join(f'{k}={v}' for k, v in sorted(report['outcomes'].items()))}")
+    print(f"   429 rejections (retried): {report['rejections_429']}")
+    print(f"   Throughput: {report['throughput_per_minute']:.1f} completed pipelines/minute")
+    for label, key in (("Admission", 'admission_seconds'), ("First stage", 'first_stage_seconds'), ("End to end", 'total_seconds')):
+        summary = report[key]
+        if summary.get('count'):
+            print(f"   {label:<12} p50 {summary['p50']:7.2f}s  p95 {summary['p95']:7.2f}s  p99 {summary['p99']:7.2f}s  max {summary['max']:7.2f}s")
+
+
+async def wait_until_ready(host: str, port: int, timeout: float = 60.0):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            status, _, _ = await http_request(host, port, 'GET', '/health')
+            if status == 200:
+                return
+        except OSError:
+            pass
+        if time.perf_counter() > deadline:
+            raise RuntimeError("Service did not become ready")
+        await asyncio.sleep(0.2)
+
+
+def spawn_service(port: int, workers: int, queue_size: int) -> subprocess.Popen:
+    """Start service.py on the fake backend with caches and persistent client stores off"""
+    env = dict(os.environ)
+    env.setdefault('FITTELLIGENCE_MODEL_BACKEND', 'fake')
+    env.setdefault('FITTELLIGENCE_RESPONSE_CACHE', 'off')
+    env.setdefault('FITTELLIGENCE_SEARCH_CACHE', 'off')
+    env.setdefault('FITTELLIGENCE_PLAN_DB', 'off')
+    # Synthetic clients get a throwaway memory index and stay out of the mobility history
+    env.setdefault('FITTELLIGENCE_MEMORY_DIR', tempfile.mkdtemp(prefix='fittelligence-load-memory-'))
+    env.setdefault('FITTELLIGENCE_MOBILITY_DB', 'off')
+    return subprocess.Popen(
+        [sys.executable, str(Path(__file__).parent / 'service.py'), '--port', str(port),
+         '--workers', str(workers), '--queue-size', str(queue_size)],
+        env=env,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the FitTelligence HTTP service")
+    parser.add_argument('--url', default=DEFAULT_URL, help=f"Service base URL (default: {DEFAULT_URL})")
+    parser.add_argument('--clients', '-n', type=int, default=DEFAULT_CLIENTS,
+                        help=f"Pipelines to submit (default: {DEFAULT_CLIENTS})")
+    parser.add_argument('--concurrency', '-c', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Clients in flight at once (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for the synthetic client profiles")
+    parser.add_argument('--spawn', action='store_true', help="Start service.py on the fake backend for the test")
+    parser.add_argument('--workers', type=int, default=4, help="Workers of the spawned service (default: 4)")
+    parser.add_argument('--queue-size', type=int, default=16, help="Queue size of the spawned service (default: 16)")
+    parser.add_argument('--output', '-o', type=Path, help="Write the report as JSON")
+    args = parser.parse_args()
+
+    process = None
+    if args.spawn:
+        parts = urlsplit(args.url)
+        process = spawn_service(parts.port or 80, args.workers, args.queue_size)
+    try:
+        if process is not None:
+            asyncio.run(wait_until_ready(urlsplit(args.url).hostname, urlsplit(args.url).port or 80))
+        report = asyncio.run(run_load(args.url, args.clients, args.concurrency, args.seed))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,17 +7,24 @@ if str(_parent_dir) not in sys.path:
     sys.path.insert(0, str(_parent_dir))
 
 from google.adk.agents.llm_agent import Agent
-from google.adk.tools import google_search
 from google.adk.tools.preload_memory_tool import PreloadMemoryTool
 
-# To add MCP toolsets (e.g., calculator for calories/BMR, filesystem for saving meal plans), uncomment:
+from shared.food_database import calculate_meal_macros, find_foods
+from shared.history_compaction import compact_history
+from shared.meal_optimizer import optimize_meal_plan
+from shared.model_backend import resolve_model
+from shared.nutrition_calculator import calculate_energy_targets
+from shared.tracing import trace_model_end, trace_model_error, trace_model_start, trace_tool_end, trace_tool_error, trace_tool_start
+from shared.web_search import web_search
+
+# To add MCP toolsets (e.g., filesystem for saving meal plans), uncomment:
 # Example: Add MCP toolsets by configuring MCP server connection
 # from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset
 # mcp_toolsets = [MCPToolset(...)]
 
 
 nutrition_agent = Agent(
-    model='gemini-2.5-flash',
+    model=resolve_model('gemini-2.5-flash'),
     name='nutrition_agent',
     description='A master nutritionist specializing in diet and nutrition planning.',
     instruction="""You are a master nutritionist specializing in diet and nutrition planning. 
@@ -25,24 +32,42 @@ nutrition_agent = Agent(
                     You create personalized nutrition plans based on user goals, dietary restrictions, and nutritional needs.
                     
 You have access to:
-1. Google Search - For finding current nutrition information, food databases, recipe ideas, and dietary research
+1. web_search (Google Search, cached and shared across clients) - For finding current nutrition information, recipe ideas, and dietary research
 2. Memory - To remember past interactions, user dietary preferences, restrictions, and meal plans
+3. calculate_energy_targets - Computes BMR, TDEE, calorie target and macros (for one or several clients at once)
+4. find_foods - Lists foods from the local food database by tag (e.g. "vegan, high-protein"), ranked by a nutrient
+5. calculate_meal_macros - Totals calories and macros of a meal or a whole multi-day plan from the local food database
+6. optimize_meal_plan - Builds meal plans with exact portions that hit calorie and macro targets under dietary
+   restrictions and allergies (for one or several clients, up to 7 days)
 
 When creating nutrition plans:
 - Consider user's goals (weight loss, muscle gain, maintenance, health improvement)
 - Account for dietary restrictions (vegetarian, vegan, gluten-free, allergies, etc.)
-- Calculate appropriate caloric needs based on activity level
+- Use the energy targets given in the request, or call calculate_energy_targets; never do this arithmetic yourself
 - Provide balanced macronutrient distribution
+- Start the meal plan from optimize_meal_plan and present its portions; do not adjust portions by guesswork
+- Choose swaps with find_foods and check any edited plan against the targets with calculate_meal_macros
+  (one call for the whole plan, labelling items like "Mon breakfast: 80 g oats") instead of searching for food data
 - Include meal timing recommendations
 - Suggest recipes and food options
 - Remember past preferences to build on previous plans
 
 Always prioritize balanced nutrition and sustainable eating habits over restrictive diets.""",
     tools=[
-        google_search,
+        web_search,  # Cached, coalesced Google Search via the search agent
         PreloadMemoryTool(),  # Memory tool to retrieve past interactions
+        calculate_energy_targets,  # Deterministic BMR/TDEE/macro calculator
+        find_foods,  # Tag lookup in the packaged food composition table
+        calculate_meal_macros,  # Vectorized meal/plan macro totals
+        optimize_meal_plan,  # Batched portion optimizer for calorie/macro targets
         # *mcp_toolsets,  # Uncomment to add MCP toolsets (see shared/mcp_config.py)
     ],
+    before_model_callback=[compact_history, trace_model_start],
+    after_model_callback=trace_model_end,
+    on_model_error_callback=trace_model_error,
+    before_tool_callback=trace_tool_start,
+    after_tool_callback=trace_tool_end,
+    on_tool_error_callback=trace_tool_error,
 )
 
 # Root agent for ADK web interface
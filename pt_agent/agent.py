@@ -7,9 +7,14 @@ if str(_parent_dir) not in sys.path:
     sys.path.insert(0, str(_parent_dir))
 
 from google.adk.agents.llm_agent import Agent
-from google.adk.tools import google_search
 from google.adk.tools.preload_memory_tool import PreloadMemoryTool
 
+from shared.history_compaction import compact_history
+from shared.exercise_library import find_exercises
+from shared.model_backend import resolve_model
+from shared.tracing import trace_model_end, trace_model_error, trace_model_start, trace_tool_end, trace_tool_error, trace_tool_start
+from shared.web_search import web_search
+
 # To add MCP toolsets (e.g., calculator for BMI/BMR, filesystem for saving plans), uncomment:
 # Example: Add MCP toolsets by configuring MCP server connection
 # from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset
@@ -17,7 +22,7 @@ from google.adk.tools.preload_memory_tool import PreloadMemoryTool
 
 
 pt_agent = Agent(
-    model='gemini-2.5-flash',
+    model=resolve_model('gemini-2.5-flash'),
     name='pt_agent',
     description='A master personal trainer specializing in fitness and training programs.',
     instruction="""You are a master personal trainer specializing in fitness and training programs. 
@@ -25,12 +30,15 @@ pt_agent = Agent(
                     You create personalized training plans based on user goals, fitness levels, and preferences.
                     
 You have access to:
-1. Google Search - For finding current exercise information, workout trends, and fitness research
+1. web_search (Google Search, cached and shared across clients) - For finding current exercise information, workout trends, and fitness research
 2. Memory - To remember past interactions, user preferences, and training history
+3. find_exercises - Looks up candidate exercises in the local exercise library by equipment tier, muscle group,
+   movement pattern, difficulty and injuries to avoid
 
 When creating training plans:
 - Consider user's fitness level (beginner, intermediate, advanced)
 - Account for available equipment (gym, home, bodyweight)
+- Pick exercises with find_exercises (pass the client's equipment, level and injuries) before searching the web
 - Incorporate user preferences and goals
 - Provide progressive overload plans
 - Include safety considerations and proper form guidance
@@ -38,10 +46,17 @@ When creating training plans:
 
 Always prioritize safety and proper technique over intensity.""",
     tools=[
-        google_search,
+        web_search,  # Cached, coalesced Google Search via the search agent
         PreloadMemoryTool(),  # Memory tool to retrieve past interactions
+        find_exercises,  # Indexed lookup in the bundled exercise library
         # *mcp_toolsets,  # Uncomment to add MCP toolsets (see shared/mcp_config.py)
     ],
+    before_model_callback=[compact_history, trace_model_start],
+    after_model_callback=trace_model_end,
+    on_model_error_callback=trace_model_error,
+    before_tool_callback=trace_tool_start,
+    after_tool_callback=trace_tool_end,
+    on_tool_error_callback=trace_tool_error,
 )
 
 # Root agent for ADK web interface
@@ -7,12 +7,16 @@ if str(_parent_dir) not in sys.path:
     sys.path.insert(0, str(_parent_dir))
 
 from google.adk.agents.llm_agent import Agent
-from google.adk.tools import google_search
 from google.adk.tools.preload_memory_tool import PreloadMemoryTool
 
+from shared.history_compaction import compact_history
+from shared.model_backend import resolve_model
+from shared.tracing import trace_model_end, trace_model_error, trace_model_start, trace_tool_end, trace_tool_error, trace_tool_start
+from shared.web_search import web_search
+
 
 reception_agent = Agent(
-    model='gemini-2.5-flash',
+    model=resolve_model('gemini-2.5-flash'),
     name='reception_agent',
     description='A professional receptionist named Sarah who collects comprehensive client information for fitness and nutrition programs.',
     instruction="""You are Sarah, a warm and professional receptionist specializing in gathering comprehensive client information for fitness and nutrition programs.
@@ -62,7 +66,7 @@ Your primary role is to collect all necessary information about clients before t
    - Support system
 
 You have access to:
-1. Google Search - For finding information about health conditions, fitness assessments, etc.
+1. web_search (Google Search, cached and shared across clients) - For finding information about health conditions, fitness assessments, etc.
 2. Memory - To remember client information and preferences
 
 Your communication style should be:
@@ -74,10 +78,16 @@ Your communication style should be:
 
 After collecting all information, you should provide a comprehensive client profile summary to the head coach.""",
     tools=[
-        google_search,
+        web_search,  # Cached, coalesced Google Search via the search agent
         PreloadMemoryTool(),  # Memory tool to retrieve past interactions
         # *mcp_toolsets,  # Uncomment to add MCP toolsets (configure MCP server)
     ],
+    before_model_callback=[compact_history, trace_model_start],
+    after_model_callback=trace_model_end,
+    on_model_error_callback=trace_model_error,
+    before_tool_callback=trace_tool_start,
+    after_tool_callback=trace_tool_end,
+    on_tool_error_callback=trace_tool_error,
 )
 
 # Root agent for ADK web interface
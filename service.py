@@ -0,0 +1,436 @@
+"""
+FitTelligence - Pipeline HTTP Service
+
+Serves the pipeline to many concurrent clients over HTTP, using asyncio
+streams only (no web framework). Submissions go into a bounded admission
+queue drained by a fixed pool of workers that share one session service, and
+through it the cached Runners of shared/session_manager.py. When the queue is
+full, new submissions are rejected with 429 and a Retry-After header instead
+of piling up.
+
+Endpoints:
+    POST /pipelines              Submit a client intake (JSON with the keys of
+                                 demo.format_client_message, optional "client_id"
+                                 and "variant"; "replan" looks up the previous run
+                                 by client_id, else name); returns 202 with the job id
+    GET  /pipelines/<id>         Job status, per-stage status and timings, and the
+                                 responses once finished
+    GET  /pipelines/<id>/events  Server-sent events: queued, stage_started,
+                                 stage_finished (with the stage output), then done
+                                 or failed; earlier events are replayed first
+    GET  /health                 Queue depth, jobs running and worker count
+
+Usage:
+    python service.py --port 8080 --workers 4 --queue-size 64
+    FITTELLIGENCE_MODEL_BACKEND=fake python service.py   # offline, for load tests
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import urlsplit
+
+# Add current directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from batch_runner import client_record_id, normalize_client_info
+from demo import DEFAULT_STAGE_TIMEOUT, PIPELINE_VARIANTS, run_pipeline
+from shared.agent_registry import PIPELINE_AGENT_NAMES, get_agent_registry
+from shared.replanning import plan_client_id
+from shared.session_manager import create_session_service, get_session_manager, release_session_manager
+
+
+DEFAULT_PORT = 8080
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 64
+
+# Finished jobs kept for status and event requests (oldest are dropped)
+MAX_RETAINED_JOBS = 1000
+
+# Largest accepted request body and header block
+MAX_BODY_BYTES = 64 * 1024
+MAX_HEADER_BYTES = 16 * 1024
+
+# Seconds a client gets to send its request
+REQUEST_READ_TIMEOUT = 30.0
+
+# Seconds between SSE keep-alive comments while a job is quiet
+SSE_KEEPALIVE_SECONDS = 15.0
+
+_REASONS = {
+    200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    408: "Request Timeout", 413: "Payload Too Large", 429: "Too Many Requests", 500: "Internal Server Error",
+}
+
+_TERMINAL_EVENTS = ('done', 'failed')
+
+
+class PipelineJob:
+    """One submitted pipeline run with its progress events"""
+
+    def __init__(self, client_id: str, client_info: dict, variant: str, plan_id: str = ""):
+        self.job_id = uuid.uuid4().hex[:16]
+        self.client_id = client_id
+        self.plan_id = plan_id
+        self.client_info = client_info
+        self.variant = variant
+        self.status = 'queued'
+        self.stages = {}
+        self.responses = {}
+        self.error = ""
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.events = []
+        self._update = asyncio.Event()
+
+    def publish(self, event: str, data: dict):
+        """Append an event and wake every SSE subscriber"""
+        self.events.append((event, data))
+        self._update.set()
+        self._update = asyncio.Event()
+
+    async def wait_for_events(self, seen: int, timeout: float) -> bool:
+        """Wait until there are more than `seen` events; False on timeout"""
+        update = self._update
+        if len(self.events) > seen:
+            return True
+        try:
+            await asyncio.wait_for(update.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def to_dict(self) -> dict:
+        return {
+            'job_id': self.job_id,
+            'client_id': self.client_id,
+            'variant': self.variant,
+            'status': self.status,
+            'stages': self.stages,
+            'responses': self.responses,
+            'error': self.error,
+            'queued_seconds': round((self.started_at or time.time()) - self.submitted_at, 3),
+            'total_seconds': round(self.finished_at - self.submitted_at, 3) if self.finished_at else None,
+        }
+
+
+class PipelineService:
+    """Bounded admission queue and worker pool in front of demo.run_pipeline"""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 stage_timeout: float = DEFAULT_STAGE_TIMEOUT, session_service=None):
+        self.workers = workers
+        self.stage_timeout = stage_timeout
+        self.session_service = session_service or create_session_service()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.jobs = OrderedDict()
+        self.running = 0
+        self.stats = {'accepted': 0, 'rejected': 0, 'done': 0, 'failed': 0}
+        self._mean_job_seconds = None
+        self._worker_tasks = []
+
+    def start(self):
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        release_session_manager(self.session_service)
+
+    def submit(self, record: dict) -> PipelineJob:
+        """
+        Admit a submission.
+
+        Raises:
+            ValueError: If the variant is unknown, or a replan names no client_id or name
+            asyncio.QueueFull: If the admission queue is full
+        """
+        variant = str(record.get('variant') or 'full').strip().lower()
+        if variant not in PIPELINE_VARIANTS:
+            raise ValueError(f"Unknown variant: {variant} (choose from {', '.join(PIPELINE_VARIANTS)})")
+        plan_id = plan_client_id(record)
+        if variant == 'replan' and not plan_id:
+            raise ValueError("The replan variant needs a client_id or name to find the client's previous run")
+        client_info = normalize_client_info(record)
+        job = PipelineJob(client_record_id(record, client_info), client_info, variant, plan_id)
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.stats['rejected'] += 1
+            raise
+        self.stats['accepted'] += 1
+        self.jobs[job.job_id] = job
+        while len(self.jobs) > MAX_RETAINED_JOBS:
+            oldest = next(iter(self.jobs.values()))
+            if oldest.status in ('queued', 'running'):
+                break
+            self.jobs.popitem(last=False)
+        job.publish('queued', {'job_id': job.job_id, 'position': self.queue.qsize()})
+        return job
+
+    def retry_after(self) -> int:
+        """Estimated seconds until a queue slot frees up, for the Retry-After header"""
+        if self._mean_job_seconds is None:
+            return 1
+        return max(1, round(self._mean_job_seconds / self.workers))
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            self.running += 1
+            try:
+                await self._run_job(job)
+            finally:
+                self.running -= 1
+                self.queue.task_done()
+
+    async def _run_job(self, job: PipelineJob):
+        job.status = 'running'
+        job.started_at = time.time()
+        # Memory is scoped by user_id, so use the stable client identity the plan history uses
+        user_id = job.plan_id or job.client_id
+        session_id = f"svc_{job.job_id}"
+
+        def stage_started(stage):
+            job.stages[stage.key] = {'title': stage.title, 'status': 'running'}
+            job.publish('stage_started', {'stage': stage.key, 'title': stage.title})
+
+        def stage_finished(result):
+            job.stages[result.key] = {
+                'title': result.title,
+                'status': result.status,
+                'attempts': result.attempts,
+                'seconds': round(result.elapsed, 3),
+            }
+            job.publish('stage_finished', {
+                'stage': result.key, 'status': result.status, 'seconds': round(result.elapsed, 3),
+                'text': result.text if result.agent_name else "",
+            })
+
+        try:
+            job.responses = await run_pipeline(
+                job.client_info, session_id, user_id, self.session_service, job.variant,
+                stage_timeout=self.stage_timeout, verbose=False,
+                on_stage_start=stage_started, on_stage_done=stage_finished, client_id=job.plan_id or None,
+            )
+            failed = [key for key, stage in job.stages.items() if stage['status'] not in ('ok', 'fast_path')]
+            job.status = 'failed' if failed else 'done'
+            job.error = f"Stages failed: {', '.join(failed)}" if failed else ""
+        except Exception as e:
+            job.status, job.error = 'failed', str(e)
+        finally:
+            await self._release_sessions(user_id, session_id)
+        job.finished_at = time.time()
+        self.stats[job.status] += 1
+        # Exponentially weighted mean run time, for Retry-After
+        elapsed = job.finished_at - job.started_at
+        self._mean_job_seconds = elapsed if self._mean_job_seconds is None else 0.8 * self._mean_job_seconds + 0.2 * elapsed
+        job.publish(job.status, {'job_id': job.job_id, 'error': job.error,
+                                 'total_seconds': round(job.finished_at - job.submitted_at, 3)})
+
+    async def _release_sessions(self, user_id: str, session_id: str):
+        """Drop the job's sessions; its outputs live on in the artifact store and plan history"""
+        manager = get_session_manager(self.session_service)
+        for app_name in PIPELINE_AGENT_NAMES:
+            try:
+                await self.session_service.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+            except Exception:
+                pass
+            manager.forget_session(app_name, user_id, session_id)
+
+    def health(self) -> dict:
+        return {
+            'status': 'ok',
+            'queued': self.queue.qsize(),
+            'queue_size': self.queue.maxsize,
+            'running': self.running,
+            'workers': self.workers,
+            **self.stats,
+        }
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str, headers: dict = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+async def read_request(reader: asyncio.StreamReader) -> tuple:
+    """
+    Read one HTTP/1.1 request.
+
+    Returns:
+        Tuple of (method, path, headers, body)
+
+    Raises:
+        HttpError: If the request is malformed or too large
+    """
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.LimitOverrunError:
+        raise HttpError(413, "Request headers too large")
+    except asyncio.IncompleteReadError:
+        raise HttpError(400, "Incomplete request")
+    lines = head.decode('latin-1').split("\r\n")
+    try:
+        method, target, _ = lines[0].split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "Malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length', 0) or 0)
+    except ValueError:
+        raise HttpError(400, "Invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, f"Body larger than {MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), urlsplit(target).path, headers, body
+
+
+async def write_response(writer: asyncio.StreamWriter, status: int, payload: dict, headers: dict = None):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    head = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(body)}",
+            "Connection: close"]
+    head += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + body)
+    await writer.drain()
+
+
+async def stream_events(writer: asyncio.StreamWriter, job: PipelineJob):
+    """Replay a job's events as server-sent events, then follow it until it finishes"""
+    writer.write(("HTTP/1.1 200 OK\r\n"
+                  "Content-Type: text/event-stream\r\n"
+                  "Cache-Control: no-cache\r\n"
+                  "Connection: close\r\n\r\n").encode('latin-1'))
+    seen = 0
+    while True:
+        while seen < len(job.events):
+            event, data = job.events[seen]
+            seen += 1
+            writer.write(f"id: {seen}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode('utf-8'))
+            if event in _TERMINAL_EVENTS:
+                await writer.drain()
+                return
+        await writer.drain()
+        if not await job.wait_for_events(seen, SSE_KEEPALIVE_SECONDS):
+            writer.write(b": keep-alive\n\n")
+
+
+async def handle_connection(service: PipelineService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        try:
+            try:
+                method, path, headers, body = await asyncio.wait_for(read_request(reader), REQUEST_READ_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise HttpError(408, "Request not received in time")
+            parts = [part for part in path.split("/") if part]
+            if parts == ['health'] and method == 'GET':
+                await write_response(writer, 200, service.health())
+            elif parts == ['pipelines']:
+                if method != 'POST':
+                    raise HttpError(405, "Use POST to submit a pipeline", {'Allow': 'POST'})
+                try:
+                    record = json.loads(body or b"{}")
+                except ValueError:
+                    raise HttpError(400, "Body is not valid JSON")
+                if not isinstance(record, dict):
+                    raise HttpError(400, "Body must be a JSON object")
+                try:
+                    job = service.submit(record)
+                except ValueError as e:
+                    raise HttpError(400, str(e))
+                except asyncio.QueueFull:
+                    raise HttpError(429, "Admission queue is full, retry later",
+                                    {'Retry-After': str(service.retry_after())})
+                await write_response(writer, 202, {
+                    'job_id': job.job_id,
+                    'status_url': f"/pipelines/{job.job_id}",
+                    'events_url': f"/pipelines/{job.job_id}/events",
+                }, {'Location': f"/pipelines/{job.job_id}"})
+            elif len(parts) in (2, 3) and parts[0] == 'pipelines' and parts[2:] in ([], ['events']):
+                if method != 'GET':
+                    raise HttpError(405, "Use GET", {'Allow': 'GET'})
+                job = service.jobs.get(parts[1])
+                if job is None:
+                    raise HttpError(404, f"Unknown job: {parts[1]}")
+                if parts[2:] == ['events']:
+                    await stream_events(writer, job)
+                else:
+                    await write_response(writer, 200, job.to_dict())
+            else:
+                raise HttpError(404, f"No route for {method} {path}")
+        except HttpError as e:
+            await write_response(writer, e.status, {'status': 'error', 'error_message': str(e)}, e.headers)
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    except Exception as e:
+        print(f"❌ Request failed: {str(e)}")
+        try:
+            await write_response(writer, 500, {'status': 'error', 'error_message': "Internal server error"})
+        except Exception:
+            pass
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except Exception:
+            pass
+
+
+async def serve(host: str, port: int, workers: int, queue_size: int, stage_timeout: float):
+    service = PipelineService(workers, queue_size, stage_timeout)
+    service.start()
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(service, reader, writer), host, port, limit=MAX_HEADER_BYTES
+    )
+    print(f"🚀 FitTelligence service on http://{host}:{port} "
+          f"({workers} workers, queue of {queue_size}, {type(service.session_service).__name__})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+        print(f"\n🏁 Service stopped: {service.stats['done']} done, {service.stats['failed']} failed, "
+              f"{service.stats['rejected']} rejected")
+        print(get_agent_registry().startup_report())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the FitTelligence pipeline over HTTP")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to bind (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=int(os.getenv('FITTELLIGENCE_SERVICE_PORT', DEFAULT_PORT)),
+                        help=f"Port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument('--workers', '-w', type=int, default=DEFAULT_WORKERS,
+                        help=f"Pipelines run concurrently (default: {DEFAULT_WORKERS})")
+    parser.add_argument('--queue-size', '-q', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help=f"Submissions waiting for a worker before 429 is returned (default: {DEFAULT_QUEUE_SIZE})")
+    parser.add_argument('--stage-timeout', type=float, default=DEFAULT_STAGE_TIMEOUT,
+                        help=f"Per-stage timeout in seconds (default: {DEFAULT_STAGE_TIMEOUT:.0f})")
+    args = parser.parse_args()
+
+    if args.workers < 1 or args.queue_size < 1:
+        parser.error("--workers and --queue-size must be at least 1")
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.queue_size, args.stage_timeout))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
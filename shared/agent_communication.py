@@ -1,36 +1,80 @@
 """
 Agent-to-agent communication tools for head_coach_agent
+
+Every tool invokes its sub-agent through the process-wide runner pool in
+shared/agent_pool.py, so Runner construction and agent imports happen once
+per process. The *_async variants run on the caller's event loop and are the
+ones registered on the head coach; the blocking variants share their request,
+artifact and prompt logic (one _*_call helper per tool) and differ only in how
+the pool is invoked. Passing client_profile_id embeds the
+registered client profile (shared/client_profile.py) in the sub-agent prompt.
+Image files named in body_images are ingested (shared/image_ingestion.py) and
+sent to the body scanner as downscaled, metadata-free image parts; the image
+bytes are only loaded when the response cache misses, and the async tool
+ingests them on a worker thread.
+
+Before invoking a sub-agent, each tool checks the session's artifact store
+(shared/artifact_store.py): if that stage already ran in the caller's session
+(or the session of client_profile_id) for the same request, the stored output
+is returned instead, and a compact reference on repeated requests. A call
+whose requirement arguments are all empty asks for the pipeline's own stage
+output; any other arguments are a new request. refresh=True forces a new run.
 """
+import asyncio
 import sys
 from pathlib import Path
+from typing import Callable, NamedTuple, Optional
 
 # Add parent directory to path for cross-agent imports
 _parent_dir = Path(__file__).parent.parent
 if str(_parent_dir) not in sys.path:
     sys.path.insert(0, str(_parent_dir))
 
+from google.adk.tools.tool_context import ToolContext
 
-def get_training_plan_from_pt_agent(user_goals: str, fitness_level: str = "intermediate", preferences: str = "") -> str:
-    """
-    Get a personalized training plan from the PT agent.
-    
-    Args:
-        user_goals: The user's fitness goals (e.g., "build muscle", "lose weight", "improve endurance")
-        fitness_level: Current fitness level (beginner, intermediate, advanced)
-        preferences: User preferences for workouts (e.g., "prefer strength training", "love running")
-    
-    Returns:
-        A detailed training plan from the PT agent
-    """
-    try:
-        # Import pt_agent dynamically
-        from pt_agent import pt_agent
-        
-        # Create a prompt for the pt_agent
-        prompt = f"""Create a personalized training plan with the following details:
-- User Goals: {user_goals}
-- Fitness Level: {fitness_level}
-- Preferences: {preferences}
+from shared.agent_pool import get_agent_pool
+from shared.artifact_store import STAGE_AGENTS, get_artifact_store, request_key
+from shared.client_profile import get_profile
+from shared.image_ingestion import get_image_ingestor, ingest_image_references
+
+
+# Stage -> name used in the tools' status messages
+_TEAM_TITLES = {'reception': 'Reception', 'body_scanner': 'Body Scanner', 'pt': 'PT', 'nutrition': 'Nutrition'}
+
+
+def _profile_section(client_profile_id: str) -> str:
+    """Return the compact profile for a registered id, or an empty string"""
+    profile = get_profile(client_profile_id) if client_profile_id else None
+    if profile is None:
+        return ""
+    return f"\n\n{profile.to_compact()}"
+
+
+def _session_key(tool_context) -> Optional[tuple]:
+    """Return (user_id, session_id) of the session a tool is running in, if known"""
+    session = tool_context.session if tool_context is not None else None
+    if session is None:
+        return None
+    return session.user_id, session.id
+
+
+def _artifact_scope(tool_context, client_profile_id: str) -> Optional[tuple]:
+    """Session whose artifacts a tool call reads and writes"""
+    session_key = _session_key(tool_context)
+    return get_artifact_store().resolve_session(session_key, client_profile_id) or session_key
+
+
+def _stored_artifact(scope: Optional[tuple], stage: str, request: str, refresh: bool) -> Optional[str]:
+    if scope is None or refresh:
+        return None
+    return get_artifact_store().checkout(scope, stage, request)
+
+
+def _training_plan_prompt(user_goals: str, fitness_level: str, preferences: str, client_profile_id: str = "") -> str:
+    return f"""Create a personalized training plan with the following details:
+- User Goals: {user_goals or "As in the client profile"}
+- Fitness Level: {fitness_level or "As in the client profile"}
+- Preferences: {preferences}{_profile_section(client_profile_id)}
 
 Please provide a comprehensive training plan including:
 1. Weekly workout schedule
@@ -40,44 +84,13 @@ Please provide a comprehensive training plan including:
 5. Safety considerations
 
 Format the response clearly and be specific."""
-        
-        # Note: In actual implementation, you would use ADK's Runner to invoke the agent
-        # For now, return a message indicating what would happen
-        return f"""PT Agent Training Plan Request:
-Goals: {user_goals}
-Fitness Level: {fitness_level}
-Preferences: {preferences}
-
-[The PT agent would create a comprehensive training plan based on these inputs. 
-To use this in production, implement agent invocation using ADK's Runner or MCP connection.]"""
-        
-    except ImportError:
-        return "PT Agent is not available. Please ensure pt_agent is properly configured."
-    except Exception as e:
-        return f"Error calling PT agent: {str(e)}"
 
 
-def get_nutrition_plan_from_nutrition_agent(user_goals: str, dietary_restrictions: str = "", nutritional_needs: str = "") -> str:
-    """
-    Get a personalized nutrition plan from the nutrition agent.
-    
-    Args:
-        user_goals: The user's nutrition/health goals (e.g., "weight loss", "muscle gain", "maintain weight")
-        dietary_restrictions: Any dietary restrictions or allergies (e.g., "vegetarian", "gluten-free", "lactose intolerant")
-        nutritional_needs: Specific nutritional requirements (e.g., "high protein", "low carb", "2000 calories")
-    
-    Returns:
-        A detailed nutrition plan from the nutrition agent
-    """
-    try:
-        # Import nutrition_agent dynamically
-        from nutrition_agent import nutrition_agent
-        
-        # Create a prompt for the nutrition_agent
-        prompt = f"""Create a personalized nutrition plan with the following details:
-- User Goals: {user_goals}
+def _nutrition_plan_prompt(user_goals: str, dietary_restrictions: str, nutritional_needs: str, client_profile_id: str = "") -> str:
+    return f"""Create a personalized nutrition plan with the following details:
+- User Goals: {user_goals or "As in the client profile"}
 - Dietary Restrictions: {dietary_restrictions}
-- Nutritional Needs: {nutritional_needs}
+- Nutritional Needs: {nutritional_needs}{_profile_section(client_profile_id)}
 
 Please provide a comprehensive nutrition plan including:
 1. Daily meal plan with specific food suggestions
@@ -88,45 +101,13 @@ Please provide a comprehensive nutrition plan including:
 6. Supplement recommendations if applicable
 
 Format the response clearly and be specific."""
-        
-        # Note: In actual implementation, you would use ADK's Runner to invoke the agent
-        return f"""Nutrition Agent Plan Request:
-Goals: {user_goals}
-Dietary Restrictions: {dietary_restrictions}
-Nutritional Needs: {nutritional_needs}
-
-[The Nutrition agent would create a comprehensive nutrition plan based on these inputs.
-To use this in production, implement agent invocation using ADK's Runner or MCP connection.]"""
-        
-    except ImportError:
-        return "Nutrition Agent is not available. Please ensure nutrition_agent is properly configured."
-    except Exception as e:
-        return f"Error calling Nutrition agent: {str(e)}"
 
 
-def get_client_information_from_reception(
-    client_name: str = "",
-    additional_questions: str = ""
-) -> str:
-    """
-    Get comprehensive client information from the reception agent.
-    
-    Args:
-        client_name: Name of the client (optional)
-        additional_questions: Any specific information needed beyond standard intake
-    
-    Returns:
-        Comprehensive client information profile
-    """
-    try:
-        # Import reception_agent dynamically
-        from reception_agent import reception_agent
-        
-        # Create a prompt for the reception_agent
-        prompt = f"""Collect comprehensive client information.
-        
+def _client_information_prompt(client_name: str, additional_questions: str, client_profile_id: str = "") -> str:
+    return f"""Collect comprehensive client information.
+
 Client Name: {client_name if client_name else "[New Client]"}
-Additional Information Needed: {additional_questions if additional_questions else "Standard intake"}
+Additional Information Needed: {additional_questions if additional_questions else "Standard intake"}{_profile_section(client_profile_id)}
 
 Please gather all necessary information including:
 1. Personal information and demographics
@@ -137,47 +118,38 @@ Please gather all necessary information including:
 6. Goals and expectations
 
 Provide a detailed client profile summary."""
-        
-        # Note: In actual implementation, you would use ADK's Runner to invoke the agent
-        return f"""Reception Agent - Client Information Collection:
-Client: {client_name if client_name else "New Client"}
-Request: {additional_questions if additional_questions else "Complete client intake"}
-
-[The reception agent would conduct a thorough client intake interview and provide a comprehensive client profile.
-To use this in production, implement agent invocation using ADK's Runner or MCP connection.]"""
-        
-    except ImportError:
-        return "Reception Agent is not available. Please ensure reception_agent is properly configured."
-    except Exception as e:
-        return f"Error calling Reception agent: {str(e)}"
 
 
-def get_body_analysis_from_scanner(
-    body_images: str = "",
-    mobility_test_request: str = "",
-    assessment_type: str = "comprehensive"
-) -> str:
+def _body_images_payload(body_images: str) -> tuple:
     """
-    Get body analysis and mobility assessment from the body scanner agent.
-    
-    Args:
-        body_images: Description or reference to body images to analyze
-        mobility_test_request: Specific mobility tests to conduct
-        assessment_type: Type of assessment (comprehensive, postural, mobility, performance)
-    
+    Split body_images into prompt text and a builder for the image parts.
+
+    Image files are listed in the prompt by content hash, so identical photos in
+    a follow-up assessment produce the same prompt (and response cache key).
+    The image bytes are read only when the pool calls the builder, i.e. on a
+    response cache miss.
+
     Returns:
-        Detailed body analysis and recommendations
+        Tuple of (text for the Body Images line, callable returning the image
+        Parts, or None without images)
     """
-    try:
-        # Import body_scanner_agent dynamically
-        from body_scanner_agent import body_scanner_agent
-        
-        # Create a prompt for the body_scanner_agent
-        prompt = f"""Conduct {assessment_type} body analysis and assessment.
-        
+    images, notes, errors = ingest_image_references(body_images)
+    if not images and not errors:
+        return body_images, None
+    ingestor = get_image_ingestor()
+    lines = [f"{len(images)} attached image(s): " + "; ".join(image.describe() for image in images)] if images else []
+    lines.extend(notes)
+    lines.extend(f"Could not read image {error}" for error in errors)
+    return "\n".join(lines), (lambda: [ingestor.image_part(image) for image in images]) if images else None
+
+
+def _body_analysis_prompt(body_images: str, mobility_test_request: str, assessment_type: str, client_profile_id: str = "") -> str:
+    assessment_type = assessment_type or "comprehensive"
+    return f"""Conduct {assessment_type} body analysis and assessment.
+
 Body Images: {body_images if body_images else "No images provided yet - request images if needed"}
 Mobility Test Request: {mobility_test_request if mobility_test_request else "Standard mobility assessment"}
-Assessment Type: {assessment_type}
+Assessment Type: {assessment_type}{_profile_section(client_profile_id)}
 
 Please provide:
 1. Postural analysis from images (if provided)
@@ -186,22 +158,206 @@ Please provide:
 4. Identified imbalances or restrictions
 5. Corrective exercise recommendations
 6. Performance considerations for the head coach"""
-        
-        # Note: In actual implementation, you would use ADK's Runner to invoke the agent
-        return f"""Body Scanner Agent - Analysis Request:
-Assessment Type: {assessment_type}
-Images: {"Provided" if body_images else "Not provided"}
-Mobility Tests: {mobility_test_request if mobility_test_request else "Standard assessment"}
-
-[The body scanner agent would analyze body images, conduct mobility tests, and provide detailed kinesiology-based recommendations.
-To use this in production, implement agent invocation using ADK's Runner or MCP connection.]"""
-        
+
+
+class _TeamCall(NamedTuple):
+    """A prepared A2A request: where its artifact lives, and its stored answer or payload"""
+    scope: Optional[tuple]
+    request: str
+    stored: Optional[str]
+    # Returns (prompt, extra_parts); blocking payloads read files and run off the event loop
+    payload: Callable[[], tuple]
+    blocking: bool = False
+
+
+def _team_call(stage: str, tool_context, client_profile_id: str, refresh: bool, request: str,
+               payload: Callable[[], tuple], blocking: bool = False) -> _TeamCall:
+    scope = _artifact_scope(tool_context, client_profile_id)
+    return _TeamCall(scope, request, _stored_artifact(scope, stage, request, refresh), payload, blocking)
+
+
+def _unavailable(stage: str) -> str:
+    return f"{_TEAM_TITLES[stage]} Agent is not available. Please ensure {STAGE_AGENTS[stage]} is properly configured."
+
+
+def _run_team_call(stage: str, prepare: Callable[[], _TeamCall]) -> str:
+    """Answer a prepared request from the artifact store or run the sub-agent synchronously"""
+    try:
+        call = prepare()
+        if call.stored is not None:
+            return call.stored
+        prompt, extra_parts = call.payload()
+        response = get_agent_pool().invoke(STAGE_AGENTS[stage], prompt, extra_parts=extra_parts)
+        get_artifact_store().record_run(call.scope, stage, response, STAGE_AGENTS[stage], call.request)
+        return response
+    except ImportError:
+        return _unavailable(stage)
+    except Exception as e:
+        return f"Error calling {_TEAM_TITLES[stage]} agent: {str(e)}"
+
+
+async def _run_team_call_async(stage: str, prepare: Callable[[], _TeamCall]) -> str:
+    """Answer a prepared request from the artifact store or run the sub-agent on the event loop"""
+    try:
+        call = prepare()
+        if call.stored is not None:
+            return call.stored
+        prompt, extra_parts = await asyncio.to_thread(call.payload) if call.blocking else call.payload()
+        response = await get_agent_pool().invoke_async(STAGE_AGENTS[stage], prompt, extra_parts=extra_parts)
+        get_artifact_store().record_run(call.scope, stage, response, STAGE_AGENTS[stage], call.request)
+        return response
     except ImportError:
-        return "Body Scanner Agent is not available. Please ensure body_scanner_agent is properly configured."
+        return _unavailable(stage)
     except Exception as e:
-        return f"Error calling Body Scanner agent: {str(e)}"
+        return f"Error calling {_TEAM_TITLES[stage]} agent: {str(e)}"
+
+
+def _pt_call(user_goals, fitness_level, preferences, client_profile_id, refresh, tool_context) -> _TeamCall:
+    return _team_call(
+        'pt', tool_context, client_profile_id, refresh,
+        request_key(user_goals, fitness_level, preferences),
+        lambda: (_training_plan_prompt(user_goals, fitness_level, preferences, client_profile_id), None),
+    )
+
+
+def _nutrition_call(user_goals, dietary_restrictions, nutritional_needs, client_profile_id, refresh, tool_context) -> _TeamCall:
+    return _team_call(
+        'nutrition', tool_context, client_profile_id, refresh,
+        request_key(user_goals, dietary_restrictions, nutritional_needs),
+        lambda: (_nutrition_plan_prompt(user_goals, dietary_restrictions, nutritional_needs, client_profile_id), None),
+    )
+
+
+def _reception_call(client_name, additional_questions, client_profile_id, refresh, tool_context) -> _TeamCall:
+    return _team_call(
+        'reception', tool_context, client_profile_id, refresh,
+        request_key(additional_questions),
+        lambda: (_client_information_prompt(client_name, additional_questions, client_profile_id), None),
+    )
+
+
+def _body_scanner_call(body_images, mobility_test_request, assessment_type, client_profile_id, refresh, tool_context) -> _TeamCall:
+    def payload():
+        images_text, image_parts = _body_images_payload(body_images)
+        return _body_analysis_prompt(images_text, mobility_test_request, assessment_type, client_profile_id), image_parts
+
+    # The default assessment type is the pipeline's own assessment
+    request = request_key(body_images, mobility_test_request, "" if assessment_type.strip().lower() == 'comprehensive' else assessment_type)
+    return _team_call('body_scanner', tool_context, client_profile_id, refresh, request, payload, blocking=True)
+
+
+async def get_training_plan_from_pt_agent_async(user_goals: str = "", fitness_level: str = "", preferences: str = "", client_profile_id: str = "", refresh: bool = False, tool_context: ToolContext = None) -> str:
+    """
+    Get a personalized training plan from the PT agent.
+
+    Args:
+        user_goals: The user's fitness goals (e.g., "build muscle", "lose weight", "improve endurance"); empty to use the profile's
+        fitness_level: Current fitness level (beginner, intermediate, advanced); empty to use the profile's
+        preferences: User preferences for workouts (e.g., "prefer strength training", "love running")
+        client_profile_id: Id of a registered client profile; its compact form is sent instead of restating client details (optional)
+        refresh: Run the agent again even if this session already has a result for the same request
+
+    Returns:
+        A detailed training plan from the PT agent
+    """
+    return await _run_team_call_async('pt', lambda: _pt_call(user_goals, fitness_level, preferences, client_profile_id, refresh, tool_context))
+
+
+def get_training_plan_from_pt_agent(user_goals: str = "", fitness_level: str = "", preferences: str = "", client_profile_id: str = "", refresh: bool = False, tool_context: ToolContext = None) -> str:
+    """Blocking get_training_plan_from_pt_agent_async, for callers without an event loop"""
+    return _run_team_call('pt', lambda: _pt_call(user_goals, fitness_level, preferences, client_profile_id, refresh, tool_context))
+
+
+async def get_nutrition_plan_from_nutrition_agent_async(user_goals: str = "", dietary_restrictions: str = "", nutritional_needs: str = "", client_profile_id: str = "", refresh: bool = False, tool_context: ToolContext = None) -> str:
+    """
+    Get a personalized nutrition plan from the nutrition agent.
+
+    Args:
+        user_goals: The user's nutrition/health goals (e.g., "weight loss", "muscle gain", "maintain weight"); empty to use the profile's
+        dietary_restrictions: Any dietary restrictions or allergies (e.g., "vegetarian", "gluten-free", "lactose intolerant")
+        nutritional_needs: Specific nutritional requirements (e.g., "high protein", "low carb", "2000 calories")
+        client_profile_id: Id of a registered client profile; its compact form is sent instead of restating client details (optional)
+        refresh: Run the agent again even if this session already has a result for the same request
+
+    Returns:
+        A detailed nutrition plan from the nutrition agent
+    """
+    return await _run_team_call_async('nutrition', lambda: _nutrition_call(user_goals, dietary_restrictions, nutritional_needs, client_profile_id, refresh, tool_context))
+
+
+def get_nutrition_plan_from_nutrition_agent(user_goals: str = "", dietary_restrictions: str = "", nutritional_needs: str = "", client_profile_id: str = "", refresh: bool = False, tool_context: ToolContext = None) -> str:
+    """Blocking get_nutrition_plan_from_nutrition_agent_async, for callers without an event loop"""
+    return _run_team_call('nutrition', lambda: _nutrition_call(user_goals, dietary_restrictions, nutritional_needs, client_profile_id, refresh, tool_context))
+
+
+async def get_client_information_from_reception_async(
+    client_name: str = "",
+    additional_questions: str = "",
+    client_profile_id: str = "",
+    refresh: bool = False,
+    tool_context: ToolContext = None
+) -> str:
+    """
+    Get comprehensive client information from the reception agent.
+
+    Args:
+        client_name: Name of the client (optional)
+        additional_questions: Any specific information needed beyond standard intake
+        client_profile_id: Id of a registered client profile; its compact form is sent instead of restating client details (optional)
+        refresh: Run the agent again even if this session already has a result for the same request
+
+    Returns:
+        Comprehensive client information profile
+    """
+    return await _run_team_call_async('reception', lambda: _reception_call(client_name, additional_questions, client_profile_id, refresh, tool_context))
+
+
+def get_client_information_from_reception(
+    client_name: str = "",
+    additional_questions: str = "",
+    client_profile_id: str = "",
+    refresh: bool = False,
+    tool_context: ToolContext = None
+) -> str:
+    """Blocking get_client_information_from_reception_async, for callers without an event loop"""
+    return _run_team_call('reception', lambda: _reception_call(client_name, additional_questions, client_profile_id, refresh, tool_context))
+
+
+async def get_body_analysis_from_scanner_async(
+    body_images: str = "",
+    mobility_test_request: str = "",
+    assessment_type: str = "",
+    client_profile_id: str = "",
+    refresh: bool = False,
+    tool_context: ToolContext = None
+) -> str:
+    """
+    Get body analysis and mobility assessment from the body scanner agent.
+
+    Args:
+        body_images: Description of the body images, or image file paths separated by commas (sent downscaled and without metadata)
+        mobility_test_request: Specific mobility tests to conduct
+        assessment_type: Type of assessment (comprehensive, postural, mobility, performance; default: comprehensive)
+        client_profile_id: Id of a registered client profile; its compact form is sent instead of restating client details (optional)
+        refresh: Run the agent again even if this session already has a result for the same request
+
+    Returns:
+        Detailed body analysis and recommendations
+    """
+    return await _run_team_call_async('body_scanner', lambda: _body_scanner_call(body_images, mobility_test_request, assessment_type, client_profile_id, refresh, tool_context))
+
+
+def get_body_analysis_from_scanner(
+    body_images: str = "",
+    mobility_test_request: str = "",
+    assessment_type: str = "",
+    client_profile_id: str = "",
+    refresh: bool = False,
+    tool_context: ToolContext = None
+) -> str:
+    """Blocking get_body_analysis_from_scanner_async, for callers without an event loop"""
+    return _run_team_call('body_scanner', lambda: _body_scanner_call(body_images, mobility_test_request, assessment_type, client_profile_id, refresh, tool_context))
 
 
 # These functions will be used directly as tools in the agent
 # ADK agents can use callable functions directly as tools
-
@@ -0,0 +1,192 @@
+"""
+Process-wide pool of long-lived Runners for agent-to-agent calls.
+
+Each sub-agent gets exactly one Runner, created on first use and reused for
+every later call. The pool owns its own session service so A2A calls never
+touch the sessions of the pipeline that triggered them. Responses go through
+the shared response cache, so repeated identical requests skip the model.
+"""
+import asyncio
+import sys
+import threading
+import uuid
+from pathlib import Path
+
+# Add parent directory to path for cross-agent imports
+_parent_dir = Path(__file__).parent.parent
+if str(_parent_dir) not in sys.path:
+    sys.path.insert(0, str(_parent_dir))
+
+from shared.agent_registry import get_agent, import_framework
+from shared.response_cache import cache_key_for_agent, get_response_cache
+from shared.session_manager import get_memory_service
+from shared.tracing import trace_span
+
+
+# Sub-agents reachable through the pool (resolved lazily by shared/agent_registry.py)
+SUB_AGENTS = ('reception_agent', 'body_scanner_agent', 'pt_agent', 'nutrition_agent', 'search_agent')
+
+# User id under which the pool's own sessions are created
+A2A_USER_ID = "head_coach"
+
+
+def event_text(event) -> str:
+    """Extract the text carried by a single runner event"""
+    content = getattr(event, 'content', None)
+    if content is None or not getattr(content, 'parts', None):
+        return ""
+    return "".join(part.text for part in content.parts if getattr(part, 'text', None))
+
+
+class AgentRunnerPool:
+    """Lazily builds one Runner per sub-agent and reuses it for every call"""
+
+    def __init__(self, session_service=None):
+        if session_service is None:
+            import_framework()
+            from google.adk.sessions import InMemorySessionService
+            session_service = InMemorySessionService()
+        self._session_service = session_service
+        self._runners = {}
+        self._lock = threading.Lock()
+
+    @property
+    def session_service(self):
+        return self._session_service
+
+    def get_runner(self, agent_name: str):
+        """
+        Return the pooled Runner for a sub-agent, creating it on first use.
+
+        Raises:
+            KeyError: If the agent is not a known sub-agent
+            ImportError: If the agent package cannot be imported
+        """
+        runner = self._runners.get(agent_name)
+        if runner is not None:
+            return runner
+        with self._lock:
+            runner = self._runners.get(agent_name)
+            if runner is None:
+                if agent_name not in SUB_AGENTS:
+                    raise KeyError(agent_name)
+                agent = get_agent(agent_name)
+                from google.adk import Runner
+                # No artifact service: pool sessions are single calls, deleted right after,
+                # so compaction keeps its summary in session state only
+                runner = Runner(
+                    agent=agent,
+                    app_name=agent.name,
+                    session_service=self._session_service,
+                    memory_service=get_memory_service()
+                )
+                self._runners[agent_name] = runner
+        return runner
+
+    def invoke(self, agent_name: str, prompt: str, user_id: str = A2A_USER_ID, extra_parts=None,
+               use_cache: bool = True) -> str:
+        """
+        Run a sub-agent synchronously on a throwaway session and return its text.
+
+        extra_parts (e.g. image parts) are sent after the prompt; the prompt alone
+        is the cache key, so it must identify them (e.g. by content hash). It may
+        be a callable returning the parts, called only on a cache miss.
+        use_cache=False bypasses the response cache (for callers with their own).
+        """
+        runner = self.get_runner(agent_name)
+        session_id = f"a2a_{uuid.uuid4().hex}"
+        attributes = {'gen_ai.agent.name': runner.app_name, 'prompt.chars': len(prompt), 'cache.hit': False}
+        with trace_span(f"agent {runner.app_name}", 'agent', attributes, session=(runner.app_name, user_id, session_id)) as span:
+            cache = get_response_cache() if use_cache else None
+            cache_key = cache_key_for_agent(runner.agent, prompt) if cache is not None else None
+            if cache is not None:
+                cached_text = cache.get(cache_key)
+                if cached_text is not None:
+                    if span is not None:
+                        span.attributes.update({'cache.hit': True, 'response.chars': len(cached_text)})
+                    return cached_text
+            from google.genai.types import Content, Part
+            if callable(extra_parts):
+                extra_parts = extra_parts()
+            self._session_service.create_session_sync(
+                app_name=runner.app_name,
+                user_id=user_id,
+                session_id=session_id
+            )
+            content = Content(parts=[Part(text=prompt), *(extra_parts or ())], role="user")
+            try:
+                chunks = [
+                    event_text(event)
+                    for event in runner.run(user_id=user_id, session_id=session_id, new_message=content)
+                ]
+            finally:
+                self._session_service.delete_session_sync(
+                    app_name=runner.app_name,
+                    user_id=user_id,
+                    session_id=session_id
+                )
+            response_text = "".join(chunks)
+            if span is not None:
+                span.attributes['response.chars'] = len(response_text)
+            if cache is not None and response_text:
+                cache.put(cache_key, runner.app_name, response_text)
+            return response_text
+
+    async def invoke_async(self, agent_name: str, prompt: str, user_id: str = A2A_USER_ID, extra_parts=None,
+                           use_cache: bool = True) -> str:
+        """
+        Run a sub-agent on the caller's event loop and return its text (see invoke for the options).
+
+        A callable extra_parts is run on a worker thread so reading the parts doesn't block the loop.
+        """
+        runner = self.get_runner(agent_name)
+        session_id = f"a2a_{uuid.uuid4().hex}"
+        attributes = {'gen_ai.agent.name': runner.app_name, 'prompt.chars': len(prompt), 'cache.hit': False}
+        with trace_span(f"agent {runner.app_name}", 'agent', attributes, session=(runner.app_name, user_id, session_id)) as span:
+            cache = get_response_cache() if use_cache else None
+            cache_key = cache_key_for_agent(runner.agent, prompt) if cache is not None else None
+            if cache is not None:
+                cached_text = cache.get(cache_key)
+                if cached_text is not None:
+                    if span is not None:
+                        span.attributes.update({'cache.hit': True, 'response.chars': len(cached_text)})
+                    return cached_text
+            from google.genai.types import Content, Part
+            if callable(extra_parts):
+                extra_parts = await asyncio.to_thread(extra_parts)
+            await self._session_service.create_session(
+                app_name=runner.app_name,
+                user_id=user_id,
+                session_id=session_id
+            )
+            content = Content(parts=[Part(text=prompt), *(extra_parts or ())], role="user")
+            chunks = []
+            try:
+                async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=content):
+                    chunks.append(event_text(event))
+            finally:
+                await self._session_service.delete_session(
+                    app_name=runner.app_name,
+                    user_id=user_id,
+                    session_id=session_id
+                )
+            response_text = "".join(chunks)
+            if span is not None:
+                span.attributes['response.chars'] = len(response_text)
+            if cache is not None and response_text:
+                cache.put(cache_key, runner.app_name, response_text)
+            return response_text
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_agent_pool() -> AgentRunnerPool:
+    """Return the process-wide runner pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = AgentRunnerPool()
+    return _pool
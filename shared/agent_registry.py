@@ -0,0 +1,145 @@
+"""
+Lazy registry of the FitTelligence agents.
+
+Agents are resolved by name on first use: the registry imports the agent's
+package only then (which constructs its Agent) and caches the result, so a
+worker that needs one agent never pays for the other four. The agent packages
+themselves resolve their attributes lazily as well (module __getattr__), which
+keeps `import pt_agent` cheap for ADK web and other loaders.
+
+Every load is timed, with the one-off google.adk import measured separately,
+and startup_report() summarizes where cold-start time went. The entry points
+and shared modules import google.adk only inside the functions that use it,
+calling import_framework() first, so that import is timed here too.
+"""
+import importlib
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add parent directory to path for agent package imports
+_parent_dir = Path(__file__).parent.parent
+if str(_parent_dir) not in sys.path:
+    sys.path.insert(0, str(_parent_dir))
+
+
+# Agent name -> (package, attribute), in pipeline order; agent names double as app names
+AGENT_PACKAGES = {
+    'reception_agent': ('reception_agent', 'reception_agent'),
+    'body_scanner_agent': ('body_scanner_agent', 'body_scanner_agent'),
+    'pt_agent': ('pt_agent', 'pt_agent'),
+    'nutrition_agent': ('nutrition_agent', 'nutrition_agent'),
+    'head_coach_agent': ('head_coach_agent', 'head_coach_agent'),
+    'search_agent': ('shared.search_agent', 'search_agent'),
+}
+
+# The five agents of the coaching pipeline (the search agent only serves web_search)
+PIPELINE_AGENT_NAMES = tuple(name for name in AGENT_PACKAGES if name != 'search_agent')
+
+# Imported once before the first agent so its cost is reported on its own line
+_FRAMEWORK_MODULE = 'google.adk.agents.llm_agent'
+
+_REGISTRY_IMPORTED_AT = time.perf_counter()
+
+
+class AgentRegistry:
+    """Imports and caches agents by name on first use, timing each load"""
+
+    def __init__(self, packages: dict = None):
+        self._packages = dict(packages or AGENT_PACKAGES)
+        self._agents = {}
+        self._load_seconds = {}
+        self._framework_seconds = None
+        self._framework_checked = False
+        self._lock = threading.RLock()
+
+    def __contains__(self, agent_name: str) -> bool:
+        return agent_name in self._packages
+
+    @property
+    def names(self) -> tuple:
+        return tuple(self._packages)
+
+    def is_loaded(self, agent_name: str) -> bool:
+        return agent_name in self._agents
+
+    def _import_framework(self):
+        if self._framework_checked:
+            return
+        if _FRAMEWORK_MODULE not in sys.modules:
+            start = time.perf_counter()
+            importlib.import_module(_FRAMEWORK_MODULE)
+            self._framework_seconds = time.perf_counter() - start
+        self._framework_checked = True
+
+    def get(self, agent_name: str):
+        """
+        Return the agent, importing its package on first use.
+
+        Raises:
+            KeyError: If the agent name is not registered
+            ImportError: If the agent package cannot be imported
+        """
+        agent = self._agents.get(agent_name)
+        if agent is not None:
+            return agent
+        package, attribute = self._packages[agent_name]
+        with self._lock:
+            agent = self._agents.get(agent_name)
+            if agent is None:
+                self._import_framework()
+                start = time.perf_counter()
+                agent = getattr(importlib.import_module(package), attribute)
+                self._load_seconds[agent_name] = time.perf_counter() - start
+                self._agents[agent_name] = agent
+        return agent
+
+    def preload(self, agent_names=None) -> dict:
+        """Load the given agents (default: all) now, e.g. while a worker warms up"""
+        return {name: self.get(name) for name in (agent_names or self._packages)}
+
+    def load_times(self) -> dict:
+        """
+        Seconds spent per load step, in load order.
+
+        "google.adk" is the framework import, listed only if the registry triggered it.
+        """
+        times = {} if self._framework_seconds is None else {'google.adk': self._framework_seconds}
+        times.update(self._load_seconds)
+        return times
+
+    def startup_report(self) -> str:
+        """Summarize framework import and per-agent construction times"""
+        times = self.load_times()
+        if not times:
+            return "⏱️  Startup: no agents loaded"
+        lines = [f"⏱️  Startup: {len(self._agents)}/{len(self._packages)} agents loaded in {sum(times.values()) * 1000:.0f} ms"]
+        for name, seconds in times.items():
+            lines.append(f"   {name:<20} {seconds * 1000:8.1f} ms")
+        lines.append(f"   wall clock since registry import: {(time.perf_counter() - _REGISTRY_IMPORTED_AT) * 1000:.0f} ms")
+        return "\n".join(lines)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_agent_registry() -> AgentRegistry:
+    """Return the process-wide agent registry"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = AgentRegistry()
+    return _registry
+
+
+def import_framework():
+    """Import google.adk through the registry so its one-off cost is reported as the "google.adk" step"""
+    get_agent_registry()._import_framework()
+
+
+def get_agent(agent_name: str):
+    """Return a registered agent by name, loading it on first use"""
+    return get_agent_registry().get(agent_name)
@@ -0,0 +1,222 @@
+"""
+Per-session blackboard of stage outputs ("artifacts").
+
+Every pipeline stage records its response here under the session it ran in,
+with a content hash, its size and a bounded digest. The head coach receives
+the digests in its prompt, and the A2A tools in shared/agent_communication.py
+look the stage up before invoking a sub-agent: the first request returns the
+stored text, later requests in the same session a compact reference, so work
+that was just done is never run again.
+
+Each artifact carries the key of the request that produced it: "" for
+pipeline stages (produced from the intake), a hash of the tool arguments for
+A2A runs. Artifacts are stored per (stage, request), so a follow-up with new
+requirements runs the agent again and is kept next to the pipeline's own
+output instead of replacing it; the head coach digests show pipeline outputs
+only.
+
+Stages run as separate apps but share user_id and session_id, so an artifact
+is addressed by (user_id, session_id, stage, request). Registered client profiles are
+linked to their session, which lets a tool call resolve artifacts from its
+client_profile_id as well.
+"""
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+# Add parent directory to path for shared modules
+_parent_dir = Path(__file__).parent.parent
+if str(_parent_dir) not in sys.path:
+    sys.path.insert(0, str(_parent_dir))
+
+from shared.client_profile import digest_text
+
+
+# Sessions kept in the process-wide store (least recently used are dropped)
+MAX_STORED_SESSIONS = 500
+
+# Characters per artifact digest in the head coach prompt
+ARTIFACT_DIGEST_CHARS = 600
+
+# Pipeline stage -> agent that produces it
+STAGE_AGENTS = {
+    'reception': 'reception_agent',
+    'body_scanner': 'body_scanner_agent',
+    'pt': 'pt_agent',
+    'nutrition': 'nutrition_agent',
+    'head_coach': 'head_coach_agent',
+}
+
+
+@dataclass(frozen=True)
+class Artifact:
+    stage: str
+    agent_name: str
+    text: str
+    sha256: str
+    size_chars: int
+    digest: str
+    created_at: float
+    request: str = ""
+
+    @classmethod
+    def create(cls, stage: str, text: str, agent_name: str = "", request: str = "") -> "Artifact":
+        return cls(
+            stage=stage,
+            agent_name=agent_name or STAGE_AGENTS.get(stage, stage),
+            text=text,
+            sha256=hashlib.sha256(text.encode('utf-8')).hexdigest(),
+            size_chars=len(text),
+            digest=digest_text(text, ARTIFACT_DIGEST_CHARS),
+            created_at=time.time(),
+            request=request,
+        )
+
+    @property
+    def reference(self) -> str:
+        """Short, stable identifier such as "pt@3f2a9c1b" """
+        return f"{self.stage}@{self.sha256[:8]}"
+
+    def describe(self) -> str:
+        """One digest line for prompts"""
+        return f"- {self.reference} ({self.agent_name}, {self.size_chars:,} chars): {self.digest}"
+
+
+class ArtifactStore:
+    """Thread-safe, bounded store of stage artifacts per (user_id, session_id)"""
+
+    def __init__(self, max_sessions: int = MAX_STORED_SESSIONS):
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._delivered = {}
+        self._profile_sessions = {}
+        self._lock = threading.Lock()
+        self.stats = {'stored': 0, 'reused': 0, 'referenced': 0, 'duplicate_runs': 0}
+
+    def put(self, user_id: str, session_id: str, stage: str, text: str, agent_name: str = "",
+            request: str = "") -> Optional[Artifact]:
+        """
+        Record a stage output; empty outputs (failed or timed-out stages) are not stored.
+
+        request is the key of the request that produced the text ("" for the
+        pipeline stage itself, see request_key).
+        """
+        if not text or not text.strip():
+            return None
+        key = (user_id, session_id)
+        existing = self.get(user_id, session_id, stage, request)
+        if existing is not None and existing.text == text:
+            return existing
+        artifact = Artifact.create(stage, text, agent_name, request)
+        with self._lock:
+            artifacts = self._sessions.setdefault(key, {})
+            artifacts[(stage, request)] = artifact
+            self._sessions.move_to_end(key)
+            # A changed artifact has not been delivered in its new form yet
+            self._delivered.get(key, set()).discard((stage, request))
+            self.stats['stored'] += 1
+            while len(self._sessions) > self.max_sessions:
+                evicted, _ = self._sessions.popitem(last=False)
+                self._delivered.pop(evicted, None)
+                self._profile_sessions = {p: s for p, s in self._profile_sessions.items() if s != evicted}
+        return artifact
+
+    def get(self, user_id: str, session_id: str, stage: str, request: str = "") -> Optional[Artifact]:
+        """Return the artifact a request produced for a stage (default: the pipeline's own output)"""
+        with self._lock:
+            return self._sessions.get((user_id, session_id), {}).get((stage, request))
+
+    def artifacts(self, user_id: str, session_id: str) -> list:
+        """Pipeline stage artifacts (request "") of a session in pipeline stage order"""
+        with self._lock:
+            artifacts = [a for a in self._sessions.get((user_id, session_id), {}).values() if not a.request]
+        order = list(STAGE_AGENTS)
+        return sorted(artifacts, key=lambda a: order.index(a.stage) if a.stage in order else len(order))
+
+    def link_profile(self, profile_id: str, user_id: str, session_id: str):
+        """Let tool calls that only carry a client_profile_id find this session's artifacts"""
+        with self._lock:
+            self._profile_sessions[profile_id] = (user_id, session_id)
+
+    def resolve_session(self, session_key: Optional[tuple], client_profile_id: str = "") -> Optional[tuple]:
+        """Return the session key to read from: the caller's session, else the profile's"""
+        with self._lock:
+            if session_key is not None and session_key in self._sessions:
+                return session_key
+            return self._profile_sessions.get((client_profile_id or '').strip())
+
+    def checkout(self, session_key: tuple, stage: str, request: str = "") -> Optional[str]:
+        """
+        Return the artifact a request produced for a stage: its full text the
+        first time, a compact reference with its digest afterwards, or None if
+        that request has no stored artifact.
+        """
+        with self._lock:
+            artifact = self._sessions.get(session_key, {}).get((stage, request))
+            if artifact is None:
+                return None
+            delivered = self._delivered.setdefault(session_key, set())
+            if (stage, request) in delivered:
+                self.stats['referenced'] += 1
+                return (f"[artifact {artifact.reference} unchanged; its full text was returned earlier in this "
+                        f"session] {artifact.digest}")
+            delivered.add((stage, request))
+            self.stats['reused'] += 1
+        return f"[artifact {artifact.reference}, produced earlier in this session]\n\n{artifact.text}"
+
+    def record_run(self, session_key: Optional[tuple], stage: str, text: str, agent_name: str = "",
+                   request: str = ""):
+        """Store the output of an A2A sub-agent run, counting it if it replaced an artifact of the same request"""
+        if session_key is None:
+            return
+        replaced = self.get(*session_key, stage, request) is not None
+        if self.put(*session_key, stage, text, agent_name, request) is None:
+            return
+        with self._lock:
+            if replaced:
+                self.stats['duplicate_runs'] += 1
+            self._delivered.setdefault(session_key, set()).add((stage, request))
+
+    def digest_section(self, user_id: str, session_id: str, stages=None) -> str:
+        """Digest lines for the given stages (default: all) of a session, or an empty string"""
+        artifacts = [a for a in self.artifacts(user_id, session_id) if stages is None or a.stage in stages]
+        return "\n".join(artifact.describe() for artifact in artifacts)
+
+    def summary(self) -> str:
+        """One-line counter summary for run reports"""
+        stats = self.stats
+        return (f"Artifacts: {stats['stored']} stored, {stats['reused']} reused and {stats['referenced']} referenced "
+                f"by team tools, {stats['duplicate_runs']} duplicate sub-agent runs")
+
+
+def request_key(*arguments) -> str:
+    """
+    Key of an A2A request from the tool arguments that can carry requirements.
+
+    Returns "" when every argument is empty, i.e. a plain request for the stage
+    that the pipeline's own output answers; otherwise a hash of the arguments
+    with case and whitespace normalized.
+    """
+    normalized = [" ".join(str(argument or "").lower().split()) for argument in arguments]
+    if not any(normalized):
+        return ""
+    return hashlib.sha256("\x1f".join(normalized).encode('utf-8')).hexdigest()[:16]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    """Return the process-wide artifact store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ArtifactStore()
+    return _store
@@ -0,0 +1,204 @@
+"""
+Typed client profile shared by every pipeline stage.
+
+The intake dict collected by demo.py is parsed once into a ClientProfile. Each
+later stage embeds the same compact, stable serialization instead of
+re-describing the client in prose, and the reception agent's output travels
+forward as a bounded digest. Profiles are registered in a process-wide store
+so the A2A tools can receive them by reference (client_profile_id) rather than
+having the head coach restate them.
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Optional
+
+
+PROFILE_FORMAT_VERSION = 1
+
+# Upper bound on the reception digest carried in every downstream prompt
+MAX_DIGEST_CHARS = 600
+
+# Number of profiles kept in the process-wide store
+MAX_STORED_PROFILES = 10000
+
+# Fallbacks mirror the defaults of collect_client_information() in demo.py
+_DEFAULT_AGE = 30
+_DEFAULT_WEIGHT_KG = 70.0
+_DEFAULT_HEIGHT_CM = 170.0
+
+_EQUIPMENT_TIERS = (
+    ('bodyweight', 'bodyweight only'),
+    ('limited', 'limited equipment (dumbbells, bands)'),
+    ('home', 'home gym'),
+    ('full', 'full gym'),
+)
+
+_NONE_VALUES = {'', 'none', 'n/a', 'na', 'no'}
+
+
+def _to_number(value, default: float) -> float:
+    match = re.search(r'\d+(?:\.\d+)?', str(value))
+    return float(match.group()) if match else default
+
+
+def _clean_optional(value) -> str:
+    text = " ".join(str(value or '').split())
+    return "" if text.lower() in _NONE_VALUES else text
+
+
+def _experience_level(value: str) -> str:
+    text = str(value or '').lower()
+    for level in ('beginner', 'intermediate', 'advanced'):
+        if level in text:
+            return level
+    return 'intermediate'
+
+
+def _equipment_tier(value: str) -> str:
+    text = str(value or '').lower()
+    for keyword, tier in _EQUIPMENT_TIERS:
+        if keyword in text:
+            return tier
+    return " ".join(str(value or '').split()) or 'full gym'
+
+
+# Leading markdown list/heading/quote markers (not the text's own numbers)
+_LIST_MARKER_RE = re.compile(r'^\s*(?:[#>*-]+|\d+[.)])(?:\s+|$)')
+
+
+def digest_text(text: str, max_chars: int = MAX_DIGEST_CHARS) -> str:
+    """
+    Condense an agent response into a bounded, single-paragraph digest.
+
+    Markdown decoration (headings, quotes, bullets, numbered-list markers and
+    bold) is dropped and whole lines are kept in order until the character
+    budget is reached. Numbers that start a line's text are kept:
+
+    >>> digest_text("## Plan\\n1. 30 min cardio\\n- **3x10** squats")
+    'Plan; 30 min cardio; 3x10 squats'
+    """
+    pieces = []
+    used = 0
+    for line in str(text or '').splitlines():
+        line = _LIST_MARKER_RE.sub('', line).replace('**', '').strip()
+        if not line:
+            continue
+        if used + len(line) + 2 > max_chars:
+            remaining = max_chars - used - 2
+            if remaining > 20:
+                pieces.append(line[:remaining].rstrip() + "…")
+            break
+        pieces.append(line)
+        used += len(line) + 2
+    return "; ".join(pieces)
+
+
+@dataclass(frozen=True)
+class ClientProfile:
+    """Normalized client intake with a compact, stable serialization"""
+    name: str
+    age: int
+    weight_kg: float
+    height_cm: float
+    gender: str
+    activity_level: str
+    experience: str
+    fitness_goals: tuple = field(default_factory=tuple)
+    equipment: str = 'full gym'
+    medical_conditions: str = ''
+    additional_notes: str = ''
+    reception_digest: str = ''
+
+    @classmethod
+    def from_client_info(cls, client_info: dict) -> "ClientProfile":
+        """Parse the intake dict used by demo.format_client_message"""
+        goals = tuple(
+            goal.strip() for goal in str(client_info.get('fitness_goals', '')).split(',') if goal.strip()
+        )
+        return cls(
+            name=" ".join(str(client_info.get('name', '') or 'Client').split()),
+            age=int(_to_number(client_info.get('age'), _DEFAULT_AGE)),
+            weight_kg=_to_number(client_info.get('weight'), _DEFAULT_WEIGHT_KG),
+            height_cm=_to_number(client_info.get('height'), _DEFAULT_HEIGHT_CM),
+            gender=str(client_info.get('gender', '') or 'Other').strip().lower(),
+            activity_level=str(client_info.get('activity_level', '') or 'Moderately Active').strip(),
+            experience=_experience_level(client_info.get('experience')),
+            fitness_goals=goals,
+            equipment=_equipment_tier(client_info.get('equipment')),
+            medical_conditions=_clean_optional(client_info.get('medical_conditions')),
+            additional_notes=_clean_optional(client_info.get('additional_notes')),
+        )
+
+    def with_reception_digest(self, reception_response: str) -> "ClientProfile":
+        """Return a copy carrying a bounded digest of the reception agent's output"""
+        return replace(self, reception_digest=digest_text(reception_response))
+
+    def to_compact(self) -> str:
+        """
+        Serialize the profile as one stable line (plus the reception digest, if any).
+
+        Field order and number formatting are fixed so identical profiles always
+        produce byte-identical prompts.
+        """
+        fields = [
+            f"name={self.name}",
+            f"age={self.age}",
+            f"sex={self.gender}",
+            f"weight_kg={self.weight_kg:g}",
+            f"height_cm={self.height_cm:g}",
+            f"activity={self.activity_level}",
+            f"experience={self.experience}",
+            f"goals={', '.join(self.fitness_goals) or 'general fitness'}",
+            f"equipment={self.equipment}",
+            f"medical={self.medical_conditions or 'none'}",
+            f"notes={self.additional_notes or 'none'}",
+        ]
+        compact = f"[client v{PROFILE_FORMAT_VERSION}] " + "; ".join(fields)
+        if self.reception_digest:
+            compact += f"\n[intake digest] {self.reception_digest}"
+        return compact
+
+    @property
+    def profile_id(self) -> str:
+        """Content hash of the compact serialization"""
+        return hashlib.sha256(self.to_compact().encode('utf-8')).hexdigest()[:16]
+
+    def to_client_info(self) -> dict:
+        """Convert back to the intake dict shape used by demo.py"""
+        return {
+            'name': self.name,
+            'age': str(self.age),
+            'weight': f"{self.weight_kg:g}",
+            'height': f"{self.height_cm:g}",
+            'gender': self.gender.capitalize(),
+            'activity_level': self.activity_level,
+            'fitness_goals': ", ".join(self.fitness_goals),
+            'experience': self.experience.capitalize(),
+            'equipment': self.equipment,
+            'medical_conditions': self.medical_conditions or 'None',
+            'additional_notes': self.additional_notes or 'None',
+        }
+
+
+_profiles = OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+def register_profile(profile: ClientProfile) -> str:
+    """Store a profile in the process-wide store and return its id"""
+    profile_id = profile.profile_id
+    with _profiles_lock:
+        _profiles[profile_id] = profile
+        _profiles.move_to_end(profile_id)
+        while len(_profiles) > MAX_STORED_PROFILES:
+            _profiles.popitem(last=False)
+    return profile_id
+
+
+def get_profile(profile_id: str) -> Optional[ClientProfile]:
+    """Look up a registered profile by id"""
+    with _profiles_lock:
+        return _profiles.get((profile_id or '').strip())
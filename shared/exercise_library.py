@@ -0,0 +1,238 @@
+"""
+Bundled exercise library with inverted-index lookup for the PT agent.
+
+The exercises in shared/data/exercises.json are loaded once per process and
+indexed by equipment tier, muscle group, movement pattern, difficulty and
+contraindication. Each index maps a value to a bitset (a Python int with one
+bit per exercise), so a query is a handful of AND / AND NOT operations and
+returns candidates in microseconds instead of a search call.
+
+Equipment tiers mirror the choices in demo.collect_client_information: an
+exercise is available in a tier when the tier provides all of its equipment.
+"""
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Optional
+
+
+EXERCISES_PATH = Path(__file__).parent / 'data' / 'exercises.json'
+
+DIFFICULTY_LEVELS = ('beginner', 'intermediate', 'advanced')
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+# Keywords of the intake equipment choices -> tier keys in exercises.json
+_TIER_KEYWORDS = (
+    ('bodyweight', 'bodyweight'),
+    ('limited', 'limited'),
+    ('home', 'home'),
+    ('full', 'full'),
+    ('gym', 'full'),
+)
+
+# Broad muscle groups expand to the muscles used in the data file
+MUSCLE_GROUP_ALIASES = {
+    'legs': ('quads', 'glutes', 'hamstrings', 'calves', 'adductors'),
+    'lower body': ('quads', 'glutes', 'hamstrings', 'calves', 'adductors'),
+    'back': ('lats', 'upper back', 'lower back'),
+    'arms': ('biceps', 'triceps'),
+    'abs': ('core', 'obliques'),
+    'delts': ('shoulders', 'rear delts'),
+    'pecs': ('chest',),
+    'quadriceps': ('quads',),
+    'glute': ('glutes',),
+    'hamstring': ('hamstrings',),
+    'lat': ('lats',),
+    'calf': ('calves',),
+}
+
+# Words in injury descriptions -> contraindication keys
+_INJURY_ALIASES = {
+    'back': 'lower back',
+    'spine': 'lower back',
+    'lumbar': 'lower back',
+    'knees': 'knee',
+    'shoulders': 'shoulder',
+    'rotator': 'shoulder',
+    'wrists': 'wrist',
+    'hips': 'hip',
+    'elbows': 'elbow',
+    'ankles': 'ankle',
+}
+
+
+def _iter_bits(mask: int):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def equipment_tier_key(value: str) -> Optional[str]:
+    """Map an intake equipment choice (e.g. "Home gym (weights, bench, etc.)") to a tier key"""
+    text = str(value or '').lower()
+    for keyword, tier in _TIER_KEYWORDS:
+        if keyword in text:
+            return tier
+    return None
+
+
+def _split_terms(value: str) -> list:
+    return [term.strip().lower() for term in re.split(r'[,;/]| and ', str(value or '')) if term.strip()]
+
+
+class ExerciseLibrary:
+    """Exercises with bitset inverted indexes over their attributes"""
+
+    def __init__(self, exercises: list, equipment_tiers: dict):
+        self.exercises = exercises
+        self.all_mask = (1 << len(exercises)) - 1
+        self.by_muscle = {}
+        self.by_pattern = {}
+        self.by_difficulty = {}
+        self.by_contraindication = {}
+        for index, exercise in enumerate(exercises):
+            bit = 1 << index
+            for muscle in exercise['muscles']:
+                self.by_muscle[muscle] = self.by_muscle.get(muscle, 0) | bit
+            self.by_pattern[exercise['pattern']] = self.by_pattern.get(exercise['pattern'], 0) | bit
+            self.by_difficulty[exercise['difficulty']] = self.by_difficulty.get(exercise['difficulty'], 0) | bit
+            for area in exercise['contraindications']:
+                self.by_contraindication[area] = self.by_contraindication.get(area, 0) | bit
+
+        # "Up to" difficulty: a beginner gets beginner exercises, intermediate adds intermediate, ...
+        self.up_to_difficulty = {}
+        cumulative = 0
+        for level in DIFFICULTY_LEVELS:
+            cumulative |= self.by_difficulty.get(level, 0)
+            self.up_to_difficulty[level] = cumulative
+
+        self.by_tier = {}
+        for tier, available in equipment_tiers.items():
+            available = set(available)
+            self.by_tier[tier] = sum(
+                1 << index for index, exercise in enumerate(exercises) if set(exercise['equipment']) <= available
+            )
+
+    @classmethod
+    def load(cls, path=EXERCISES_PATH) -> "ExerciseLibrary":
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['exercises'], data['equipment_tiers'])
+
+    def _muscle_mask(self, muscle_group: str) -> int:
+        mask = 0
+        for term in _split_terms(muscle_group):
+            muscles = MUSCLE_GROUP_ALIASES.get(term, (term,))
+            unknown = [muscle for muscle in muscles if muscle not in self.by_muscle]
+            if unknown:
+                raise ValueError(
+                    f"Unknown muscle group {term!r}; known: {', '.join(sorted(set(self.by_muscle) | set(MUSCLE_GROUP_ALIASES)))}"
+                )
+            for muscle in muscles:
+                mask |= self.by_muscle[muscle]
+        return mask
+
+    def _pattern_mask(self, movement_pattern: str) -> int:
+        mask = 0
+        for term in _split_terms(movement_pattern):
+            if term not in self.by_pattern:
+                raise ValueError(f"Unknown movement pattern {term!r}; known: {', '.join(sorted(self.by_pattern))}")
+            mask |= self.by_pattern[term]
+        return mask
+
+    def contraindication_areas(self, avoid: str) -> list:
+        """Extract the contraindication keys mentioned in free text such as "lower back pain, bad knees" """
+        text = " ".join(re.findall(r'[a-z]+', str(avoid or '').lower()))
+        areas = {area for area in self.by_contraindication if re.search(rf'\b{area}\b', text)}
+        for word in text.split():
+            if word in _INJURY_ALIASES:
+                areas.add(_INJURY_ALIASES[word])
+        return sorted(areas)
+
+    def search(self, equipment: str = "", muscle_group: str = "", movement_pattern: str = "",
+               difficulty: str = "", avoid: str = "", limit: int = DEFAULT_LIMIT) -> tuple:
+        """
+        Intersect the indexes for the given filters; empty filters match everything.
+
+        Returns:
+            Tuple of (total number of matches, list of up to limit exercises in library order)
+
+        Raises:
+            ValueError: If a filter value is not in the library
+        """
+        mask = self.all_mask
+        if equipment:
+            tier = equipment_tier_key(equipment)
+            if tier is None:
+                raise ValueError(f"Unknown equipment tier {equipment!r}; use bodyweight only, limited equipment, home gym or full gym")
+            mask &= self.by_tier[tier]
+        if muscle_group:
+            mask &= self._muscle_mask(muscle_group)
+        if movement_pattern:
+            mask &= self._pattern_mask(movement_pattern)
+        if difficulty:
+            level = next((level for level in DIFFICULTY_LEVELS if level in difficulty.lower()), None)
+            if level is None:
+                raise ValueError(f"Unknown difficulty {difficulty!r}; use {', '.join(DIFFICULTY_LEVELS)}")
+            mask &= self.up_to_difficulty[level]
+        for area in self.contraindication_areas(avoid):
+            mask &= ~self.by_contraindication[area]
+
+        matches = []
+        for index in _iter_bits(mask):
+            if len(matches) >= limit:
+                break
+            matches.append(dict(self.exercises[index]))
+        return bin(mask).count('1'), matches
+
+
+_library = None
+_library_lock = threading.Lock()
+
+
+def get_exercise_library() -> ExerciseLibrary:
+    """Return the process-wide exercise library, loading it on first use"""
+    global _library
+    if _library is None:
+        with _library_lock:
+            if _library is None:
+                _library = ExerciseLibrary.load()
+    return _library
+
+
+def find_exercises(
+    equipment: str = "full gym",
+    muscle_group: str = "",
+    movement_pattern: str = "",
+    difficulty: str = "",
+    avoid: str = "",
+    limit: int = DEFAULT_LIMIT,
+) -> dict:
+    """
+    Find candidate exercises in the bundled exercise library.
+
+    Args:
+        equipment: Client's equipment tier (full gym, home gym, limited equipment, bodyweight only)
+        muscle_group: Target muscles, comma-separated (e.g., "glutes, hamstrings", "back", "legs"); empty for any
+        movement_pattern: squat, hinge, lunge, horizontal push, vertical push, horizontal pull, vertical pull,
+            core, carry, isolation, conditioning or mobility; comma-separated for several; empty for any
+        difficulty: Highest difficulty to include (beginner, intermediate, advanced); empty for any
+        avoid: Injuries or limitations to exclude exercises for (e.g., "lower back pain, knee")
+        limit: Maximum number of exercises to return (default 10, at most 50)
+
+    Returns:
+        Dictionary with status "success", the total number of matches and the
+        returned exercises, or status "error" and an error_message
+    """
+    try:
+        total, exercises = get_exercise_library().search(
+            equipment, muscle_group, movement_pattern, difficulty, avoid,
+            limit=max(1, min(int(limit), MAX_LIMIT)),
+        )
+    except ValueError as e:
+        return {'status': 'error', 'error_message': str(e)}
+    return {'status': 'success', 'total_matches': total, 'exercises': exercises}
@@ -0,0 +1,273 @@
+"""
+Offline, deterministic stand-in for the Gemini model.
+
+FakeLlm implements ADK's BaseLlm so agents run unchanged through Runner,
+sessions, tools and event parsing, but no request leaves the process. It
+simulates latency (fixed, uniform or lognormal), streams output at a
+configurable token rate and fills per-agent response templates. When the
+request offers A2A tools (names matching tool_pattern) it first answers with
+function calls to them, so the head coach's tool-calling path runs as well:
+each call passes the client_profile_id named in the prompt and, for about half
+of the calls, sample requirements for the tool's known string parameters, so
+both stored-artifact answers and new sub-agent requests are exercised.
+
+Randomness is seeded from the configured seed and a hash of the prompt, so the
+same prompt always yields the same response and latency sample regardless of
+scheduling order.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+from typing import AsyncGenerator, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+
+# Rough characters-per-token ratio used for prompt token accounting
+CHARS_PER_TOKEN = 4
+
+# Number of output tokens carried by each streamed chunk
+TOKENS_PER_CHUNK = 8
+
+_AGENT_NAME_PATTERN = re.compile(r'Your internal name is "([^"]+)"')
+
+# "Client profile (id 3f2a...; pass it as client_profile_id ...)" in the head coach prompt
+_PROFILE_ID_PATTERN = re.compile(r'\(id ([^;\s)]+);')
+
+# Requirements sent for the A2A tool parameters the fake model knows
+SAMPLE_ARGUMENTS = {
+    'user_goals': "build muscle and improve endurance",
+    'fitness_level': "intermediate",
+    'preferences': "prefers strength training, 4 sessions a week",
+    'dietary_restrictions': "lactose intolerant",
+    'nutritional_needs': "high protein",
+    'additional_questions': "weekly schedule and sleep habits",
+    'body_images': "front and side photos described by the client",
+    'mobility_test_request': "overhead squat and hip flexion tests",
+    'assessment_type': "postural",
+}
+
+_FILLER_WORDS = (
+    "focus", "progressive", "overload", "recovery", "protein", "mobility", "tempo", "volume",
+    "intensity", "hydration", "sleep", "consistency", "technique", "warm-up", "cooldown", "balance",
+    "strength", "endurance", "nutrition", "habit", "schedule", "review", "adjust", "track",
+)
+
+DEFAULT_TEMPLATES = {
+    'reception_agent': "## Client Profile Summary (offline stand-in)\n\nIntake received: {prompt_excerpt}\n\n{filler}",
+    'body_scanner_agent': "## Body & Movement Assessment (offline stand-in)\n\nAssessed: {prompt_excerpt}\n\n{filler}",
+    'pt_agent': "## 4-Week Training Plan (offline stand-in)\n\nPlanned for: {prompt_excerpt}\n\n{filler}",
+    'nutrition_agent': "## Nutrition Plan (offline stand-in)\n\nPlanned for: {prompt_excerpt}\n\n{filler}",
+    'head_coach_agent': "## Integrated Program (offline stand-in)\n\nIntegrating: {prompt_excerpt}\n{tool_summary}\n{filler}",
+    'search_agent': "- Search findings (offline stand-in) for: {prompt_excerpt}\n\n{filler}",
+}
+FALLBACK_TEMPLATE = "## {agent_name} response (offline stand-in)\n\n{prompt_excerpt}\n\n{filler}"
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _content_text(content: types.Content) -> str:
+    return "".join(part.text for part in (content.parts or []) if getattr(part, 'text', None))
+
+
+class FakeLlm(BaseLlm):
+    """Deterministic local model with simulated latency and token rate"""
+
+    latency_distribution: str = 'lognormal'
+    latency_mean_s: float = 0.5
+    latency_stddev_s: float = 0.2
+    tokens_per_second: float = 80.0
+    response_tokens: int = 300
+    seed: int = 0
+    tool_pattern: str = r'^get_.*_from_'
+    emit_function_calls: bool = True
+    templates: dict = {}
+
+    @classmethod
+    def supported_models(cls) -> list[str]:
+        return []
+
+    def _rng(self, prompt: str) -> random.Random:
+        digest = hashlib.sha256(f"{self.seed}:{prompt}".encode('utf-8')).hexdigest()
+        return random.Random(int(digest[:16], 16))
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """Draw the time-to-first-token delay from the configured distribution"""
+        mean = max(self.latency_mean_s, 0.0)
+        if self.latency_distribution == 'fixed' or mean == 0:
+            return mean
+        if self.latency_distribution == 'uniform':
+            return rng.uniform(max(mean - self.latency_stddev_s, 0.0), mean + self.latency_stddev_s)
+        # Lognormal parameterised by its mean and standard deviation
+        sigma_sq = math.log(1 + (self.latency_stddev_s / mean) ** 2)
+        mu = math.log(mean) - sigma_sq / 2
+        return rng.lognormvariate(mu, math.sqrt(sigma_sq))
+
+    def _agent_name(self, llm_request: LlmRequest) -> str:
+        system_instruction = getattr(llm_request.config, 'system_instruction', None) or ""
+        if not isinstance(system_instruction, str):
+            system_instruction = _content_text(system_instruction)
+        match = _AGENT_NAME_PATTERN.search(system_instruction)
+        return match.group(1) if match else 'agent'
+
+    def _function_calls(self, llm_request: LlmRequest, user_text: str, prompt_excerpt: str, rng: random.Random) -> list:
+        """
+        Build one call per matching tool.
+
+        client_profile_id comes from the user messages when they name one; the known
+        requirement parameters (SAMPLE_ARGUMENTS) are filled for about half of
+        the calls, and other required string parameters get the prompt excerpt.
+        """
+        pattern = re.compile(self.tool_pattern)
+        profile_match = _PROFILE_ID_PATTERN.search(user_text)
+        calls = []
+        for name, tool in (llm_request.tools_dict or {}).items():
+            if not pattern.search(name):
+                continue
+            declaration = tool._get_declaration()
+            if declaration is None:
+                continue
+            parameters = declaration.parameters
+            required = list(parameters.required or []) if parameters else []
+            properties = dict(parameters.properties or {}) if parameters else {}
+            with_requirements = rng.random() < 0.5
+            args = {arg_name: prompt_excerpt for arg_name in required}
+            for arg_name, schema in properties.items():
+                if getattr(schema, 'type', None) != types.Type.STRING:
+                    continue
+                if arg_name == 'client_profile_id':
+                    if profile_match:
+                        args[arg_name] = profile_match.group(1)
+                elif arg_name in SAMPLE_ARGUMENTS and with_requirements:
+                    args[arg_name] = SAMPLE_ARGUMENTS[arg_name]
+            calls.append(types.Part(function_call=types.FunctionCall(name=name, args=args)))
+        return calls
+
+    def _render(self, agent_name: str, prompt: str, tool_results: list, rng: random.Random) -> str:
+        template = self.templates.get(agent_name) or DEFAULT_TEMPLATES.get(agent_name, FALLBACK_TEMPLATE)
+        prompt_excerpt = " ".join(prompt.split())[:160]
+        tool_summary = ""
+        if tool_results:
+            tool_summary = "\nTeam input used: " + ", ".join(tool_results) + "\n"
+        filler = " ".join(rng.choice(_FILLER_WORDS) for _ in range(self.response_tokens))
+        return template.format(
+            agent_name=agent_name,
+            prompt_excerpt=prompt_excerpt,
+            tool_summary=tool_summary,
+            filler=filler,
+        )
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        contents = llm_request.contents or []
+        # Tool responses may be followed by injected context (e.g. preloaded memory),
+        # so collect them from everything after the model's last turn
+        turn_start = next((i + 1 for i in range(len(contents) - 1, -1, -1) if contents[i].role == 'model'), 0)
+        tool_results = [
+            part.function_response.name
+            for content in contents[turn_start:]
+            for part in (content.parts or [])
+            if getattr(part, 'function_response', None)
+        ]
+        prompt = next(
+            (_content_text(content) for content in reversed(contents) if content.role == 'user' and _content_text(content)),
+            ""
+        )
+        prompt_tokens = sum(_estimate_tokens(_content_text(content)) for content in contents)
+        rng = self._rng(prompt + "|" + ",".join(tool_results))
+        agent_name = self._agent_name(llm_request)
+
+        await asyncio.sleep(self.sample_latency(rng))
+
+        if self.emit_function_calls and not tool_results:
+            user_text = "\n".join(_content_text(content) for content in contents if content.role == 'user')
+            calls = self._function_calls(llm_request, user_text, " ".join(prompt.split())[:120], rng)
+            if calls:
+                yield LlmResponse(
+                    content=types.Content(role='model', parts=calls),
+                    usage_metadata=self._usage(prompt_tokens, len(calls) * 16),
+                    turn_complete=True,
+                )
+                return
+
+        text = self._render(agent_name, prompt, tool_results, rng)
+        words = text.split(" ")
+        output_tokens = len(words)
+        seconds_per_token = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+        if stream:
+            for start in range(0, len(words), TOKENS_PER_CHUNK):
+                chunk_words = words[start:start + TOKENS_PER_CHUNK]
+                await asyncio.sleep(len(chunk_words) * seconds_per_token)
+                chunk = " ".join(chunk_words) + (" " if start + TOKENS_PER_CHUNK < len(words) else "")
+                yield LlmResponse(
+                    content=types.Content(role='model', parts=[types.Part(text=chunk)]),
+                    partial=True,
+                )
+        else:
+            await asyncio.sleep(output_tokens * seconds_per_token)
+
+        yield LlmResponse(
+            content=types.Content(role='model', parts=[types.Part(text=text)]),
+            usage_metadata=self._usage(prompt_tokens, output_tokens),
+            partial=False,
+            turn_complete=True,
+        )
+
+    @staticmethod
+    def _usage(prompt_tokens: int, output_tokens: int) -> types.GenerateContentResponseUsageMetadata:
+        return types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=output_tokens,
+            total_token_count=prompt_tokens + output_tokens,
+        )
+
+
+def parse_latency_spec(spec: str) -> dict:
+    """
+    Parse a latency spec such as "lognormal:0.8,0.3", "uniform:0.5,0.2" or "fixed:0.1".
+
+    Returns:
+        FakeLlm field overrides
+    """
+    distribution, _, values = spec.partition(':')
+    distribution = distribution.strip().lower() or 'lognormal'
+    if distribution not in ('fixed', 'uniform', 'lognormal'):
+        raise ValueError(f"Unknown latency distribution: {distribution}")
+    numbers = [float(v) for v in values.split(',') if v.strip()] if values else []
+    overrides = {'latency_distribution': distribution}
+    if numbers:
+        overrides['latency_mean_s'] = numbers[0]
+    if len(numbers) > 1:
+        overrides['latency_stddev_s'] = numbers[1]
+    return overrides
+
+
+def fake_llm_from_env(model_name: str, environ: Optional[dict] = None) -> FakeLlm:
+    """Build a FakeLlm configured from FITTELLIGENCE_FAKE_* environment variables"""
+    env = os.environ if environ is None else environ
+    settings = {'model': model_name}
+    if env.get('FITTELLIGENCE_FAKE_LATENCY'):
+        settings.update(parse_latency_spec(env['FITTELLIGENCE_FAKE_LATENCY']))
+    if env.get('FITTELLIGENCE_FAKE_TOKENS_PER_SEC'):
+        settings['tokens_per_second'] = float(env['FITTELLIGENCE_FAKE_TOKENS_PER_SEC'])
+    if env.get('FITTELLIGENCE_FAKE_RESPONSE_TOKENS'):
+        settings['response_tokens'] = int(env['FITTELLIGENCE_FAKE_RESPONSE_TOKENS'])
+    if env.get('FITTELLIGENCE_FAKE_SEED'):
+        settings['seed'] = int(env['FITTELLIGENCE_FAKE_SEED'])
+    if env.get('FITTELLIGENCE_FAKE_FUNCTION_CALLS'):
+        settings['emit_function_calls'] = env['FITTELLIGENCE_FAKE_FUNCTION_CALLS'].strip().lower() not in ('0', 'off', 'false', 'no')
+    if env.get('FITTELLIGENCE_FAKE_RESPONSES'):
+        with open(env['FITTELLIGENCE_FAKE_RESPONSES'], encoding='utf-8') as f:
+            settings['templates'] = json.load(f)
+    return FakeLlm(**settings)
@@ -0,0 +1,309 @@
+"""
+Packaged food composition table and meal macro tools for the nutrition agent.
+
+shared/data/foods.csv holds nutrients per 100 g for common foods, with aliases,
+tags and a typical serving. On first use the numeric columns are compiled into
+a columnar float32 .npy file (one contiguous row per nutrient) in the cache
+directory and memory-mapped from then on; the file name carries a hash of the
+CSV, so editing the table recompiles it automatically. Names and aliases are
+indexed in a dict and tags as boolean masks.
+
+calculate_meal_macros totals a meal or a whole (multi-day) plan in one
+vectorized pass, so verifying a 7-day plan needs no search calls. find_foods
+lists foods by tag, optionally ranked by a nutrient.
+"""
+import csv
+import hashlib
+import os
+import re
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+
+FOODS_CSV_PATH = Path(__file__).parent / 'data' / 'foods.csv'
+DEFAULT_CACHE_DIR = Path.home() / '.cache' / 'fittelligence'
+
+NUTRIENTS = ('kcal', 'protein_g', 'carbs_g', 'fat_g', 'fiber_g')
+_SERVING_ROW = len(NUTRIENTS)
+
+# Grams per unit; cups and spoons use the food's own serving when it is measured that way
+UNIT_GRAMS = {
+    'g': 1.0, 'gram': 1.0, 'grams': 1.0,
+    'kg': 1000.0,
+    'oz': 28.35, 'ounce': 28.35, 'ounces': 28.35,
+    'lb': 453.6, 'lbs': 453.6, 'pound': 453.6, 'pounds': 453.6,
+    'ml': 1.0, 'l': 1000.0,
+    'cup': 240.0, 'cups': 240.0,
+    'tbsp': 15.0, 'tablespoon': 15.0, 'tablespoons': 15.0,
+    'tsp': 5.0, 'teaspoon': 5.0, 'teaspoons': 5.0,
+}
+_SPOON_UNITS = {'cup': 'cup', 'cups': 'cup', 'tbsp': 'tbsp', 'tablespoon': 'tbsp', 'tablespoons': 'tbsp'}
+
+_WORD_NUMBERS = {'a': 1.0, 'an': 1.0, 'one': 1.0, 'half': 0.5, 'two': 2.0, 'three': 3.0, 'four': 4.0}
+
+_VULGAR_FRACTIONS = {'½': 0.5, '⅓': 1 / 3, '⅔': 2 / 3, '¼': 0.25, '¾': 0.75, '⅛': 0.125}
+
+# Mixed numbers ("1 1/2", "1½"), fractions ("1/2", "½") and decimals; the lookbehind
+# keeps "2 cup" from matching inside "1/2 cup"
+_AMOUNT = (r'(?<![\d/.])(?:\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?\s*[' + ''.join(_VULGAR_FRACTIONS) + r']'
+           r'|\d+(?:\.\d+)?|[' + ''.join(_VULGAR_FRACTIONS) + r'])')
+_MEASURED_RE = re.compile(r'(' + _AMOUNT + r')\s*(' + '|'.join(sorted(UNIT_GRAMS, key=len, reverse=True)) + r')\b')
+_COUNT_RE = re.compile(r'^(' + _AMOUNT + '|' + '|'.join(_WORD_NUMBERS) + r')\s*(?:x\s+)?\b')
+
+DEFAULT_FIND_LIMIT = 15
+MAX_FIND_LIMIT = 50
+
+# Per-item detail is dropped above this many items to keep tool output small
+MAX_DETAILED_ITEMS = 40
+
+
+def _parse_amount(token: str) -> float:
+    """Value of an amount matched by _AMOUNT or a word number ("1 1/2" -> 1.5, "½" -> 0.5)"""
+    if token in _WORD_NUMBERS:
+        return _WORD_NUMBERS[token]
+    if token[-1] in _VULGAR_FRACTIONS:
+        return float(token[:-1].strip() or 0) + _VULGAR_FRACTIONS[token[-1]]
+    whole, _, fraction = token.rpartition(' ')
+    if '/' in fraction:
+        numerator, denominator = fraction.split('/')
+        fraction_value = float(numerator) / float(denominator) if float(denominator) else 1.0
+    else:
+        fraction_value = float(fraction)
+    return float(whole or 0) + fraction_value
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.sub(r'[^a-z0-9% ]+', ' ', str(text).lower()).split())
+
+
+class FoodDatabase:
+    """Columnar, memory-mapped nutrient table with name, alias and tag indexes"""
+
+    def __init__(self, csv_path=FOODS_CSV_PATH, cache_dir=DEFAULT_CACHE_DIR):
+        csv_path = Path(csv_path)
+        raw = csv_path.read_bytes()
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            records = list(csv.DictReader(f))
+
+        self.names = [record['name'] for record in records]
+        self.serving_labels = [record['serving'] for record in records]
+        self.columns = self._load_columns(records, raw, Path(cache_dir))
+
+        self.by_key = {}
+        for row, record in enumerate(records):
+            for key in [record['name']] + record['aliases'].split('|'):
+                key = _normalize(key)
+                if key:
+                    self.by_key.setdefault(key, row)
+        # Longest keys first, for matching inside free text ("grilled chicken breast with herbs")
+        self._keys_by_length = sorted(self.by_key, key=len, reverse=True)
+
+        self.tags = {}
+        for row, record in enumerate(records):
+            for tag in record['tags'].split('|'):
+                tag = tag.strip().lower()
+                if tag:
+                    mask = self.tags.setdefault(tag, np.zeros(len(records), dtype=bool))
+                    mask[row] = True
+
+        self._lookup = lru_cache(maxsize=4096)(self._lookup_uncached)
+
+    @staticmethod
+    def _load_columns(records: list, raw: bytes, cache_dir: Path) -> np.ndarray:
+        """Return the nutrient columns (plus serving grams) as a memory-mapped float32 array"""
+        columns = np.array(
+            [[float(record[name]) for record in records] for name in NUTRIENTS + ('serving_g',)],
+            dtype=np.float32,
+        )
+        path = cache_dir / f"foods-{hashlib.sha256(raw).hexdigest()[:16]}.npy"
+        try:
+            if not path.exists():
+                cache_dir.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npy")
+                np.save(tmp_path, columns)
+                os.replace(tmp_path, path)
+            return np.load(path, mmap_mode='r')
+        except OSError:
+            # Read-only home directory: keep the table in memory
+            return columns
+
+    def _lookup_uncached(self, text: str):
+        text = _normalize(text)
+        row = self.by_key.get(text)
+        if row is None and text.endswith('s'):
+            # Plurals: "oranges" -> "orange", "tomatoes" -> "tomato"
+            row = self.by_key.get(text[:-1], self.by_key.get(text[:-2]))
+        if row is None:
+            padded = f" {text} "
+            row = next((self.by_key[key] for key in self._keys_by_length if f" {key} " in padded), None)
+        return row
+
+    def lookup(self, text: str):
+        """Return the row of the food named in text, or None"""
+        return self._lookup(text)
+
+    def parse_item(self, item: str) -> tuple:
+        """
+        Parse an item such as "lunch: 150 g chicken breast" or "2 eggs".
+
+        Amounts may be mixed numbers or fractions ("1 1/2 cups", "½ cup"):
+
+        >>> db = get_food_database()
+        >>> db.parse_item("1/2 cup milk")[2] == 0.5 * db.parse_item("1 cup milk")[2]
+        True
+        >>> db.parse_item("1 1/2 cups oats")[2] == 1.5 * db.parse_item("1 cup oats")[2]
+        True
+
+        Returns:
+            Tuple of (meal label or "", row or None, grams)
+        """
+        label, _, rest = item.partition(':') if ':' in item else ('', '', item)
+        text = rest.strip().lower()
+        grams = None
+        measured = _MEASURED_RE.search(text)
+        if measured:
+            amount, unit = _parse_amount(measured.group(1)), measured.group(2)
+            text = (text[:measured.start()] + text[measured.end():]).strip()
+        else:
+            count = _COUNT_RE.match(text)
+            amount, unit = 1.0, None
+            if count:
+                amount = _parse_amount(count.group(1))
+                text = text[count.end():].strip()
+        text = re.sub(r'^(?:of|x)\s+', '', text)
+        row = self.lookup(text)
+        if row is not None:
+            serving_grams = float(self.columns[_SERVING_ROW, row])
+            if unit is None:
+                grams = amount * serving_grams
+            elif _SPOON_UNITS.get(unit) == self.serving_labels[row]:
+                grams = amount * serving_grams
+            else:
+                grams = amount * UNIT_GRAMS[unit]
+        return label.strip(), row, grams
+
+    def totals(self, items: list) -> dict:
+        """Total the nutrients of parsed items, per meal label and overall"""
+        parsed = [self.parse_item(item) for item in items]
+        matched = [(index, label, row, grams) for index, (label, row, grams) in enumerate(parsed) if row is not None]
+        unmatched = [items[index] for index, (_, row, _) in enumerate(parsed) if row is None]
+        if not matched:
+            return {'items': [], 'meals': [], 'total': dict.fromkeys(NUTRIENTS, 0.0), 'unmatched': unmatched}
+
+        rows = np.fromiter((row for _, _, row, _ in matched), dtype=np.int64, count=len(matched))
+        grams = np.fromiter((grams for _, _, _, grams in matched), dtype=np.float64, count=len(matched))
+        labels = [label for _, label, _, _ in matched]
+        label_order = list(dict.fromkeys(labels))
+        group_of = {label: group for group, label in enumerate(label_order)}
+        groups = np.fromiter((group_of[label] for label in labels), dtype=np.int64, count=len(labels))
+
+        # One gather and one multiply for every nutrient of every item
+        per_item = self.columns[:len(NUTRIENTS)][:, rows].astype(np.float64) * (grams / 100.0)
+        per_meal = np.stack([np.bincount(groups, weights=values, minlength=len(label_order)) for values in per_item])
+        total = per_item.sum(axis=1)
+
+        def rounded(values):
+            return {name: round(float(value), 1) for name, value in zip(NUTRIENTS, values)}
+
+        return {
+            'items': [
+                dict(item=items[index], food=self.names[rows[i]], grams=round(float(grams[i]), 1), **rounded(per_item[:, i]))
+                for i, (index, _, _, _) in enumerate(matched)
+            ],
+            'meals': [dict(meal=label or 'unlabeled', **rounded(per_meal[:, g])) for g, label in enumerate(label_order)],
+            'total': rounded(total),
+            'unmatched': unmatched,
+        }
+
+    def find(self, tags: list, sort_by: str = "", limit: int = DEFAULT_FIND_LIMIT) -> list:
+        """
+        Return foods carrying every tag, optionally ranked by a nutrient (highest first).
+
+        Raises:
+            ValueError: If a tag or the sort nutrient is unknown
+        """
+        mask = np.ones(len(self.names), dtype=bool)
+        for tag in tags:
+            if tag not in self.tags:
+                raise ValueError(f"Unknown tag {tag!r}; known: {', '.join(sorted(self.tags))}")
+            mask &= self.tags[tag]
+        rows = np.flatnonzero(mask)
+        if sort_by:
+            nutrient = next((name for name in NUTRIENTS if name.startswith(sort_by.lower())), None)
+            if nutrient is None:
+                raise ValueError(f"Unknown nutrient {sort_by!r}; use one of {', '.join(NUTRIENTS)}")
+            values = self.columns[NUTRIENTS.index(nutrient), rows]
+            rows = rows[np.argsort(-values, kind='stable')]
+        return [
+            dict(
+                name=self.names[row],
+                serving=f"{self.serving_labels[row]} ({float(self.columns[_SERVING_ROW, row]):g} g)",
+                per_100g={name: round(float(self.columns[i, row]), 1) for i, name in enumerate(NUTRIENTS)},
+            )
+            for row in rows[:limit]
+        ]
+
+
+_database = None
+_database_lock = threading.Lock()
+
+
+def get_food_database() -> FoodDatabase:
+    """Return the process-wide food database, loading it on first use"""
+    global _database
+    if _database is None:
+        with _database_lock:
+            if _database is None:
+                _database = FoodDatabase()
+    return _database
+
+
+def calculate_meal_macros(items: list[str]) -> dict:
+    """
+    Total calories, protein, carbs, fat and fiber for a meal or a full meal plan.
+
+    Args:
+        items: One food per entry with an optional amount and meal label, e.g.
+            ["Mon breakfast: 80 g oats", "Mon breakfast: 1 banana", "Mon lunch: 150 g chicken breast",
+            "Mon lunch: 1 cup brown rice", "2 eggs"]. Amounts may be grams, kg, oz, lb, ml,
+            cups, tbsp, tsp or a count of typical servings.
+
+    Returns:
+        Dictionary with status "success", totals per meal label and overall, per-item
+        detail (for up to 40 items) and any unmatched items, or status "error"
+    """
+    if not items:
+        return {'status': 'error', 'error_message': "No items given"}
+    try:
+        result = get_food_database().totals([str(item) for item in items])
+    except (OSError, ValueError) as e:
+        return {'status': 'error', 'error_message': str(e)}
+    if len(items) > MAX_DETAILED_ITEMS:
+        result.pop('items')
+    return dict(status='success', **result)
+
+
+def find_foods(tags: str, sort_by: str = "", limit: int = DEFAULT_FIND_LIMIT) -> dict:
+    """
+    List foods from the food database that carry all the given tags.
+
+    Args:
+        tags: Comma-separated tags, e.g. "vegan, high-protein" (vegan, vegetarian, pescatarian,
+            gluten-free, dairy-free, high-protein, high-fiber, omega-3, whole-grain, meat, fish,
+            dairy, legume, grain, vegetable, fruit, nut, seed, fat, snack, supplement, ...)
+        sort_by: Nutrient to rank by, highest first (kcal, protein, carbs, fat, fiber); empty for table order
+        limit: Maximum number of foods to return (default 15, at most 50)
+
+    Returns:
+        Dictionary with status "success" and foods with nutrients per 100 g and a
+        typical serving, or status "error" and an error_message
+    """
+    tag_list = [tag.strip().lower() for tag in str(tags or '').split(',') if tag.strip()]
+    try:
+        foods = get_food_database().find(tag_list, sort_by, max(1, min(int(limit), MAX_FIND_LIMIT)))
+    except (OSError, ValueError) as e:
+        return {'status': 'error', 'error_message': str(e)}
+    return {'status': 'success', 'foods': foods}
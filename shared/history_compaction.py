@@ -0,0 +1,200 @@
+"""
+Session history compaction for long-running coaching sessions.
+
+Every model call replays the session's history. compact_history is a
+before_model_callback that keeps the most recent turns verbatim and folds
+everything older into a rolling summary, so prompt size stays bounded however
+many weeks of check-ins a session accumulates.
+
+The summary is extractive (no extra model call): one short line per folded
+message or tool call. It is kept in session state, so each turn only folds the
+messages that newly aged out, and mirrored to a 'history_summary.md' artifact
+through the Runner's artifact service (shared/session_manager.py gives the
+pipeline Runners an in-memory one). Each compaction logs and records the
+estimated prompt tokens before and after.
+
+Configuration (environment variables):
+    FITTELLIGENCE_COMPACT_MAX_TOKENS   Compact once history exceeds this many tokens (default: 8000)
+    FITTELLIGENCE_COMPACT_MAX_EVENTS   ...or this many messages (default: 40)
+    FITTELLIGENCE_COMPACT_KEEP_RECENT  Messages always kept verbatim (default: 8)
+"""
+import logging
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio used for prompt size estimates
+CHARS_PER_TOKEN = 4
+
+SUMMARY_STATE_KEY = 'history_summary'
+SUMMARY_UPTO_STATE_KEY = 'history_summary_upto'
+SUMMARY_ARTIFACT = 'history_summary.md'
+
+# Longest line kept per folded message, and the cap on the whole summary
+MAX_SUMMARY_LINE_CHARS = 160
+MAX_SUMMARY_CHARS = 4000
+
+MAX_RECORDED_REPORTS = 1000
+
+
+@dataclass
+class CompactionConfig:
+    max_tokens: int = 8000
+    max_events: int = 40
+    keep_recent: int = 8
+
+    @classmethod
+    def from_env(cls) -> "CompactionConfig":
+        return cls(
+            max_tokens=int(os.getenv('FITTELLIGENCE_COMPACT_MAX_TOKENS', cls.max_tokens)),
+            max_events=int(os.getenv('FITTELLIGENCE_COMPACT_MAX_EVENTS', cls.max_events)),
+            keep_recent=int(os.getenv('FITTELLIGENCE_COMPACT_KEEP_RECENT', cls.keep_recent)),
+        )
+
+
+@dataclass
+class CompactionReport:
+    agent_name: str
+    messages_before: int
+    messages_after: int
+    tokens_before: int
+    tokens_after: int
+    newly_folded: int
+
+
+_reports = deque(maxlen=MAX_RECORDED_REPORTS)
+_reports_lock = threading.Lock()
+
+
+def compaction_reports() -> list:
+    """Return a snapshot of recorded compactions, oldest first"""
+    with _reports_lock:
+        return list(_reports)
+
+
+def _part_chars(part: types.Part) -> int:
+    if getattr(part, 'text', None):
+        return len(part.text)
+    if getattr(part, 'function_call', None):
+        return len(str(part.function_call.args or {})) + len(part.function_call.name or '')
+    if getattr(part, 'function_response', None):
+        return len(str(part.function_response.response or {}))
+    return 0
+
+
+def estimate_tokens(contents: list) -> int:
+    chars = sum(_part_chars(part) for content in contents for part in (content.parts or []))
+    return chars // CHARS_PER_TOKEN
+
+
+def _summary_line(content: types.Content) -> Optional[str]:
+    """Condense one message into a single line"""
+    pieces = []
+    for part in content.parts or []:
+        if getattr(part, 'text', None):
+            text = " ".join(part.text.split())
+            sentence_end = text.find('. ')
+            pieces.append(text[:sentence_end + 1] if 0 < sentence_end < MAX_SUMMARY_LINE_CHARS else text)
+        elif getattr(part, 'function_call', None):
+            pieces.append(f"called {part.function_call.name}")
+        elif getattr(part, 'function_response', None):
+            pieces.append(f"{part.function_response.name} returned {_part_chars(part)} chars")
+    if not pieces:
+        return None
+    line = " | ".join(pieces)
+    if len(line) > MAX_SUMMARY_LINE_CHARS:
+        line = line[:MAX_SUMMARY_LINE_CHARS - 1].rstrip() + "…"
+    return f"- {content.role or 'user'}: {line}"
+
+
+def _split_index(contents: list, keep_recent: int) -> int:
+    """
+    Index where the verbatim tail starts.
+
+    The tail must start at a user message carrying text, so a function call is
+    never separated from its function response.
+    """
+    index = max(len(contents) - keep_recent, 0)
+    while index > 0:
+        content = contents[index]
+        if content.role == 'user' and any(getattr(part, 'text', None) for part in (content.parts or [])):
+            return index
+        index -= 1
+    return 0
+
+
+async def compact_history(callback_context: CallbackContext, llm_request: LlmRequest,
+                          config: Optional[CompactionConfig] = None) -> Optional[LlmResponse]:
+    """
+    before_model_callback that folds old history into a rolling summary.
+
+    Agents list it before trace_model_start, so old history is folded into the
+    summary first and the traced call is the compacted one.
+
+    Returns:
+        None, so the (possibly compacted) request continues to the model
+    """
+    config = config or CompactionConfig.from_env()
+    contents = llm_request.contents or []
+    tokens_before = estimate_tokens(contents)
+    if tokens_before <= config.max_tokens and len(contents) <= config.max_events:
+        return None
+
+    split = _split_index(contents, config.keep_recent)
+    if split == 0:
+        return None
+
+    state = callback_context.state
+    summary = state.get(SUMMARY_STATE_KEY, "") or ""
+    folded_upto = state.get(SUMMARY_UPTO_STATE_KEY, 0) or 0
+    if folded_upto > split:
+        # History no longer matches what was summarized; start over
+        summary, folded_upto = "", 0
+
+    new_lines = [line for line in map(_summary_line, contents[folded_upto:split]) if line]
+    if new_lines:
+        summary = "\n".join(filter(None, [summary] + new_lines))
+        if len(summary) > MAX_SUMMARY_CHARS:
+            # Rolling window: drop the oldest lines first
+            summary = summary[-MAX_SUMMARY_CHARS:]
+            summary = summary[summary.find('\n') + 1:]
+        state[SUMMARY_STATE_KEY] = summary
+        state[SUMMARY_UPTO_STATE_KEY] = split
+        try:
+            await callback_context.save_artifact(SUMMARY_ARTIFACT, types.Part(text=summary))
+        except ValueError:
+            # No artifact service configured; the summary still lives in session state
+            pass
+
+    summary_content = types.Content(
+        role='user',
+        parts=[types.Part(text=f"[Summary of earlier conversation]\n{summary}")]
+    )
+    llm_request.contents = [summary_content] + contents[split:]
+
+    report = CompactionReport(
+        agent_name=callback_context.agent_name,
+        messages_before=len(contents),
+        messages_after=len(llm_request.contents),
+        tokens_before=tokens_before,
+        tokens_after=estimate_tokens(llm_request.contents),
+        newly_folded=split - folded_upto,
+    )
+    with _reports_lock:
+        _reports.append(report)
+    logger.info(
+        "Compacted %s history: %d → %d messages, ~%d → ~%d tokens",
+        report.agent_name, report.messages_before, report.messages_after,
+        report.tokens_before, report.tokens_after,
+    )
+    return None
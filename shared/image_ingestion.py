@@ -0,0 +1,234 @@
+"""
+Image ingestion for the body scanner: downscale, strip metadata, dedupe, cache.
+
+Full-resolution phone photos are the most expensive payload in an assessment.
+Each source image is hashed straight from a memory map; if a processed copy for
+that hash already exists in the cache directory, nothing is decoded again.
+Otherwise the image is decoded once (with JPEG draft-mode scaling), rotated
+according to its EXIF orientation, resized so its longest edge fits the model's
+useful resolution and re-encoded as a JPEG without EXIF/GPS metadata.
+
+Processed bytes are served from a bounded in-memory LRU, falling back to a
+memory map of the cached file, and identical images within one request are sent
+once. Because processed images are content-addressed, a follow-up assessment
+with the same photos produces the same prompt and is answered from the response
+cache without uploading anything.
+
+Pillow is optional: without it, images are still hashed, deduped and
+streamed, but sent at their original size. Images Pillow cannot decode (e.g.
+HEIC without pillow-heif) are sent the same way.
+
+Configuration (environment variables):
+    FITTELLIGENCE_IMAGE_CACHE      Directory for processed images (default: ~/.cache/fittelligence/images)
+    FITTELLIGENCE_IMAGE_MAX_EDGE   Longest edge in pixels after resizing (default: 1024)
+"""
+import hashlib
+import io
+import mmap
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from google.genai import types
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+    ImageOps = None
+
+
+DEFAULT_IMAGE_CACHE_DIR = Path.home() / '.cache' / 'fittelligence' / 'images'
+DEFAULT_MAX_EDGE = 1024
+JPEG_QUALITY = 85
+
+# Upper bound on processed image bytes kept in memory
+MAX_IN_MEMORY_BYTES = 32 * 1024 * 1024
+
+IMAGE_MIME_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.webp': 'image/webp',
+    '.heic': 'image/heic',
+    '.heif': 'image/heif',
+}
+
+
+@dataclass(frozen=True)
+class IngestedImage:
+    source: str
+    digest: str
+    path: Path
+    mime_type: str
+    width: int
+    height: int
+    size_bytes: int
+    source_bytes: int
+    from_cache: bool
+
+    def describe(self) -> str:
+        """One-line description used in prompts (stable for identical images)"""
+        size = f"{self.width}x{self.height}, " if self.width else ""
+        return f"{Path(self.source).name} [{size}{self.size_bytes // 1024} KB, sha256:{self.digest[:12]}]"
+
+
+def _mapped_digest(path: Path) -> tuple:
+    """Return (sha256 hex digest, size) of a file, hashed from a memory map"""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return hashlib.sha256(b'').hexdigest(), 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return hashlib.sha256(mapped).hexdigest(), size
+
+
+class ImageIngestor:
+    """Processes images once and serves the processed bytes from memory or mmap"""
+
+    def __init__(self, cache_dir=DEFAULT_IMAGE_CACHE_DIR, max_edge: int = DEFAULT_MAX_EDGE):
+        self.cache_dir = Path(cache_dir)
+        self.max_edge = max_edge
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._bytes = OrderedDict()
+        self._bytes_total = 0
+        self._lock = threading.Lock()
+        self.stats = {'processed': 0, 'cache_hits': 0, 'source_bytes': 0, 'processed_bytes': 0}
+
+    def _processed_path(self, source_digest: str) -> Path:
+        return self.cache_dir / f"{source_digest[:32]}-{self.max_edge}.jpg"
+
+    def _process(self, source: Path) -> bytes:
+        with Image.open(source) as image:
+            # Let the JPEG decoder scale down while decoding instead of decoding full size
+            image.draft('RGB', (self.max_edge, self.max_edge))
+            image = ImageOps.exif_transpose(image)
+            image = image.convert('RGB')
+            image.thumbnail((self.max_edge, self.max_edge), Image.LANCZOS)
+            buffer = io.BytesIO()
+            # A freshly encoded JPEG without exif= carries no EXIF/GPS metadata
+            image.save(buffer, format='JPEG', quality=JPEG_QUALITY, optimize=True)
+        return buffer.getvalue()
+
+    def ingest(self, source) -> IngestedImage:
+        """
+        Ingest one image file, reusing the processed copy when it exists.
+
+        Raises:
+            OSError: If the file cannot be read or decoded
+        """
+        source = Path(source).expanduser()
+        source_digest, source_size = _mapped_digest(source)
+        self.stats['source_bytes'] += source_size
+
+        if Image is None:
+            # No Pillow: send the original file as is
+            return self._original(source, source_digest, source_size)
+
+        path = self._processed_path(source_digest)
+        from_cache = path.exists()
+        if from_cache:
+            self.stats['cache_hits'] += 1
+        else:
+            try:
+                data = self._process(source)
+            except (OSError, ValueError):
+                # Formats this Pillow can't decode (e.g. HEIC without pillow-heif) are sent as is
+                return self._original(source, source_digest, source_size)
+            # Unique per thread: concurrent requests for the same photo each write their own copy
+            tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+            self.stats['processed'] += 1
+        digest, size = _mapped_digest(path)
+        with Image.open(path) as processed:
+            width, height = processed.size
+        self.stats['processed_bytes'] += size
+        return IngestedImage(
+            source=str(source), digest=digest, path=path, mime_type='image/jpeg',
+            width=width, height=height, size_bytes=size, source_bytes=source_size, from_cache=from_cache,
+        )
+
+    def _original(self, source: Path, source_digest: str, source_size: int) -> IngestedImage:
+        """Describe the unprocessed source file, sent at its original size"""
+        self.stats['processed_bytes'] += source_size
+        return IngestedImage(
+            source=str(source), digest=source_digest, path=source,
+            mime_type=IMAGE_MIME_TYPES.get(source.suffix.lower(), 'application/octet-stream'),
+            width=0, height=0, size_bytes=source_size, source_bytes=source_size, from_cache=False,
+        )
+
+    def image_bytes(self, image: IngestedImage) -> bytes:
+        """Return processed bytes from the in-memory LRU, or from a memory map of the cached file"""
+        with self._lock:
+            data = self._bytes.get(image.digest)
+            if data is not None:
+                self._bytes.move_to_end(image.digest)
+                return data
+        with open(image.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            data = mapped[:]
+        with self._lock:
+            if len(data) <= MAX_IN_MEMORY_BYTES and image.digest not in self._bytes:
+                self._bytes[image.digest] = data
+                self._bytes_total += len(data)
+                while self._bytes_total > MAX_IN_MEMORY_BYTES:
+                    _, evicted = self._bytes.popitem(last=False)
+                    self._bytes_total -= len(evicted)
+        return data
+
+    def image_part(self, image: IngestedImage) -> types.Part:
+        return types.Part.from_bytes(data=self.image_bytes(image), mime_type=image.mime_type)
+
+
+_ingestor = None
+_ingestor_lock = threading.Lock()
+
+
+def get_image_ingestor() -> ImageIngestor:
+    """Return the process-wide image ingestor"""
+    global _ingestor
+    if _ingestor is None:
+        with _ingestor_lock:
+            if _ingestor is None:
+                _ingestor = ImageIngestor(
+                    os.getenv('FITTELLIGENCE_IMAGE_CACHE', str(DEFAULT_IMAGE_CACHE_DIR)),
+                    max_edge=int(os.getenv('FITTELLIGENCE_IMAGE_MAX_EDGE', DEFAULT_MAX_EDGE)),
+                )
+    return _ingestor
+
+
+def ingest_image_references(body_images: str) -> tuple:
+    """
+    Ingest the image files referenced in a free-text body_images argument.
+
+    Entries are separated by commas, semicolons or newlines; entries that name an
+    existing image file are ingested (duplicates by content are kept once), all
+    other entries are returned as descriptive text.
+
+    Returns:
+        Tuple of (list of IngestedImage, list of remaining text entries, list of error strings)
+    """
+    images, notes, errors = [], [], []
+    seen = set()
+    ingestor = None
+    for entry in re.split(r'[,;\n]', str(body_images or '')):
+        entry = entry.strip().strip('"\'')
+        if not entry:
+            continue
+        path = Path(entry).expanduser()
+        if path.suffix.lower() not in IMAGE_MIME_TYPES or not path.is_file():
+            notes.append(entry)
+            continue
+        ingestor = ingestor or get_image_ingestor()
+        try:
+            image = ingestor.ingest(path)
+        except OSError as e:
+            errors.append(f"{path.name}: {e}")
+            continue
+        if image.digest not in seen:
+            seen.add(image.digest)
+            images.append(image)
+    return images, notes, errors
@@ -0,0 +1,305 @@
+"""
+Local meal-plan optimizer for the nutrition agent.
+
+Instead of having the model guess portions and revise them, optimize_meal_plan
+picks foods from the packaged food table (shared/food_database.py) and solves
+for portions that hit calorie and macro targets under dietary restrictions and
+allergies. The model only has to narrate a plan whose numbers are already right.
+
+Each day follows a fixed meal template of food roles (a protein, a starch, a
+vegetable, ...). Foods are assigned to roles greedily from the allowed foods,
+ranked by how well they serve the role and rotated across meals and days for
+variety. Portions then come from a bounded least-squares fit of relative
+calorie/protein/carb/fat error, with a small pull towards typical servings,
+solved by accelerated projected gradient. Every client-day is one problem of
+the same shape, so a whole batch is solved together with batched NumPy
+operations, fast enough for nightly onboarding runs.
+"""
+import re
+
+import numpy as np
+
+from shared.food_database import NUTRIENTS, get_food_database
+
+
+# Nutrients that are fitted, in FoodDatabase column order
+TARGET_NUTRIENTS = ('kcal', 'protein_g', 'carbs_g', 'fat_g')
+
+# Default calorie split used when a macro target is not given
+DEFAULT_MACRO_SHARES = {'protein_g': 0.30, 'carbs_g': 0.40, 'fat_g': 0.30}
+KCAL_PER_GRAM = {'protein_g': 4.0, 'carbs_g': 4.0, 'fat_g': 9.0}
+
+MEAL_TEMPLATE = (
+    ('breakfast', ('breakfast_protein', 'breakfast_carb', 'fruit')),
+    ('lunch', ('main_protein', 'starch', 'vegetable', 'fat')),
+    ('dinner', ('main_protein', 'starch', 'vegetable', 'fat')),
+    ('snack', ('snack_protein', 'fruit')),
+)
+
+# Role -> (tags of which one is required, tags that exclude, ranking nutrient, min grams, max servings)
+ROLES = {
+    'breakfast_protein': (('breakfast',), ('grain',), 'protein_g', 0.0, 3.0),
+    'breakfast_carb': (('breakfast',), ('high-protein', 'dairy'), 'carbs_g', 0.0, 3.0),
+    'fruit': (('fruit',), ('fat',), 'fiber_g', 0.0, 2.0),
+    'main_protein': (('meat', 'fish', 'legume', 'high-protein'), ('supplement', 'breakfast', 'dairy', 'grain', 'vegetable'), 'protein_g', 60.0, 3.0),
+    'starch': (('grain', 'starch'), ('breakfast',), 'carbs_g', 0.0, 3.0),
+    'vegetable': (('vegetable',), ('starch',), 'fiber_g', 80.0, 3.0),
+    'fat': (('fat',), ('dairy',), 'fat_g', 0.0, 2.0),
+    'snack_protein': (('supplement',), ('snack',), 'protein_g', 0.0, 2.0),
+}
+
+# Top-ranked foods per role that take part in the rotation
+ROTATION_SIZE = 5
+
+# Restriction keywords -> tag every food must carry
+REQUIRED_TAG_RULES = (
+    (r'\bvegan|plant[- ]based', 'vegan'),
+    (r'\bvegetarian', 'vegetarian'),
+    (r'\bpescatarian|pescetarian', 'pescatarian'),
+    (r'gluten|celiac|coeliac|wheat', 'gluten-free'),
+    (r'dairy|lactose|milk', 'dairy-free'),
+)
+# Allergy keywords -> foods excluded by tag or by name
+EXCLUDE_TAG_RULES = (
+    (r'\bnuts?\b|tree nut', 'nut'),
+    (r'\bfish\b', 'fish'),
+    (r'\bseeds?\b', 'seed'),
+)
+EXCLUDE_NAME_RULES = (
+    (r'peanut', ('peanut',)),
+    (r'shellfish|shrimp|prawn', ('shrimp',)),
+    (r'\beggs?\b', ('egg',)),
+    (r'\bsoy|soya', ('tofu', 'tempeh', 'edamame', 'soy')),
+    (r'\bpork\b|halal|kosher', ('pork', 'ham', 'bacon')),
+)
+
+# Relative error weights; calories count double because food energy values include
+# more than the macros explain (fiber, rounding), so macros alone never pin them down
+NUTRIENT_WEIGHTS = np.array([2.0, 1.0, 1.0, 1.0])
+PORTION_SMOOTHING = 0.002
+SOLVER_ITERATIONS = 400
+ROUND_TO_GRAMS = 5
+
+
+def allowed_food_mask(database, restrictions: str) -> np.ndarray:
+    """Boolean mask of the foods compatible with free-text restrictions and allergies"""
+    text = str(restrictions or '').lower()
+    mask = np.ones(len(database.names), dtype=bool)
+    for pattern, tag in REQUIRED_TAG_RULES:
+        if re.search(pattern, text):
+            mask &= database.tags.get(tag, False)
+    for pattern, tag in EXCLUDE_TAG_RULES:
+        if re.search(pattern, text) and tag in database.tags:
+            mask &= ~database.tags[tag]
+    for pattern, words in EXCLUDE_NAME_RULES:
+        if re.search(pattern, text):
+            mask &= np.array([not any(word in name for word in words) for name in database.names])
+    return mask
+
+
+def _role_candidates(database, allowed: np.ndarray) -> dict:
+    """Rank the allowed foods of every role, best first"""
+    kcal = np.maximum(np.asarray(database.columns[0], dtype=np.float64), 1.0)
+    candidates = {}
+    for role, (any_tags, excluded_tags, nutrient, _, _) in ROLES.items():
+        mask = allowed.copy()
+        mask &= np.any([database.tags[tag] for tag in any_tags if tag in database.tags], axis=0)
+        for tag in excluded_tags:
+            if tag in database.tags:
+                mask &= ~database.tags[tag]
+        rows = np.flatnonzero(mask)
+        density = np.asarray(database.columns[NUTRIENTS.index(nutrient), rows], dtype=np.float64) / kcal[rows]
+        candidates[role] = rows[np.argsort(-density, kind='stable')][:ROTATION_SIZE]
+    return candidates
+
+
+def _assign_foods(candidates: dict, day: int) -> tuple:
+    """
+    Pick one food per template slot for a day.
+
+    Returns:
+        Tuple of (rows, enabled) arrays over the template slots
+    """
+    rows, enabled = [], []
+    role_uses = {}
+    for _, roles in MEAL_TEMPLATE:
+        for role in roles:
+            options = candidates[role]
+            use = role_uses.get(role, 0)
+            role_uses[role] = use + 1
+            if len(options):
+                rows.append(options[(day + use * 2) % len(options)])
+                enabled.append(True)
+            else:
+                # No compatible food for this role: keep the slot but force it to zero grams
+                rows.append(0)
+                enabled.append(False)
+    return np.array(rows), np.array(enabled)
+
+
+def _solve_portions(A: np.ndarray, targets: np.ndarray, servings: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+    """
+    Batched bounded least squares for portions in grams.
+
+    Minimizes sum(w * (A @ g / t - 1)^2) + smoothing * sum(((g - s) / s)^2) subject to
+    lower <= g <= upper, for every problem in the batch at once (FISTA).
+
+    Args:
+        A: (batch, nutrients, foods) nutrient content per gram
+        targets: (batch, nutrients) targets
+        servings: (batch, foods) typical serving grams
+        lower, upper: (batch, foods) portion bounds in grams
+    """
+    relative = A / targets[:, :, None] * np.sqrt(NUTRIENT_WEIGHTS)[None, :, None]
+    inverse_servings = 1.0 / np.maximum(servings, 1.0)
+    smoothing = PORTION_SMOOTHING * inverse_servings ** 2
+    gram_matrix = np.einsum('bnf,bng->bfg', relative, relative)
+    gram_matrix[:, np.arange(A.shape[2]), np.arange(A.shape[2])] += smoothing
+    linear = np.einsum('bnf,n->bf', relative, np.sqrt(NUTRIENT_WEIGHTS)) + smoothing * servings
+    step = 1.0 / np.linalg.eigvalsh(gram_matrix)[:, -1:]
+
+    portions = np.clip(servings, lower, upper)
+    momentum = portions.copy()
+    t = 1.0
+    for _ in range(SOLVER_ITERATIONS):
+        gradient = np.einsum('bfg,bg->bf', gram_matrix, momentum) - linear
+        updated = np.clip(momentum - step * gradient, lower, upper)
+        t_next = (1.0 + np.sqrt(1.0 + 4.0 * t * t)) / 2.0
+        momentum = updated + ((t - 1.0) / t_next) * (updated - portions)
+        portions, t = updated, t_next
+    return portions
+
+
+def complete_targets(calories, protein_g, carbs_g, fat_g) -> np.ndarray:
+    """
+    Stack targets into a (clients, 4) array, deriving missing (zero) macros.
+
+    A missing macro takes its default share of the calories left over by the
+    given macros, so explicit targets are always respected.
+    """
+    targets = np.column_stack([
+        np.asarray(values, dtype=np.float64) for values in (calories, protein_g, carbs_g, fat_g)
+    ])
+    macro_kcal = np.array([KCAL_PER_GRAM[name] for name in TARGET_NUTRIENTS[1:]])
+    given = targets[:, 1:] > 0
+    shares = np.array([DEFAULT_MACRO_SHARES[name] for name in TARGET_NUTRIENTS[1:]])
+    remaining_kcal = np.maximum(targets[:, 0] - (targets[:, 1:] * given * macro_kcal).sum(axis=1), 0.0)
+    missing_share = (shares * ~given).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        derived = remaining_kcal[:, None] * shares / np.where(missing_share > 0, missing_share, 1.0)[:, None] / macro_kcal
+    targets[:, 1:] = np.where(given, targets[:, 1:], np.maximum(derived, 1.0))
+    return targets
+
+
+def optimize_plans(targets: np.ndarray, restrictions: list, days: int = 1) -> list:
+    """
+    Build meal plans for a batch of clients.
+
+    Args:
+        targets: (clients, 4) daily kcal, protein, carb and fat targets
+        restrictions: Free-text dietary restrictions and allergies per client
+        days: Number of days to plan per client
+
+    Returns:
+        One plan dict per client
+    """
+    database = get_food_database()
+    columns = np.asarray(database.columns, dtype=np.float64)
+    nutrient_rows = [NUTRIENTS.index(name) for name in TARGET_NUTRIENTS]
+    slot_roles = [role for _, roles in MEAL_TEMPLATE for role in roles]
+
+    # Candidate ranking only depends on the restrictions, so identical ones share it
+    candidates_by_restriction = {}
+    problem_rows, problem_enabled = [], []
+    for restriction in restrictions:
+        key = str(restriction or '').strip().lower()
+        if key not in candidates_by_restriction:
+            candidates_by_restriction[key] = _role_candidates(database, allowed_food_mask(database, key))
+        for day in range(days):
+            rows, enabled = _assign_foods(candidates_by_restriction[key], day)
+            problem_rows.append(rows)
+            problem_enabled.append(enabled)
+
+    rows = np.stack(problem_rows)
+    enabled = np.stack(problem_enabled)
+    problem_targets = np.repeat(targets, days, axis=0)
+    servings = columns[len(NUTRIENTS)][rows]
+    min_grams = np.array([ROLES[role][3] for role in slot_roles])
+    max_servings = np.array([ROLES[role][4] for role in slot_roles])
+    lower = np.where(enabled, np.minimum(min_grams, servings * max_servings), 0.0)
+    upper = np.where(enabled, servings * max_servings, 0.0)
+    A = columns[nutrient_rows][:, rows].transpose(1, 0, 2) / 100.0
+
+    grams = _solve_portions(A, problem_targets, servings, lower, upper)
+    grams = np.round(grams / ROUND_TO_GRAMS) * ROUND_TO_GRAMS
+    achieved = np.einsum('bnf,bf->bn', A, grams)
+
+    plans = []
+    for client in range(len(targets)):
+        plan_days = []
+        for day in range(days):
+            problem = client * days + day
+            meals = {}
+            slot = 0
+            for meal, roles in MEAL_TEMPLATE:
+                foods = []
+                for _ in roles:
+                    if grams[problem, slot] >= ROUND_TO_GRAMS:
+                        foods.append(f"{database.names[rows[problem, slot]]} {grams[problem, slot]:g} g")
+                    slot += 1
+                meals[meal] = foods
+            plan_days.append({
+                'day': day + 1,
+                'meals': meals,
+                'totals': {name: round(float(value), 1) for name, value in zip(TARGET_NUTRIENTS, achieved[problem])},
+            })
+        client_problems = slice(client * days, (client + 1) * days)
+        error_pct = 100.0 * (achieved[client_problems] - problem_targets[client_problems]) / problem_targets[client_problems]
+        plans.append({
+            'targets': {name: round(float(value), 1) for name, value in zip(TARGET_NUTRIENTS, targets[client])},
+            'days': plan_days,
+            'mean_error_pct': {name: round(float(value), 1) for name, value in zip(TARGET_NUTRIENTS, error_pct.mean(axis=0))},
+        })
+    return plans
+
+
+def optimize_meal_plan(
+    calorie_targets: list[float],
+    protein_targets_g: list[float],
+    carb_targets_g: list[float],
+    fat_targets_g: list[float],
+    dietary_restrictions: list[str],
+    days: int = 1,
+) -> dict:
+    """
+    Compute meal plans with exact portions that hit calorie and macro targets.
+
+    All lists must have the same length; position i describes client i. Pass
+    one-element lists for a single client.
+
+    Args:
+        calorie_targets: Daily calories per client (e.g. from calculate_energy_targets)
+        protein_targets_g: Daily protein grams per client; 0 derives it from the calories
+        carb_targets_g: Daily carbohydrate grams per client; 0 derives it from the calories
+        fat_targets_g: Daily fat grams per client; 0 derives it from the calories
+        dietary_restrictions: Restrictions and allergies per client (e.g. "gluten-free, nut allergy"); "" for none
+        days: Number of days to plan, with foods rotated between days (1-7)
+
+    Returns:
+        Dictionary with status "success" and per client the targets, each day's meals
+        (food and grams) with totals, and the mean error in percent; or status "error"
+    """
+    columns = [calorie_targets, protein_targets_g, carb_targets_g, fat_targets_g, dietary_restrictions]
+    if len({len(column) for column in columns}) != 1 or not calorie_targets:
+        return {'status': 'error', 'error_message': "All lists must be non-empty and have the same length"}
+    try:
+        targets = complete_targets(calorie_targets, protein_targets_g, carb_targets_g, fat_targets_g)
+    except (TypeError, ValueError) as e:
+        return {'status': 'error', 'error_message': str(e)}
+    if (targets[:, 0] <= 0).any():
+        return {'status': 'error', 'error_message': "Calorie targets must be positive"}
+    try:
+        plans = optimize_plans(targets, [str(r) for r in dietary_restrictions], max(1, min(int(days), 7)))
+    except (OSError, ValueError) as e:
+        return {'status': 'error', 'error_message': str(e)}
+    return {'status': 'success', 'plans': plans}
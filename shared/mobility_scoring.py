@@ -0,0 +1,414 @@
+"""
+Deterministic mobility-test scoring with per-client history for the body scanner.
+
+shared/data/mobility_norms.json holds normative range-of-motion values, field
+test cut-offs and the Functional Movement Screen (FMS). Each test has a "good"
+value (at or beyond the norm) and a "poor" value; a measurement scores
+linearly from 0 at poor to 100 at good, which works for tests where lower is
+better (e.g. the back scratch gap) as well. Scores map to the rating bands of
+the norms file. Scoring, left/right asymmetry and change since the previous
+assessment are computed with NumPy over every measurement of every client in
+one pass.
+
+The latest few values per client, test and side are kept in a small SQLite
+file, so a follow-up assessment gets its deltas from score_mobility_tests
+instead of the model recalling and comparing earlier results.
+
+Configuration (environment variables):
+    FITTELLIGENCE_MOBILITY_DB   Path of the history file, or "off" to disable history
+                                (default: ~/.cache/fittelligence/mobility.sqlite)
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+
+NORMS_PATH = Path(__file__).parent / 'data' / 'mobility_norms.json'
+DEFAULT_HISTORY_PATH = Path.home() / '.cache' / 'fittelligence' / 'mobility.sqlite'
+
+# Values kept per client, test and side
+MAX_HISTORY_PER_TEST = 5
+
+# Measurements listed in the history line of the body scanner prompt
+MAX_HISTORY_LINE_ITEMS = 12
+
+_DISABLED_VALUES = {'off', '0', 'false', 'no', 'none', ''}
+
+_SIDES = {'left': 'left', 'l': 'left', 'lt': 'left', 'right': 'right', 'r': 'right', 'rt': 'right'}
+_SIDE_RE = re.compile(r'\b(' + '|'.join(_SIDES) + r')\b')
+_NUMBER_RE = re.compile(r'(?<![\w.])[-+]?\d+(?:\.\d+)?')
+_UNIT_RE = re.compile(r'°|\b(?:degrees?|deg|cm|centimet(?:er|re)s?|points?|score)\b')
+_SCREEN_SCALE_RE = re.compile(r'(?:/\s*3|\bout of 3)\b')
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.sub(r'[^a-z0-9]+', ' ', str(text).lower()).split())
+
+
+def client_key(client_id: str) -> str:
+    """Normalize a client name or id (e.g. "Jane Doe" -> "jane_doe") to its history key"""
+    return re.sub(r'[^a-z0-9]+', '_', str(client_id or '').lower()).strip('_')
+
+
+class MobilityNorms:
+    """Normative tables as arrays, with a parser for free-text measurements"""
+
+    def __init__(self, data: dict):
+        self.tests = data['tests']
+        self.index = {test['key']: i for i, test in enumerate(self.tests)}
+        self.units = data['units']
+        self.good = np.array([test['good'] for test in self.tests], dtype=np.float64)
+        self.poor = np.array([test['poor'] for test in self.tests], dtype=np.float64)
+        self.direction = np.sign(self.good - self.poor)
+        self.asymmetry = np.array([self.units[test['unit']]['asymmetry'] for test in self.tests], dtype=np.float64)
+        self.change = np.array([self.units[test['unit']]['change'] for test in self.tests], dtype=np.float64)
+        self.rating_floors = np.array([floor for floor, _ in data['ratings']], dtype=np.float64)
+        self.rating_names = [name for _, name in data['ratings']]
+        self.screen = data['screen']
+        self.screen_tests = {self.index[key] for key in self.screen['tests']}
+
+        aliases = {}
+        for i, test in enumerate(self.tests):
+            names = [test['key'].replace('_', ' '), re.sub(r'\(.*?\)', '', test['name'])] + test['aliases']
+            for name in names:
+                aliases.setdefault(_normalize(name), i)
+        # Longest first, so "active straight leg raise" wins over "straight leg raise"
+        self._aliases = sorted(aliases.items(), key=lambda item: len(item[0]), reverse=True)
+
+    @classmethod
+    def load(cls, path=NORMS_PATH) -> "MobilityNorms":
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def match_test(self, text: str) -> Optional[int]:
+        padded = f" {_normalize(text)} "
+        return next((i for alias, i in self._aliases if f" {alias} " in padded), None)
+
+    def parse(self, measurement: str) -> list:
+        """
+        Parse a measurement such as "left hip flexion 110°", "knee to wall R 8 cm",
+        "deep squat 2/3" or "hip IR 30/25" (left/right).
+
+        Returns:
+            List of (test index, side, value) tuples; side is "left", "right" or ""
+
+        Raises:
+            ValueError: If the test or its value cannot be recognized
+        """
+        text = str(measurement).lower().replace('−', '-')
+        words = _NUMBER_RE.sub(' ', _UNIT_RE.sub(' ', _SIDE_RE.sub(' ', text)))
+        test = self.match_test(words)
+        if test is None:
+            raise ValueError(f"Unknown mobility test in {measurement!r}")
+        if self.tests[test]['unit'] == 'score':
+            text = _SCREEN_SCALE_RE.sub(' ', text)
+        values = [float(number) for number in _NUMBER_RE.findall(text)]
+        sides = [_SIDES[side] for side in _SIDE_RE.findall(text)]
+        if not values:
+            raise ValueError(f"No value in {measurement!r}")
+
+        if len(values) == 2 and len(sides) in (0, 2):
+            # "hip IR 30/25" or "hip IR L 30 R 25"
+            pairs = list(zip(sides or ['left', 'right'], values))
+        elif len(values) == 1:
+            pairs = [(sides[0] if sides else '', values[0])]
+        else:
+            raise ValueError(f"Ambiguous values in {measurement!r}; give one test and side per item")
+        if not self.tests[test]['bilateral']:
+            pairs = [('', value) for _, value in pairs[:1]]
+        if self.tests[test]['unit'] == 'score' and any(value not in (0, 1, 2, 3) for _, value in pairs):
+            raise ValueError(f"Screening scores must be 0-3 in {measurement!r}")
+        return [(test, side, value) for side, value in pairs]
+
+    def scores(self, tests: np.ndarray, values: np.ndarray) -> tuple:
+        """
+        Score values against the norms of their tests.
+
+        Returns:
+            Tuple of (scores 0-100, rating indexes into rating_names)
+        """
+        good, poor = self.good[tests], self.poor[tests]
+        scores = np.clip((values - poor) / (good - poor), 0.0, 1.0) * 100.0
+        ratings = (scores[:, None] < self.rating_floors[None, :]).sum(axis=1)
+        return scores, np.minimum(ratings, len(self.rating_names) - 1)
+
+    def format_value(self, test: int, value: float) -> str:
+        return f"{value:g}{self.units[self.tests[test]['unit']]['symbol']}"
+
+
+class MobilityHistory:
+    """Latest measurements per client, test and side in a small SQLite file"""
+
+    def __init__(self, path, max_per_test: int = MAX_HISTORY_PER_TEST):
+        self.path = Path(path)
+        self.max_per_test = max_per_test
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS mobility_history (
+                    client_id TEXT NOT NULL,
+                    test TEXT NOT NULL,
+                    side TEXT NOT NULL,
+                    recorded_at REAL NOT NULL,
+                    value REAL NOT NULL,
+                    PRIMARY KEY (client_id, test, side, recorded_at)
+                ) WITHOUT ROWID"""
+            )
+
+    def latest(self, client_ids: list) -> dict:
+        """Return {(client_id, test, side): (value, recorded_at)} for the most recent value of each"""
+        client_ids = sorted(set(client_ids))
+        if not client_ids:
+            return {}
+        placeholders = ",".join("?" * len(client_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"""SELECT client_id, test, side, value, MAX(recorded_at) FROM mobility_history
+                    WHERE client_id IN ({placeholders}) GROUP BY client_id, test, side""",
+                client_ids
+            ).fetchall()
+        return {(client_id, test, side): (value, recorded_at) for client_id, test, side, value, recorded_at in rows}
+
+    def record(self, rows: list, recorded_at: float = None):
+        """Store (client_id, test, side, value) rows as one assessment and prune old values"""
+        recorded_at = time.time() if recorded_at is None else recorded_at
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO mobility_history (client_id, test, side, recorded_at, value) VALUES (?, ?, ?, ?, ?)",
+                [(client_id, test, side, recorded_at, value) for client_id, test, side, value in rows]
+            )
+            self._conn.executemany(
+                """DELETE FROM mobility_history WHERE client_id = ? AND test = ? AND side = ? AND recorded_at <= (
+                       SELECT recorded_at FROM mobility_history WHERE client_id = ? AND test = ? AND side = ?
+                       ORDER BY recorded_at DESC LIMIT 1 OFFSET ?)""",
+                [(c, t, s, c, t, s, self.max_per_test) for c, t, s in {(c, t, s) for c, t, s, _ in rows}]
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_norms = None
+_history = None
+_history_configured = False
+_lock = threading.Lock()
+
+
+def get_mobility_norms() -> MobilityNorms:
+    """Return the process-wide normative tables, loading them on first use"""
+    global _norms
+    if _norms is None:
+        with _lock:
+            if _norms is None:
+                _norms = MobilityNorms.load()
+    return _norms
+
+
+def get_mobility_history() -> Optional[MobilityHistory]:
+    """Return the process-wide mobility history, or None if history is disabled"""
+    global _history, _history_configured
+    if _history_configured:
+        return _history
+    with _lock:
+        if not _history_configured:
+            setting = os.getenv('FITTELLIGENCE_MOBILITY_DB', str(DEFAULT_HISTORY_PATH))
+            if setting.strip().lower() not in _DISABLED_VALUES:
+                _history = MobilityHistory(setting)
+            _history_configured = True
+    return _history
+
+
+def score_measurements(records: list, history: Optional[MobilityHistory] = None, record: bool = True) -> dict:
+    """
+    Score parsed measurements of one or more clients in one vectorized pass.
+
+    Args:
+        records: (client_id, test index, side, value) tuples; client_id "" is scored without history
+        history: History store for deltas, or None
+        record: Whether to store the measurements as a new assessment
+
+    Returns:
+        Dictionary mapping client_id to its items and summary
+    """
+    norms = get_mobility_norms()
+    # A later value for the same client, test and side replaces an earlier one
+    records = list({(client, test, side): (client, test, side, value) for client, test, side, value in records}.values())
+    tests = np.fromiter((test for _, test, _, _ in records), dtype=np.int64, count=len(records))
+    values = np.fromiter((value for _, _, _, value in records), dtype=np.float64, count=len(records))
+    scores, ratings = norms.scores(tests, values)
+
+    # Change since the previous assessment, signed so that positive means better
+    previous = history.latest([client for client, _, _, _ in records if client]) if history is not None else {}
+    prior = [previous.get((client, norms.tests[test]['key'], side)) for client, test, side, _ in records]
+    prior_values = np.array([entry[0] if entry else np.nan for entry in prior], dtype=np.float64)
+    deltas = values - prior_values
+    improvement = deltas * norms.direction[tests]
+    prior_scores, _ = norms.scores(tests, np.nan_to_num(prior_values))
+
+    # Left/right asymmetry of bilateral tests
+    position = {(client, test, side): i for i, (client, test, side, _) in enumerate(records)}
+    pairs = np.array([
+        (i, position[(client, test, 'right')])
+        for i, (client, test, side, _) in enumerate(records)
+        if side == 'left' and (client, test, 'right') in position
+    ], dtype=np.int64).reshape(-1, 2)
+    gaps = np.abs(values[pairs[:, 0]] - values[pairs[:, 1]])
+    flagged = gaps >= norms.asymmetry[tests[pairs[:, 0]]]
+
+    results = {}
+    for i, (client, test, side, value) in enumerate(records):
+        spec = norms.tests[test]
+        item = {
+            'test': spec['name'],
+            'side': side or None,
+            'value': norms.format_value(test, value),
+            'norm': norms.format_value(test, spec['good']),
+            'score': int(round(scores[i])),
+            'rating': norms.rating_names[ratings[i]],
+        }
+        if prior[i] is not None:
+            item['previous'] = norms.format_value(test, prior_values[i])
+            item['previous_date'] = time.strftime('%Y-%m-%d', time.localtime(prior[i][1]))
+            item['change'] = f"{deltas[i]:+g}"
+            item['score_change'] = int(round(scores[i] - prior_scores[i]))
+            if improvement[i] >= norms.change[test]:
+                item['trend'] = 'improved'
+            elif improvement[i] <= -norms.change[test]:
+                item['trend'] = 'declined'
+            else:
+                item['trend'] = 'unchanged'
+        if spec['unit'] == 'score' and value == 0:
+            item['note'] = 'score 0 means pain on the test: refer for clinical assessment'
+        results.setdefault(client, {'items': [], 'indexes': []})
+        results[client]['items'].append(item)
+        results[client]['indexes'].append(i)
+
+    asymmetries = {}
+    for (left, right), gap, flag in zip(pairs, gaps, flagged):
+        if flag:
+            test = records[left][1]
+            asymmetries.setdefault(records[left][0], []).append(
+                f"{norms.tests[test]['name']}: left {norms.format_value(test, values[left])}, "
+                f"right {norms.format_value(test, values[right])}"
+            )
+
+    for client, result in results.items():
+        indexes = np.array(result.pop('indexes'), dtype=np.int64)
+        restricted = indexes[ratings[indexes] > 0]
+        restricted = restricted[np.argsort(scores[restricted], kind='stable')]
+        summary = {
+            'measurements': len(indexes),
+            'average_score': int(round(float(scores[indexes].mean()))),
+            'restrictions': [
+                f"{norms.tests[tests[i]]['name']}{' ' + records[i][2] if records[i][2] else ''} "
+                f"({norms.rating_names[ratings[i]]})"
+                for i in restricted
+            ],
+            'asymmetries': asymmetries.get(client, []),
+        }
+        trends = [item['trend'] for item in result['items'] if 'trend' in item]
+        if trends:
+            summary['since_last_assessment'] = {trend: trends.count(trend) for trend in ('improved', 'unchanged', 'declined')}
+
+        # FMS: each test counts with its lower side, the composite only when all tests are present
+        screen_scores = {}
+        for i in indexes:
+            test = int(tests[i])
+            if test in norms.screen_tests:
+                screen_scores[test] = min(screen_scores.get(test, 3.0), values[i])
+        if screen_scores:
+            total = int(sum(screen_scores.values()))
+            complete = len(screen_scores) == len(norms.screen_tests)
+            screen = {'tests_scored': len(screen_scores), 'total': total, 'max': 3 * len(screen_scores)}
+            if complete:
+                screen['elevated_injury_risk'] = total <= norms.screen['risk_cutoff']
+            summary[norms.screen['name']] = screen
+        result['summary'] = summary
+
+    if record and history is not None:
+        history.record([
+            (client, norms.tests[test]['key'], side, value)
+            for client, test, side, value in records if client
+        ])
+    return results
+
+
+def score_mobility_tests(measurements: list[str], client_id: str = "", record_history: bool = True) -> dict:
+    """
+    Score mobility test measurements against normative ranges and compare with the client's previous results.
+
+    Args:
+        measurements: One measurement per item with test, side and value, e.g. "left hip flexion 105",
+            "knee to wall right 8 cm", "ankle dorsiflexion 12/9" (left/right), "deep squat 2" (FMS 0-3),
+            "sit and reach -4 cm". Prefix an item with "<client name> |" to score several clients in one call.
+        client_id: Client name or id the measurements belong to; needed for history and change since last time
+        record_history: Store these measurements as the client's latest assessment (default True)
+
+    Returns:
+        Dictionary with status "success" and, per client, scored items (score 0-100, rating, change since
+        the previous assessment) and a summary of restrictions, asymmetries and FMS total, or status "error"
+    """
+    if not measurements:
+        return {'status': 'error', 'error_message': "No measurements given"}
+    norms = get_mobility_norms()
+    records, unmatched = [], []
+    for measurement in measurements:
+        owner, _, text = str(measurement).rpartition('|')
+        key = client_key(owner or client_id)
+        try:
+            records.extend((key, test, side, value) for test, side, value in norms.parse(text))
+        except ValueError as e:
+            unmatched.append(str(e))
+    if not records:
+        return {'status': 'error', 'error_message': "; ".join(unmatched)}
+
+    results = score_measurements(records, get_mobility_history(), record=record_history)
+    return {
+        'status': 'success',
+        'clients': [dict(client=client or 'unnamed', **result) for client, result in results.items()],
+        'unmatched': unmatched,
+    }
+
+
+def mobility_history_line(client_id: str) -> str:
+    """
+    Summarize a client's latest recorded mobility results as one prompt line.
+
+    Returns:
+        The line (restrictions first), or an empty string if nothing is on record
+    """
+    history = get_mobility_history()
+    key = client_key(client_id)
+    if history is None or not key:
+        return ""
+    latest = history.latest([key])
+    if not latest:
+        return ""
+    norms = get_mobility_norms()
+    entries = [(norms.index[test], side, value, at) for (_, test, side), (value, at) in latest.items() if test in norms.index]
+    if not entries:
+        return ""
+    tests = np.array([test for test, _, _, _ in entries], dtype=np.int64)
+    values = np.array([value for _, _, value, _ in entries], dtype=np.float64)
+    scores, ratings = norms.scores(tests, values)
+    order = np.argsort(scores, kind='stable')[:MAX_HISTORY_LINE_ITEMS]
+    last_date = time.strftime('%Y-%m-%d', time.localtime(max(at for _, _, _, at in entries)))
+    listed = [
+        f"{norms.tests[tests[i]]['name']}{' ' + entries[i][1] if entries[i][1] else ''} "
+        f"{norms.format_value(tests[i], values[i])} ({norms.rating_names[ratings[i]]})"
+        for i in order
+    ]
+    return (f"Mobility on record (last assessed {last_date}, {len(entries)} measurements; "
+            f"score_mobility_tests with client_id={key} reports changes): " + "; ".join(listed))
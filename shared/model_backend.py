@@ -0,0 +1,38 @@
+"""
+Model backend selection for the agents.
+
+Agents call resolve_model('gemini-2.5-flash') instead of hard-wiring the model
+string. With FITTELLIGENCE_MODEL_BACKEND=fake the call returns an offline
+FakeLlm (see shared/fake_llm.py) that keeps the same model name, so the
+pipeline can be exercised and benchmarked without the Gemini API.
+"""
+import os
+
+
+BACKEND_ENV_VAR = 'FITTELLIGENCE_MODEL_BACKEND'
+
+
+def model_backend() -> str:
+    """Return the selected backend name ('gemini' or 'fake')"""
+    return os.getenv(BACKEND_ENV_VAR, 'gemini').strip().lower() or 'gemini'
+
+
+def is_fake_backend() -> bool:
+    return model_backend() == 'fake'
+
+
+def resolve_model(model_name: str):
+    """
+    Return the model to hand to an Agent.
+
+    Returns:
+        The model string for the live backend, or a FakeLlm instance when the
+        fake backend is selected
+    """
+    backend = model_backend()
+    if backend == 'gemini':
+        return model_name
+    if backend == 'fake':
+        from shared.fake_llm import fake_llm_from_env
+        return fake_llm_from_env(model_name)
+    raise ValueError(f"Unknown {BACKEND_ENV_VAR}: {backend!r} (expected 'gemini' or 'fake')")
@@ -0,0 +1,205 @@
+"""
+Deterministic BMR, TDEE and macro calculator for the nutrition agent.
+
+Arithmetic done by the model costs tokens and latency and drifts between runs,
+so the nutrition agent gets calculate_energy_targets as a native tool instead.
+The maths is vectorized with NumPy: a batch of clients is one call and one set
+of array operations.
+
+Formulas:
+    BMR     Mifflin-St Jeor: 10*kg + 6.25*cm - 5*age + 5 (male) / -161 (female);
+            the midpoint (-78) is used for other or unspecified sexes
+    TDEE    BMR * activity multiplier for the five intake activity levels
+    Target  TDEE adjusted for the goals: -20% fat loss, -10% recomposition
+            (fat loss and muscle gain together), +10% muscle gain
+    Macros  protein per kg of body weight (2.0 g/kg when losing fat or building
+            muscle, otherwise 1.6 g/kg), 25% of target calories from fat, the
+            rest from carbohydrates
+"""
+import re
+from functools import lru_cache
+
+import numpy as np
+
+
+ACTIVITY_MULTIPLIERS = {
+    'sedentary': 1.2,
+    'lightly active': 1.375,
+    'moderately active': 1.55,
+    'very active': 1.725,
+    'extremely active': 1.9,
+}
+
+# Menu numbers used by collect_client_information() in demo.py
+_ACTIVITY_CHOICES = dict(zip('12345', ACTIVITY_MULTIPLIERS))
+
+SEX_OFFSETS = {'male': 5.0, 'female': -161.0}
+_OTHER_SEX_OFFSET = -78.0
+
+FAT_LOSS_ADJUSTMENT = -0.20
+RECOMPOSITION_ADJUSTMENT = -0.10
+MUSCLE_GAIN_ADJUSTMENT = 0.10
+
+HIGH_PROTEIN_G_PER_KG = 2.0
+BASE_PROTEIN_G_PER_KG = 1.6
+FAT_CALORIE_SHARE = 0.25
+
+KCAL_PER_G_PROTEIN = 4.0
+KCAL_PER_G_CARBS = 4.0
+KCAL_PER_G_FAT = 9.0
+
+# Never prescribe fewer calories than this, whatever the deficit
+MIN_TARGET_CALORIES = 1200.0
+
+
+@lru_cache(maxsize=256)
+def activity_level_key(value: str) -> str:
+    """
+    Map an activity description or menu number to one of the five levels.
+
+    Raises:
+        ValueError: If the value matches no known level
+    """
+    text = " ".join(str(value or '').lower().replace('_', ' ').replace('-', ' ').split())
+    if text in _ACTIVITY_CHOICES:
+        return _ACTIVITY_CHOICES[text]
+    for level in ACTIVITY_MULTIPLIERS:
+        if level in text:
+            return level
+    if text in ('light', 'lightly', 'moderate', 'moderately', 'very', 'extreme', 'extremely'):
+        return next(level for level in ACTIVITY_MULTIPLIERS if level.startswith(text[:4]))
+    raise ValueError(f"Unknown activity level: {value!r} (expected one of {', '.join(ACTIVITY_MULTIPLIERS)})")
+
+
+@lru_cache(maxsize=256)
+def sex_offset(value: str) -> float:
+    text = str(value or '').strip().lower()
+    if text in ('m', 'man'):
+        text = 'male'
+    elif text in ('f', 'woman'):
+        text = 'female'
+    return SEX_OFFSETS.get(text, _OTHER_SEX_OFFSET)
+
+
+@lru_cache(maxsize=256)
+def goal_parameters(goals: str) -> tuple:
+    """
+    Return (calorie adjustment, protein g/kg, goal label) for a free-text goal list.
+    """
+    text = str(goals or '').lower()
+    losing = bool(re.search(r'lose|loss|fat|cut|lean', text))
+    building = bool(re.search(r'muscle|bulk|gain|mass|hypertroph', text))
+    if losing and building:
+        return RECOMPOSITION_ADJUSTMENT, HIGH_PROTEIN_G_PER_KG, 'recomposition'
+    if losing:
+        return FAT_LOSS_ADJUSTMENT, HIGH_PROTEIN_G_PER_KG, 'fat loss'
+    if building:
+        return MUSCLE_GAIN_ADJUSTMENT, HIGH_PROTEIN_G_PER_KG, 'muscle gain'
+    return 0.0, BASE_PROTEIN_G_PER_KG, 'maintenance'
+
+
+def compute_energy_targets(weight_kg, height_cm, age, sex_offsets, activity_multipliers,
+                           calorie_adjustments, protein_g_per_kg) -> dict:
+    """
+    Vectorized BMR/TDEE/macro computation over equally long arrays.
+
+    Returns:
+        Dictionary of float64 arrays: bmr, tdee, target_calories, protein_g, carbs_g, fat_g
+    """
+    weight_kg = np.asarray(weight_kg, dtype=np.float64)
+    bmr = (10.0 * weight_kg + 6.25 * np.asarray(height_cm, dtype=np.float64)
+           - 5.0 * np.asarray(age, dtype=np.float64) + np.asarray(sex_offsets, dtype=np.float64))
+    tdee = bmr * np.asarray(activity_multipliers, dtype=np.float64)
+    target = np.maximum(tdee * (1.0 + np.asarray(calorie_adjustments, dtype=np.float64)), MIN_TARGET_CALORIES)
+    protein_g = weight_kg * np.asarray(protein_g_per_kg, dtype=np.float64)
+    fat_g = target * FAT_CALORIE_SHARE / KCAL_PER_G_FAT
+    carbs_g = np.maximum(target - protein_g * KCAL_PER_G_PROTEIN - fat_g * KCAL_PER_G_FAT, 0.0) / KCAL_PER_G_CARBS
+    return {
+        'bmr': bmr,
+        'tdee': tdee,
+        'target_calories': target,
+        'protein_g': protein_g,
+        'carbs_g': carbs_g,
+        'fat_g': fat_g,
+    }
+
+
+def calculate_energy_targets(
+    weights_kg: list[float],
+    heights_cm: list[float],
+    ages: list[int],
+    genders: list[str],
+    activity_levels: list[str],
+    goals: list[str],
+) -> dict:
+    """
+    Calculate BMR, TDEE, calorie target and macros for one or more clients.
+
+    All lists must have the same length; position i describes client i. Pass
+    one-element lists for a single client.
+
+    Args:
+        weights_kg: Body weight of each client in kilograms
+        heights_cm: Height of each client in centimetres
+        ages: Age of each client in years
+        genders: Gender of each client (Male, Female or Other)
+        activity_levels: Sedentary, Lightly Active, Moderately Active, Very Active or Extremely Active
+        goals: Fitness goals of each client (e.g., "Build muscle, Lose weight/fat")
+
+    Returns:
+        Dictionary with status "success" and one result per client (kcal and grams
+        per day, rounded), or status "error" and an error_message
+    """
+    # Parsing the text columns is memoized, so large batches repeat little work
+    columns = [weights_kg, heights_cm, ages, genders, activity_levels, goals]
+    if len({len(column) for column in columns}) != 1 or not weights_kg:
+        return {'status': 'error', 'error_message': "All lists must be non-empty and have the same length"}
+    try:
+        activity_keys = [activity_level_key(level) for level in activity_levels]
+        weights = np.asarray(weights_kg, dtype=np.float64)
+        heights = np.asarray(heights_cm, dtype=np.float64)
+        age_values = np.asarray(ages, dtype=np.float64)
+    except (TypeError, ValueError) as e:
+        return {'status': 'error', 'error_message': str(e)}
+    if (weights <= 0).any() or (heights <= 0).any() or (age_values <= 0).any():
+        return {'status': 'error', 'error_message': "Weight, height and age must be positive"}
+
+    goal_params = [goal_parameters(goal) for goal in goals]
+    targets = compute_energy_targets(
+        weights, heights, age_values,
+        [sex_offset(gender) for gender in genders],
+        [ACTIVITY_MULTIPLIERS[key] for key in activity_keys],
+        [adjustment for adjustment, _, _ in goal_params],
+        [protein for _, protein, _ in goal_params],
+    )
+    rounded = {name: np.rint(values).astype(int).tolist() for name, values in targets.items()}
+    results = [
+        dict(
+            {name: rounded[name][i] for name in rounded},
+            activity_level=activity_keys[i],
+            goal=goal_params[i][2],
+        )
+        for i in range(len(weights))
+    ]
+    return {'status': 'success', 'formula': 'Mifflin-St Jeor', 'results': results}
+
+
+def energy_targets_line(profile) -> str:
+    """
+    Compute a ClientProfile's targets as one compact prompt line.
+
+    Returns:
+        The line, or an empty string if the profile's activity level is not recognized
+    """
+    result = calculate_energy_targets(
+        [profile.weight_kg], [profile.height_cm], [profile.age], [profile.gender],
+        [profile.activity_level], [", ".join(profile.fitness_goals)],
+    )
+    if result['status'] != 'success':
+        return ""
+    targets = result['results'][0]
+    return (
+        f"[energy targets] bmr={targets['bmr']} kcal; tdee={targets['tdee']} kcal; "
+        f"target={targets['target_calories']} kcal ({targets['goal']}); protein={targets['protein_g']} g; "
+        f"carbs={targets['carbs_g']} g; fat={targets['fat_g']} g"
+    )
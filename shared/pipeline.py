@@ -0,0 +1,316 @@
+"""
+Declarative stage DAG engine for the FitTelligence pipelines.
+
+A pipeline is a set of stages. Each stage names the agent it runs, the stages
+whose output it needs and a prompt builder; the engine starts every stage as
+soon as its dependencies have finished, so independent stages always run
+concurrently. Stages get a per-stage timeout and retries with exponential
+backoff, and a stage may declare a fast path: a plain function that produces
+its output without the model (for example from results stored earlier). A
+stage without an agent is a pure fast-path stage, such as building the client
+profile.
+
+Agents are not invoked here; the caller passes an async execute(stage, prompt,
+context) function, which keeps the engine free of runner and session details.
+Each run returns a PipelineRun with per-stage status, attempts and start/end
+offsets, and breakdown() renders them as a timing table.
+
+Configuration (environment variables):
+    FITTELLIGENCE_STAGE_RETRIES   Retries per agent stage after a timeout or error (default: 1)
+"""
+import asyncio
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+# Add parent directory to path for shared modules
+_parent_dir = Path(__file__).parent.parent
+if str(_parent_dir) not in sys.path:
+    sys.path.insert(0, str(_parent_dir))
+
+from shared.tracing import trace_span
+
+
+# Retries per agent stage after a timeout or error, unless the stage sets its own
+DEFAULT_STAGE_RETRIES = 1
+
+# Delay before the first retry; doubled for every further retry
+DEFAULT_RETRY_BACKOFF = 1.0
+
+# Width of the bars in PipelineRun.breakdown()
+_BAR_WIDTH = 30
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    One pipeline step.
+
+    Attributes:
+        key: Identifier used in depends_on and as the response key (e.g., "pt")
+        title: Display name, also the key in per-stage timings (e.g., "PT Agent")
+        agent_name: Registry name of the agent to run; empty for fast-path-only stages
+        prompt: Builds the agent prompt from the PipelineContext
+        depends_on: Keys of the stages that must finish first
+        fast_path: Returns the stage output without the model, or None to run the agent
+        timeout: Seconds per attempt; None uses the run's default
+        retries: Retries after a timeout or error; None uses the run's default
+        description: What the stage does, for section headers
+    """
+    key: str
+    title: str
+    agent_name: str = ""
+    prompt: Optional[Callable] = None
+    depends_on: tuple = ()
+    fast_path: Optional[Callable] = None
+    timeout: Optional[float] = None
+    retries: Optional[int] = None
+    description: str = ""
+
+
+@dataclass
+class PipelineContext:
+    """Inputs of a run plus the outputs of finished stages, shared by prompt builders and fast paths"""
+    client_info: dict
+    user_id: str
+    session_id: str
+    session_service: object = None
+    responses: dict = field(default_factory=dict)
+    state: dict = field(default_factory=dict)
+
+
+@dataclass
+class StageResult:
+    key: str
+    title: str
+    agent_name: str
+    status: str = 'pending'  # ok, fast_path, timeout or error
+    text: str = ""
+    started: float = 0.0
+    elapsed: float = 0.0
+    attempts: int = 0
+    error: str = ""
+
+
+@dataclass
+class PipelineRun:
+    """Outcome of one pipeline run"""
+    name: str
+    results: dict
+    wall_clock: float
+
+    @property
+    def responses(self) -> dict:
+        """Output text of the agent stages keyed by stage (empty if the stage failed)"""
+        return {key: result.text for key, result in self.results.items() if result.agent_name}
+
+    @property
+    def timings(self) -> dict:
+        """Elapsed seconds per stage keyed by stage title"""
+        return {result.title: result.elapsed for result in self.results.values()}
+
+    def breakdown(self) -> str:
+        """Per-stage status, attempts and start/end offsets with a bar on the run's time axis"""
+        scale = _BAR_WIDTH / self.wall_clock if self.wall_clock > 0 else 0.0
+        lines = [f"  {'Stage':<20} {'Status':<10} {'Try':>3} {'Start':>8} {'End':>8}"]
+        for result in sorted(self.results.values(), key=lambda r: r.started):
+            end = result.started + result.elapsed
+            offset = int(result.started * scale)
+            bar = " " * offset + "█" * max(1, int(end * scale) - offset)
+            lines.append(f"  {result.title:<20} {result.status:<10} {result.attempts:>3} "
+                         f"{result.started:7.2f}s {end:7.2f}s  {bar}")
+        return "\n".join(lines)
+
+
+class Pipeline:
+    """A validated DAG of stages that runs each stage as soon as its dependencies are done"""
+
+    def __init__(self, name: str, stages: list):
+        """
+        Args:
+            name: Pipeline variant name (e.g., "full", "intake")
+            stages: Stages in any order; dependencies are resolved by key
+
+        Raises:
+            ValueError: If keys repeat, a dependency is unknown, the stages form a
+                cycle, or a stage has neither an agent nor a fast path
+        """
+        self.name = name
+        by_key = {}
+        for stage in stages:
+            if stage.key in by_key:
+                raise ValueError(f"Duplicate stage: {stage.key}")
+            if not stage.agent_name and stage.fast_path is None:
+                raise ValueError(f"Stage {stage.key} has neither an agent nor a fast path")
+            if stage.agent_name and stage.prompt is None:
+                raise ValueError(f"Stage {stage.key} runs {stage.agent_name} but has no prompt builder")
+            by_key[stage.key] = stage
+        for stage in stages:
+            unknown = [dep for dep in stage.depends_on if dep not in by_key]
+            if unknown:
+                raise ValueError(f"Stage {stage.key} depends on unknown stage(s): {', '.join(unknown)}")
+        self.stages = by_key
+        self.levels = self._levels()
+
+    def _levels(self) -> list:
+        """Group stage keys into dependency levels (Kahn's algorithm), keeping declaration order"""
+        remaining = dict(self.stages)
+        done = set()
+        levels = []
+        while remaining:
+            level = [key for key, stage in remaining.items() if all(dep in done for dep in stage.depends_on)]
+            if not level:
+                raise ValueError(f"Stages form a cycle: {', '.join(remaining)}")
+            levels.append(level)
+            done.update(level)
+            for key in level:
+                del remaining[key]
+        return levels
+
+    def describe(self) -> str:
+        """Execution plan such as "Reception Agent → Client Profile → {PT Agent, Nutrition Agent}" """
+        parts = []
+        for level in self.levels:
+            titles = [self.stages[key].title for key in level]
+            parts.append(titles[0] if len(titles) == 1 else "{" + ", ".join(titles) + "}")
+        return " → ".join(parts)
+
+    async def run(self, context: PipelineContext, execute, timeout: Optional[float] = None,
+                  retries: Optional[int] = None, retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+                  max_concurrency: Optional[int] = None, on_stage_start=None, on_stage_done=None,
+                  verbose: bool = True) -> PipelineRun:
+        """
+        Run all stages, each as soon as its dependencies have finished.
+
+        A failed stage leaves an empty output and its dependents still run, so
+        a late stage can work with what the others produced.
+
+        Args:
+            context: Run inputs; finished stage outputs are added to context.responses
+            execute: async execute(stage, prompt, context) -> str that runs the stage's agent
+            timeout: Default seconds per attempt (None: no timeout)
+            retries: Default retries per agent stage (None: FITTELLIGENCE_STAGE_RETRIES)
+            retry_backoff: Seconds before the first retry, doubled for each further retry
+            max_concurrency: Stages allowed to run at once (None: unlimited, 1: sequential)
+            on_stage_start: Called with (stage, context) as each stage starts
+            on_stage_done: Called with (StageResult, context) as each stage finishes
+            verbose: Print stage starts and completions (failures are always printed)
+
+        Returns:
+            PipelineRun with a StageResult per stage
+        """
+        if retries is None:
+            retries = int(os.getenv('FITTELLIGENCE_STAGE_RETRIES', DEFAULT_STAGE_RETRIES))
+        semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        run_start = time.perf_counter()
+        results = {}
+        pending = [key for level in self.levels for key in level]
+        running = {}
+
+        pipeline_attributes = {'pipeline.variant': self.name, 'pipeline.stages': len(self.stages),
+                               'user.id': context.user_id, 'session.id': context.session_id}
+        with trace_span(f"pipeline {self.name}", 'pipeline', pipeline_attributes) as span:
+            try:
+                while pending or running:
+                    for key in [k for k in pending if all(dep in results for dep in self.stages[k].depends_on)]:
+                        pending.remove(key)
+                        stage = self.stages[key]
+                        task = asyncio.create_task(self._run_stage(
+                            stage, context, execute,
+                            timeout if stage.timeout is None else stage.timeout,
+                            retries if stage.retries is None else stage.retries,
+                            retry_backoff, semaphore, run_start, verbose, on_stage_start,
+                        ))
+                        running[task] = key
+                    finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    for task in finished:
+                        result = task.result()
+                        del running[task]
+                        results[result.key] = result
+                        context.responses[result.key] = result.text
+                        if on_stage_done is not None:
+                            on_stage_done(result, context)
+            finally:
+                for task in running:
+                    task.cancel()
+            if span is not None:
+                failed = [key for key, result in results.items() if result.status not in ('ok', 'fast_path')]
+                if failed:
+                    span.set_error(f"Stages failed: {', '.join(failed)}")
+
+        ordered = {key: results[key] for level in self.levels for key in level}
+        return PipelineRun(self.name, ordered, time.perf_counter() - run_start)
+
+    async def _run_stage(self, stage: Stage, context: PipelineContext, execute, timeout: Optional[float], retries: int,
+                         retry_backoff: float, semaphore, run_start: float, verbose: bool, on_stage_start) -> StageResult:
+        if semaphore is not None:
+            async with semaphore:
+                return await self._attempt_stage(stage, context, execute, timeout, retries, retry_backoff, run_start,
+                                                 verbose, on_stage_start)
+        return await self._attempt_stage(stage, context, execute, timeout, retries, retry_backoff, run_start,
+                                         verbose, on_stage_start)
+
+    async def _attempt_stage(self, stage: Stage, context: PipelineContext, execute, timeout: Optional[float], retries: int,
+                             retry_backoff: float, run_start: float, verbose: bool, on_stage_start) -> StageResult:
+        stage_attributes = {'stage.key': stage.key, 'gen_ai.agent.name': stage.agent_name}
+        with trace_span(f"stage {stage.key}", 'stage', stage_attributes) as span:
+            result = StageResult(stage.key, stage.title, stage.agent_name)
+            start = time.perf_counter()
+            result.started = start - run_start
+            if on_stage_start is not None:
+                on_stage_start(stage, context)
+
+            if stage.fast_path is not None:
+                try:
+                    text = stage.fast_path(context)
+                except Exception as e:
+                    print(f"❌ {stage.title} fast path failed: {str(e)}")
+                    text = None
+                    result.error = str(e)
+                if text is not None:
+                    result.status, result.text = 'fast_path', text
+                elif not stage.agent_name:
+                    result.status = 'error'
+
+            if result.status == 'pending':
+                if verbose:
+                    print(f"▶️  {stage.title} started at {result.started:.2f}s")
+                try:
+                    prompt = stage.prompt(context)
+                except Exception as e:
+                    print(f"❌ {stage.title} prompt could not be built: {str(e)}")
+                    result.status, result.error = 'error', str(e)
+                    prompt = None
+                attempts = retries + 1 if prompt is not None else 0
+                for attempt in range(attempts):
+                    result.attempts = attempt + 1
+                    try:
+                        if timeout is None:
+                            result.text = await execute(stage, prompt, context)
+                        else:
+                            result.text = await asyncio.wait_for(execute(stage, prompt, context), timeout=timeout)
+                        result.status, result.error = 'ok', ""
+                        break
+                    except asyncio.TimeoutError:
+                        result.status, result.error = 'timeout', f"timed out after {timeout:g}s"
+                        print(f"⏱️  {stage.title} timed out after {timeout:g}s (attempt {attempt + 1}/{attempts})")
+                    except Exception as e:
+                        result.status, result.error = 'error', str(e)
+                        print(f"❌ {stage.title} failed: {str(e)} (attempt {attempt + 1}/{attempts})")
+                    if attempt + 1 < attempts:
+                        await asyncio.sleep(retry_backoff * (2 ** attempt))
+
+            result.elapsed = time.perf_counter() - start
+            if verbose and result.status in ('ok', 'fast_path'):
+                via = " (fast path)" if result.status == 'fast_path' else ""
+                print(f"✅ {stage.title} finished after {result.elapsed:.2f}s{via}")
+            if span is not None:
+                span.attributes['stage.status'] = result.status
+                if result.attempts:
+                    span.attributes['stage.attempts'] = result.attempts
+                if result.status not in ('ok', 'fast_path'):
+                    span.set_error(result.error or result.status)
+        return result
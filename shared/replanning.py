@@ -0,0 +1,211 @@
+"""
+Change-aware re-planning: rerun only the stages a changed client field affects.
+
+Every agent stage's output is stored per client together with the normalized
+intake it was produced from. On a re-plan (a weekly check-in with a new
+weight, a new injury, other equipment) the new intake is diffed against each
+stage's snapshot, the changed fields are mapped to the stages that consume
+them (FIELD_STAGES), and those stages plus everything downstream of them in
+the pipeline are rerun. All other stages take a fast path that returns their
+stored output, so a weight change costs the PT, Nutrition and Head Coach
+stages instead of all five agents.
+
+Stored outputs are keyed by a stable client identity (plan_client_id: the
+intake's client_id, else the normalized name), so a check-in with a new weight
+finds the outputs of the client's previous run.
+
+The Reception output is reused unless a field it consumes changed; the client
+profile is always rebuilt from the new intake, so downstream prompts carry the
+new values even when they embed an older intake digest.
+
+Configuration (environment variables):
+    FITTELLIGENCE_PLAN_DB   Path of the stage output store, or "off" to disable re-planning
+                            (default: ~/.cache/fittelligence/plans.sqlite)
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+# Add parent directory to path for shared modules
+_parent_dir = Path(__file__).parent.parent
+if str(_parent_dir) not in sys.path:
+    sys.path.insert(0, str(_parent_dir))
+
+from shared.client_profile import ClientProfile
+from shared.mobility_scoring import client_key
+
+
+DEFAULT_PLAN_DB_PATH = Path.home() / '.cache' / 'fittelligence' / 'plans.sqlite'
+
+_DISABLED_VALUES = {'off', '0', 'false', 'no', 'none', ''}
+
+# Intake field -> agent stages whose output depends on it directly.
+# Downstream stages (the Head Coach) follow from the pipeline's dependencies.
+FIELD_STAGES = {
+    'name': ('head_coach',),
+    'age': ('body_scanner', 'pt', 'nutrition'),
+    'weight': ('pt', 'nutrition'),
+    'height': ('nutrition',),
+    'gender': ('body_scanner', 'nutrition'),
+    'activity_level': ('pt', 'nutrition'),
+    'fitness_goals': ('pt', 'nutrition'),
+    'experience': ('pt',),
+    'equipment': ('pt',),
+    'medical_conditions': ('reception', 'body_scanner', 'pt', 'nutrition'),
+    'additional_notes': ('reception', 'pt', 'nutrition'),
+}
+
+
+def plan_client_id(record: dict) -> str:
+    """
+    Stable client identity for the plan history: the record's client_id, else its normalized name.
+
+    Per-record ids such as a hash of the intake change with every check-in, so
+    they cannot key the history. Returns "" when the record has neither.
+    """
+    return client_key(record.get('client_id') or record.get('name') or "")
+
+
+def normalized_client_info(client_info: dict) -> dict:
+    """Intake dict in canonical form, so "70" and "70 kg" or reordered spacing compare equal"""
+    return ClientProfile.from_client_info(client_info).to_client_info()
+
+
+def changed_fields(old_info: dict, new_info: dict) -> tuple:
+    """Names of the intake fields whose normalized values differ, in intake order"""
+    old, new = normalized_client_info(old_info), normalized_client_info(new_info)
+    return tuple(key for key in new if old.get(key) != new[key])
+
+
+class PlanHistory:
+    """Latest output of each agent stage per client, with the intake it was produced from"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS stage_outputs (
+                    client_id TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    client_info TEXT NOT NULL,
+                    output TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (client_id, stage)
+                ) WITHOUT ROWID"""
+            )
+
+    def load(self, client_id: str) -> dict:
+        """Return {stage: (client_info, output)} for a client"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, client_info, output FROM stage_outputs WHERE client_id = ?",
+                (client_key(client_id),)
+            ).fetchall()
+        return {stage: (json.loads(info), output) for stage, info, output in rows}
+
+    def save(self, client_id: str, client_info: dict, outputs: dict):
+        """Store stage outputs produced from client_info; empty outputs (failed stages) are skipped"""
+        snapshot = json.dumps(normalized_client_info(client_info), sort_keys=True)
+        now = time.time()
+        rows = [(client_key(client_id), stage, snapshot, text, now) for stage, text in outputs.items() if text]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO stage_outputs (client_id, stage, client_info, output, updated_at) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+@dataclass(frozen=True)
+class ReplanDecision:
+    """Which stages a re-plan reruns and which stored outputs it reuses"""
+    client_id: str
+    changed_fields: tuple
+    rerun: tuple
+    reused: dict
+
+    def describe(self) -> str:
+        """One line for run reports"""
+        if not self.reused and not self.changed_fields:
+            return f"Re-plan: no stored outputs for {self.client_id}, running every stage"
+        changed = ", ".join(self.changed_fields) or "nothing"
+        rerun = ", ".join(self.rerun) or "none"
+        reused = ", ".join(self.reused) or "none"
+        return f"Re-plan: changed {changed} → rerunning {rerun}; reusing {reused}"
+
+
+def plan_replan(client_id: str, client_info: dict, pipeline, history: Optional[PlanHistory]) -> ReplanDecision:
+    """
+    Decide which agent stages of a pipeline must rerun for a client's new intake.
+
+    A stage reruns if it has no stored output, if a field it consumes changed
+    since its output was produced (fields missing from FIELD_STAGES affect
+    every stage), or if any stage it depends on, directly or through
+    fast-path stages such as the client profile, reruns.
+
+    Args:
+        client_id: Client name or id (normalized with client_key)
+        client_info: New intake dict
+        pipeline: shared.pipeline.Pipeline with the full set of stages
+        history: Stored stage outputs, or None to rerun everything
+
+    Returns:
+        ReplanDecision with the stages to rerun and the stored outputs to reuse
+    """
+    stored = history.load(client_id) if history is not None else {}
+    order = [key for level in pipeline.levels for key in level]
+    agent_stages = [key for key in order if pipeline.stages[key].agent_name]
+
+    changed = set()
+    affected = set()
+    for stage in agent_stages:
+        if stage not in stored:
+            affected.add(stage)
+            continue
+        fields = changed_fields(stored[stage][0], client_info)
+        changed.update(fields)
+        if any(stage in FIELD_STAGES.get(field, agent_stages) for field in fields):
+            affected.add(stage)
+
+    # Propagate in dependency order; non-agent stages pass changes through
+    for key in order:
+        if any(dep in affected for dep in pipeline.stages[key].depends_on):
+            affected.add(key)
+
+    rerun = tuple(stage for stage in agent_stages if stage in affected)
+    reused = {stage: stored[stage][1] for stage in agent_stages if stage not in affected}
+    changed = tuple(field for field in normalized_client_info(client_info) if field in changed)
+    return ReplanDecision(client_key(client_id), changed, rerun, reused)
+
+
+_history = None
+_history_configured = False
+_lock = threading.Lock()
+
+
+def get_plan_history() -> Optional[PlanHistory]:
+    """Return the process-wide stage output store, or None if re-planning is disabled"""
+    global _history, _history_configured
+    if _history_configured:
+        return _history
+    with _lock:
+        if not _history_configured:
+            setting = os.getenv('FITTELLIGENCE_PLAN_DB', str(DEFAULT_PLAN_DB_PATH))
+            if setting.strip().lower() not in _DISABLED_VALUES:
+                _history = PlanHistory(setting)
+            _history_configured = True
+    return _history
@@ -0,0 +1,166 @@
+"""
+Persistent, content-addressed cache for agent responses.
+
+Keys combine the agent name, the model string, a hash of the agent's
+instruction and the whitespace-normalized prompt, so a changed instruction or
+model never serves a stale answer. Entries live in a SQLite file with an LRU
+size cap and TTL expiry; hit/miss counters are kept per process.
+
+Configuration (environment variables):
+    FITTELLIGENCE_RESPONSE_CACHE   Path of the SQLite file, or "off" to disable
+                                   (default: ~/.cache/fittelligence/responses.sqlite)
+    FITTELLIGENCE_CACHE_TTL        Entry lifetime in seconds (default: 7 days)
+    FITTELLIGENCE_CACHE_MAX_ENTRIES  LRU size cap (default: 5000)
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+
+DEFAULT_CACHE_PATH = Path.home() / '.cache' / 'fittelligence' / 'responses.sqlite'
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+
+_DISABLED_VALUES = {'off', '0', 'false', 'no', 'none', ''}
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so formatting-only differences share a cache entry"""
+    return " ".join(prompt.split())
+
+
+def model_string(agent) -> str:
+    """
+    Return the model identity of an agent whether it holds a string or a model object.
+
+    Model objects are prefixed with their class name so that, e.g., the offline
+    FakeLlm never shares cache entries with the live model of the same name.
+    """
+    model = getattr(agent, 'model', '')
+    if isinstance(model, str):
+        return model
+    return f"{type(model).__name__}:{getattr(model, 'model', '')}"
+
+
+def instruction_hash(agent) -> str:
+    instruction = getattr(agent, 'instruction', '')
+    if callable(instruction):
+        instruction = f"{instruction.__module__}.{instruction.__qualname__}"
+    return hashlib.sha256(str(instruction).encode('utf-8')).hexdigest()
+
+
+def make_cache_key(agent_name: str, model: str, instruction_digest: str, prompt: str) -> str:
+    material = "\x1f".join([agent_name, model, instruction_digest, normalize_prompt(prompt)])
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def cache_key_for_agent(agent, prompt: str) -> str:
+    """Build the cache key for sending prompt to agent"""
+    return make_cache_key(agent.name, model_string(agent), instruction_hash(agent), prompt)
+
+
+class ResponseCache:
+    """SQLite-backed response cache with LRU eviction and TTL expiry"""
+
+    def __init__(self, path, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'stores': 0, 'evictions': 0}
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    agent_name TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            response, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.stats['hits'] += 1
+            return response
+
+    def put(self, key: str, agent_name: str, response: str):
+        """Store a response and evict least recently used entries beyond the size cap"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, agent_name, response, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, agent_name, response, now, now)
+            )
+            self.stats['stores'] += 1
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+            excess = count - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                    (excess,)
+                )
+                self.stats['evictions'] += excess
+
+    def purge_expired(self) -> int:
+        """Delete every expired entry and return how many were removed"""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,))
+            self.stats['expired'] += cursor.rowcount
+            return cursor.rowcount
+
+    def hit_rate(self) -> float:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache = None
+_cache_configured = False
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the process-wide response cache, or None if caching is disabled"""
+    global _cache, _cache_configured
+    if _cache_configured:
+        return _cache
+    with _cache_lock:
+        if not _cache_configured:
+            setting = os.getenv('FITTELLIGENCE_RESPONSE_CACHE', str(DEFAULT_CACHE_PATH))
+            if setting.strip().lower() not in _DISABLED_VALUES:
+                _cache = ResponseCache(
+                    setting,
+                    max_entries=int(os.getenv('FITTELLIGENCE_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+                    ttl_seconds=float(os.getenv('FITTELLIGENCE_CACHE_TTL', DEFAULT_TTL_SECONDS)),
+                )
+            _cache_configured = True
+    return _cache
@@ -0,0 +1,166 @@
+"""
+Per-agent response collection and latency metrics.
+
+ResponseCollector consumes runner events (streamed or not), keeps response
+chunks in a list and records time-to-first-token, total latency and output
+token rate for each agent run. Completed runs are kept in a bounded,
+process-wide log so perceived latency (TTFT) can be tracked separately from
+total latency.
+"""
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+
+# Rough characters-per-token ratio used when the model reports no usage metadata
+CHARS_PER_TOKEN = 4
+
+# Number of completed runs kept in the process-wide log
+MAX_RECORDED_RUNS = 1000
+
+
+def _default_event_text(event) -> str:
+    content = getattr(event, 'content', None)
+    if content is None or not getattr(content, 'parts', None):
+        return ""
+    return "".join(part.text for part in content.parts if getattr(part, 'text', None))
+
+
+@dataclass
+class AgentRunMetrics:
+    """Timing and size metrics for a single agent run"""
+    agent_name: str
+    started_at: float
+    first_token_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    events: int = 0
+    chunks: int = 0
+    output_chars: int = 0
+    reported_output_tokens: int = 0
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def total_time(self) -> Optional[float]:
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    @property
+    def output_tokens(self) -> int:
+        """Output tokens reported by the model, estimated from text if unreported"""
+        if self.reported_output_tokens:
+            return self.reported_output_tokens
+        return self.output_chars // CHARS_PER_TOKEN
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """Output token rate over the generation window (first token to finish)"""
+        if self.first_token_at is None or self.finished_at is None:
+            return None
+        window = self.finished_at - self.first_token_at
+        if window <= 0:
+            return None
+        return self.output_tokens / window
+
+    def to_dict(self) -> dict:
+        return {
+            'agent_name': self.agent_name,
+            'ttft_s': self.time_to_first_token,
+            'total_s': self.total_time,
+            'output_tokens': self.output_tokens,
+            'tokens_per_s': self.tokens_per_second,
+            'events': self.events,
+            'chunks': self.chunks,
+        }
+
+
+class ResponseCollector:
+    """
+    Accumulates the text of a run's events into a list of chunks.
+
+    With SSE streaming, ADK emits partial events followed by one aggregated
+    non-partial event repeating the same text; the aggregated text is skipped
+    when its partials were already collected.
+    """
+
+    def __init__(self, agent_name: str, on_chunk: Optional[Callable[[str], None]] = None,
+                 text_of: Callable = _default_event_text):
+        self.metrics = AgentRunMetrics(agent_name=agent_name, started_at=time.perf_counter())
+        self._chunks = []
+        self._on_chunk = on_chunk
+        self._text_of = text_of
+        self._streamed_since_final = False
+
+    def add(self, event):
+        """Record one runner event"""
+        self.metrics.events += 1
+        usage = getattr(event, 'usage_metadata', None)
+        partial = bool(getattr(event, 'partial', False))
+        if usage is not None and not partial:
+            self.metrics.reported_output_tokens += getattr(usage, 'candidates_token_count', None) or 0
+
+        text = self._text_of(event)
+        if partial:
+            self._streamed_since_final = True
+        elif self._streamed_since_final:
+            # Aggregate of partials we already have
+            self._streamed_since_final = False
+            return
+        if not text:
+            return
+
+        if self.metrics.first_token_at is None:
+            self.metrics.first_token_at = time.perf_counter()
+        self._chunks.append(text)
+        self.metrics.chunks += 1
+        self.metrics.output_chars += len(text)
+        if self._on_chunk is not None:
+            self._on_chunk(text)
+
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    def finish(self) -> AgentRunMetrics:
+        """Stamp the end time and record the run in the process-wide log"""
+        if self.metrics.finished_at is None:
+            self.metrics.finished_at = time.perf_counter()
+            record_run(self.metrics)
+        return self.metrics
+
+
+_runs = deque(maxlen=MAX_RECORDED_RUNS)
+_runs_lock = threading.Lock()
+
+
+def record_run(metrics: AgentRunMetrics):
+    with _runs_lock:
+        _runs.append(metrics)
+
+
+def recorded_runs() -> list:
+    """Return a snapshot of the recorded runs, oldest first"""
+    with _runs_lock:
+        return list(_runs)
+
+
+def clear_recorded_runs():
+    with _runs_lock:
+        _runs.clear()
+
+
+def format_run_metrics(runs: list) -> str:
+    """Render one line per run with TTFT, total time and token rate"""
+    lines = [f"  {'Agent':<22} {'TTFT':>8} {'Total':>8} {'Tokens':>7} {'Tok/s':>8}"]
+    for run in runs:
+        ttft = f"{run.time_to_first_token:.2f}s" if run.time_to_first_token is not None else "-"
+        total = f"{run.total_time:.2f}s" if run.total_time is not None else "-"
+        rate = f"{run.tokens_per_second:.1f}" if run.tokens_per_second is not None else "-"
+        lines.append(f"  {run.agent_name:<22} {ttft:>8} {total:>8} {run.output_tokens:>7} {rate:>8}")
+    return "\n".join(lines)
@@ -0,0 +1,40 @@
+"""
+Search-only agent behind the cached web_search tool (shared/web_search.py).
+
+Google Search is a built-in tool that runs on the model side, so its results
+cannot be intercepted inside the agent that uses it. The FitTelligence agents
+call web_search instead, which runs this agent through the runner pool on a
+cache miss and caches its findings.
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path for shared modules
+_parent_dir = Path(__file__).parent.parent
+if str(_parent_dir) not in sys.path:
+    sys.path.insert(0, str(_parent_dir))
+
+from google.adk.agents.llm_agent import Agent
+from google.adk.tools import google_search
+
+from shared.model_backend import resolve_model
+from shared.tracing import trace_model_end, trace_model_error, trace_model_start
+
+
+search_agent = Agent(
+    model=resolve_model('gemini-2.5-flash'),
+    name='search_agent',
+    description='Runs a Google Search and summarizes the findings for the other agents.',
+    instruction="""You run Google searches for a team of fitness and nutrition specialists.
+
+For every request:
+1. Search for the query with Google Search
+2. Reply with the key findings as up to 8 short bullet points (facts, numbers, recommendations)
+3. End with the titles and URLs of the sources you used
+
+Report only what the search results support. Do not add greetings, advice for the client or follow-up questions.""",
+    tools=[google_search],
+    before_model_callback=trace_model_start,
+    after_model_callback=trace_model_end,
+    on_model_error_callback=trace_model_error,
+)
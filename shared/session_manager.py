@@ -0,0 +1,277 @@
+"""
+Reusable Runner and session manager for the demo pipelines.
+
+Sessions are tracked by (app_name, user_id, session_id) with get-or-create
+semantics: the first request for a key does one lookup and, only if needed,
+one create; later requests for the same key touch the session service not at
+all. Runners are cached per app. Both caches are bounded LRUs so long-running
+processes don't accumulate Runners or session keys.
+
+Runners share an in-memory artifact service per manager, where history
+compaction keeps each session's rolling summary artifact.
+
+Runners are given the process-wide memory service (shared/vector_memory.py)
+that backs PreloadMemoryTool; remember_session indexes the events of the turn
+just run into it, fetching only the events after the turn's start time.
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+# Add parent directory to path for cross-agent imports
+_parent_dir = Path(__file__).parent.parent
+if str(_parent_dir) not in sys.path:
+    sys.path.insert(0, str(_parent_dir))
+
+from shared.agent_registry import import_framework
+
+
+# Default cache bounds
+DEFAULT_MAX_RUNNERS = 32
+DEFAULT_MAX_SESSIONS = 4096
+
+# Managers kept for explicitly passed session services (least recently used are dropped)
+MAX_MANAGERS = 16
+
+
+def _existence_check():
+    """
+    Session fetch config for existence checks: at most one event.
+
+    num_recent_events=0 would be the natural choice, but InMemorySessionService
+    treats 0 as "no limit" and copies every event.
+    """
+    from google.adk.sessions.base_session_service import GetSessionConfig
+    return GetSessionConfig(num_recent_events=1)
+
+
+def _turn_config(since: float = None):
+    """Session fetch config for the events of a turn that started at `since`"""
+    if since is None:
+        return None
+    from google.adk.sessions.base_session_service import GetSessionConfig
+    return GetSessionConfig(after_timestamp=since)
+
+
+def get_memory_service():
+    """Return the process-wide memory service (shared/vector_memory.py), or None if disabled"""
+    import_framework()
+    from shared.vector_memory import get_memory_service as get_vector_memory_service
+    return get_vector_memory_service()
+
+
+def create_session_service():
+    """
+    Create the session service selected by the environment.
+
+    With FITTELLIGENCE_SESSION_DB set to a file path, sessions persist in a
+    shared SQLite database (shared/sqlite_session_service.py); otherwise they
+    live in memory for the lifetime of the process.
+    """
+    import_framework()
+    db_path = os.getenv('FITTELLIGENCE_SESSION_DB', '').strip()
+    if db_path:
+        from shared.sqlite_session_service import SqliteSessionService
+        return SqliteSessionService(db_path)
+    from google.adk.sessions import InMemorySessionService
+    return InMemorySessionService()
+
+
+class RunnerSessionManager:
+    """Caches Runners per app and known sessions per (app_name, user_id, session_id)"""
+
+    def __init__(self, session_service=None, max_runners: int = DEFAULT_MAX_RUNNERS, max_sessions: int = DEFAULT_MAX_SESSIONS,
+                 memory_service=None, artifact_service=None):
+        self.session_service = session_service or create_session_service()
+        self.memory_service = memory_service or get_memory_service()
+        self.artifact_service = artifact_service
+        self.max_runners = max_runners
+        self.max_sessions = max_sessions
+        self._runners = OrderedDict()
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            'runners_created': 0,
+            'runners_evicted': 0,
+            'sessions_created': 0,
+            'sessions_reused': 0,
+            'session_lookups': 0,
+        }
+
+    def get_runner(self, agent):
+        """Return the cached Runner for an agent, creating it on first use"""
+        from google.adk import Runner
+        from google.adk.artifacts import InMemoryArtifactService
+        app_name = agent.name
+        with self._lock:
+            runner = self._runners.get(app_name)
+            if runner is not None and runner.agent is agent:
+                self._runners.move_to_end(app_name)
+                return runner
+            if self.artifact_service is None:
+                self.artifact_service = InMemoryArtifactService()
+            runner = Runner(
+                agent=agent,
+                app_name=app_name,
+                session_service=self.session_service,
+                memory_service=self.memory_service,
+                artifact_service=self.artifact_service
+            )
+            self._runners[app_name] = runner
+            self.stats['runners_created'] += 1
+            while len(self._runners) > self.max_runners:
+                self._runners.popitem(last=False)
+                self.stats['runners_evicted'] += 1
+        return runner
+
+    def _is_known(self, key) -> bool:
+        with self._lock:
+            if key in self._sessions:
+                self._sessions.move_to_end(key)
+                self.stats['sessions_reused'] += 1
+                return True
+        return False
+
+    def _remember(self, key, created: bool):
+        with self._lock:
+            self._sessions[key] = True
+            self._sessions.move_to_end(key)
+            self.stats['session_lookups'] += 1
+            if created:
+                self.stats['sessions_created'] += 1
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def ensure_session(self, app_name: str, user_id: str, session_id: str) -> bool:
+        """
+        Get or create a session using the synchronous session API.
+
+        Returns:
+            True if the session was created by this call
+        """
+        key = (app_name, user_id, session_id)
+        if self._is_known(key):
+            return False
+        session = self.session_service.get_session_sync(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            config=_existence_check()
+        )
+        created = session is None
+        if created:
+            self.session_service.create_session_sync(
+                app_name=app_name,
+                user_id=user_id,
+                session_id=session_id
+            )
+        self._remember(key, created)
+        return created
+
+    async def ensure_session_async(self, app_name: str, user_id: str, session_id: str) -> bool:
+        """
+        Get or create a session using the async session API.
+
+        Returns:
+            True if the session was created by this call
+        """
+        key = (app_name, user_id, session_id)
+        if self._is_known(key):
+            return False
+        session = await self.session_service.get_session(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            config=_existence_check()
+        )
+        created = session is None
+        if created:
+            await self.session_service.create_session(
+                app_name=app_name,
+                user_id=user_id,
+                session_id=session_id
+            )
+        self._remember(key, created)
+        return created
+
+    def remember_session(self, app_name: str, user_id: str, session_id: str, since: float = None) -> int:
+        """
+        Index a session's events into the memory service (synchronous API).
+
+        Args:
+            app_name: Application name
+            user_id: User identifier
+            session_id: Session identifier
+            since: Start time (time.time()) of the turn just run; only events from
+                then on are fetched and indexed. None indexes the whole session.
+
+        Returns:
+            Number of new memory rows (0 if the memory service has no sync API)
+        """
+        add_session_sync = getattr(self.memory_service, 'add_session_sync', None)
+        if add_session_sync is None:
+            return 0
+        session = self.session_service.get_session_sync(app_name=app_name, user_id=user_id, session_id=session_id,
+                                                        config=_turn_config(since))
+        return add_session_sync(session) if session is not None else 0
+
+    async def remember_session_async(self, app_name: str, user_id: str, session_id: str, since: float = None):
+        """Index a session's events since the start of the turn (or all of them) into the memory service"""
+        if self.memory_service is None:
+            return
+        session = await self.session_service.get_session(app_name=app_name, user_id=user_id, session_id=session_id,
+                                                         config=_turn_config(since))
+        if session is not None:
+            await self.memory_service.add_session_to_memory(session)
+
+    def forget_session(self, app_name: str, user_id: str, session_id: str):
+        """Drop a session key, e.g. after the session was deleted elsewhere"""
+        with self._lock:
+            self._sessions.pop((app_name, user_id, session_id), None)
+
+
+# Keyed by id(session_service); each manager holds its service (directly and through
+# its Runners), so an id cannot be reused while its entry exists
+_managers = OrderedDict()
+_default_manager = None
+_managers_lock = threading.Lock()
+
+
+def get_session_manager(session_service=None) -> RunnerSessionManager:
+    """
+    Return the shared manager for a session service.
+
+    Calling this repeatedly with the same service returns the same manager, so
+    Runners and known sessions are reused across calls. Without a service, a
+    process-wide default manager using create_session_service() is used.
+
+    Managers keep their service and Runners alive; at most MAX_MANAGERS are
+    kept, and callers that are done with a service should release it with
+    release_session_manager.
+    """
+    global _default_manager
+    with _managers_lock:
+        if session_service is None:
+            if _default_manager is None:
+                _default_manager = RunnerSessionManager()
+            return _default_manager
+        key = id(session_service)
+        manager = _managers.get(key)
+        if manager is None:
+            manager = RunnerSessionManager(session_service)
+            _managers[key] = manager
+            while len(_managers) > MAX_MANAGERS:
+                _managers.popitem(last=False)
+        else:
+            _managers.move_to_end(key)
+        return manager
+
+
+def release_session_manager(session_service):
+    """Drop the manager of a session service, with its cached Runners and session keys"""
+    with _managers_lock:
+        manager = _managers.get(id(session_service))
+        if manager is not None and manager.session_service is session_service:
+            del _managers[id(session_service)]
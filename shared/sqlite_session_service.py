@@ -0,0 +1,369 @@
+"""
+Durable SQLite session service, a drop-in replacement for InMemorySessionService.
+
+- WAL journal mode with a busy timeout, so several processes can read while one
+  writes and all of them can serve the same client.
+- Sessions are keyed by (app_name, user_id, session_id) and events are indexed
+  on the same columns plus sequence number.
+- Events of one agent turn are buffered and written in a single transaction
+  when the turn's final response arrives. Appends are idempotent on event id,
+  and state deltas are merged into the stored state inside that transaction
+  rather than overwriting it, so concurrent workers neither replay nor lose
+  history.
+- Writes are checked against the session's last update: if another process
+  appended to the session after this one read it, the turn is rejected with
+  ValueError (as ADK's DatabaseSessionService does) instead of interleaving
+  the two histories.
+- Event payloads are only read and decoded for the window a caller asks for
+  (GetSessionConfig.num_recent_events / after_timestamp, inclusive); list_sessions
+  never touches them and the session manager's existence checks read one event.
+
+Both the async BaseSessionService API and the *_sync variants used by
+shared/session_manager.py are provided; the async methods run the blocking
+sqlite3 calls on a worker thread so a locked database never stalls the event
+loop.
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Optional
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.state import State
+
+
+# Flush a turn early if it produces more buffered events than this
+MAX_BUFFERED_EVENTS = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    create_time REAL NOT NULL,
+    update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    invocation_id TEXT,
+    author TEXT,
+    timestamp REAL NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_session ON events (app_name, user_id, session_id, seq);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_events_event_id ON events (app_name, user_id, session_id, event_id);
+
+CREATE TABLE IF NOT EXISTS app_states (
+    app_name TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    update_time REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS user_states (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id)
+) WITHOUT ROWID;
+"""
+
+
+def _split_state_delta(delta: dict) -> tuple:
+    """Split a state delta into (app, user, session) parts, dropping temp: keys"""
+    app_delta, user_delta, session_delta = {}, {}, {}
+    for key, value in (delta or {}).items():
+        if key.startswith(State.APP_PREFIX):
+            app_delta[key[len(State.APP_PREFIX):]] = value
+        elif key.startswith(State.USER_PREFIX):
+            user_delta[key[len(State.USER_PREFIX):]] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session_delta[key] = value
+    return app_delta, user_delta, session_delta
+
+
+class _StaleSessionError(ValueError):
+    """A buffered turn was built on a session another writer has since updated"""
+
+
+class SqliteSessionService(BaseSessionService):
+    """Session service persisting sessions, events and scoped state to SQLite"""
+
+    def __init__(self, db_path, busy_timeout_ms: int = 5000):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._pending = {}
+        # Stored update_time each buffered turn expects to find when it is written
+        self._pending_since = {}
+        self._pending_lock = threading.Lock()
+        conn = self._connection()
+        conn.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; Runner.run drives the agent from its own thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+        return conn
+
+    # --- reads -------------------------------------------------------------
+
+    def _scoped_state(self, conn, app_name: str, user_id: str, session_state: dict) -> dict:
+        state = dict(session_state)
+        row = conn.execute("SELECT state FROM app_states WHERE app_name = ?", (app_name,)).fetchone()
+        for key, value in (json.loads(row[0]) if row else {}).items():
+            state[State.APP_PREFIX + key] = value
+        row = conn.execute(
+            "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?", (app_name, user_id)
+        ).fetchone()
+        for key, value in (json.loads(row[0]) if row else {}).items():
+            state[State.USER_PREFIX + key] = value
+        return state
+
+    def _load_events(self, conn, app_name: str, user_id: str, session_id: str,
+                     config: Optional[GetSessionConfig]) -> list:
+        num_recent = getattr(config, 'num_recent_events', None) if config else None
+        after = getattr(config, 'after_timestamp', None) if config else None
+        if num_recent == 0:
+            return []
+        sql = "SELECT payload FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?"
+        params = [app_name, user_id, session_id]
+        if after is not None:
+            sql += " AND timestamp >= ?"
+            params.append(after)
+        if num_recent:
+            sql = f"SELECT payload FROM ({sql.replace('SELECT payload', 'SELECT seq, payload')} ORDER BY seq DESC LIMIT ?) ORDER BY seq ASC"
+            params.append(num_recent)
+        else:
+            sql += " ORDER BY seq ASC"
+        return [Event.model_validate_json(payload) for (payload,) in conn.execute(sql, params)]
+
+    def get_session_sync(self, *, app_name: str, user_id: str, session_id: str,
+                         config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        self._flush((app_name, user_id, session_id))
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT state, update_time FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?",
+            (app_name, user_id, session_id)
+        ).fetchone()
+        if row is None:
+            return None
+        state_json, update_time = row
+        return Session(
+            id=session_id,
+            app_name=app_name,
+            user_id=user_id,
+            state=self._scoped_state(conn, app_name, user_id, json.loads(state_json)),
+            events=self._load_events(conn, app_name, user_id, session_id, config),
+            last_update_time=update_time,
+        )
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str,
+                          config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        return await asyncio.to_thread(self.get_session_sync, app_name=app_name, user_id=user_id,
+                                       session_id=session_id, config=config)
+
+    def list_sessions_sync(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        conn = self._connection()
+        sql = "SELECT user_id, session_id, update_time FROM sessions WHERE app_name = ?"
+        params = [app_name]
+        if user_id is not None:
+            sql += " AND user_id = ?"
+            params.append(user_id)
+        sessions = [
+            Session(id=session_id, app_name=app_name, user_id=row_user_id, state={}, events=[], last_update_time=update_time)
+            for row_user_id, session_id, update_time in conn.execute(sql, params)
+        ]
+        return ListSessionsResponse(sessions=sessions)
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        return await asyncio.to_thread(self.list_sessions_sync, app_name=app_name, user_id=user_id)
+
+    # --- writes ------------------------------------------------------------
+
+    def _merge_scoped_state(self, conn, app_name: str, user_id: str, app_delta: dict, user_delta: dict, now: float):
+        if app_delta:
+            row = conn.execute("SELECT state FROM app_states WHERE app_name = ?", (app_name,)).fetchone()
+            merged = {**(json.loads(row[0]) if row else {}), **app_delta}
+            conn.execute(
+                "INSERT OR REPLACE INTO app_states (app_name, state, update_time) VALUES (?, ?, ?)",
+                (app_name, json.dumps(merged), now)
+            )
+        if user_delta:
+            row = conn.execute(
+                "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?", (app_name, user_id)
+            ).fetchone()
+            merged = {**(json.loads(row[0]) if row else {}), **user_delta}
+            conn.execute(
+                "INSERT OR REPLACE INTO user_states (app_name, user_id, state, update_time) VALUES (?, ?, ?, ?)",
+                (app_name, user_id, json.dumps(merged), now)
+            )
+
+    def create_session_sync(self, *, app_name: str, user_id: str, state: Optional[dict[str, Any]] = None,
+                            session_id: Optional[str] = None) -> Session:
+        session_id = (session_id or '').strip() or uuid.uuid4().hex
+        app_delta, user_delta, session_state = _split_state_delta(state or {})
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            exists = conn.execute(
+                "SELECT 1 FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                (app_name, user_id, session_id)
+            ).fetchone()
+            if exists:
+                raise ValueError(f"Session {session_id} already exists for app {app_name}, user {user_id}")
+            conn.execute(
+                "INSERT INTO sessions (app_name, user_id, session_id, state, create_time, update_time) VALUES (?, ?, ?, ?, ?, ?)",
+                (app_name, user_id, session_id, json.dumps(session_state), now, now)
+            )
+            self._merge_scoped_state(conn, app_name, user_id, app_delta, user_delta, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return Session(
+            id=session_id,
+            app_name=app_name,
+            user_id=user_id,
+            state=self._scoped_state(conn, app_name, user_id, session_state),
+            events=[],
+            last_update_time=now,
+        )
+
+    async def create_session(self, *, app_name: str, user_id: str, state: Optional[dict[str, Any]] = None,
+                             session_id: Optional[str] = None) -> Session:
+        return await asyncio.to_thread(self.create_session_sync, app_name=app_name, user_id=user_id, state=state,
+                                       session_id=session_id)
+
+    def delete_session_sync(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = (app_name, user_id, session_id)
+        with self._pending_lock:
+            self._pending.pop(key, None)
+            self._pending_since.pop(key, None)
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?", key)
+            conn.execute("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?", key)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await asyncio.to_thread(self.delete_session_sync, app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        """
+        Apply the event to the in-memory session and buffer it until the turn ends.
+
+        Raises:
+            ValueError: When the turn is written, if the session was updated by
+                another writer after this session object was read
+        """
+        if event.partial:
+            return event
+        key = (session.app_name, session.user_id, session.id)
+        since = session.last_update_time
+        event = await super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+        with self._pending_lock:
+            pending = self._pending.setdefault(key, [])
+            self._pending_since.setdefault(key, since)
+            pending.append(event)
+            turn_done = event.is_final_response() or len(pending) >= MAX_BUFFERED_EVENTS
+        if turn_done:
+            await asyncio.to_thread(self._flush, key)
+        return event
+
+    def _flush(self, key: tuple):
+        """Write a session's buffered events and state deltas in one transaction"""
+        with self._pending_lock:
+            events = self._pending.pop(key, None)
+            since = self._pending_since.pop(key, None)
+        if not events:
+            return
+        app_name, user_id, session_id = key
+        app_delta, user_delta, session_delta = {}, {}, {}
+        for event in events:
+            delta = event.actions.state_delta if event.actions else None
+            event_app, event_user, event_session = _split_state_delta(delta)
+            app_delta.update(event_app)
+            user_delta.update(event_user)
+            session_delta.update(event_session)
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR IGNORE INTO events (app_name, user_id, session_id, event_id, invocation_id, author, timestamp, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (app_name, user_id, session_id, event.id, event.invocation_id, event.author,
+                     event.timestamp, event.model_dump_json(exclude_none=True))
+                    for event in events
+                ]
+            )
+            row = conn.execute(
+                "SELECT state, update_time FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?", key
+            ).fetchone()
+            if row is not None:
+                state_json, update_time = row
+                if since is not None and update_time > since:
+                    raise _StaleSessionError(
+                        f"Session {session_id} was updated by another writer at {update_time} after it was read "
+                        f"(last update {since}); reload the session and retry the turn"
+                    )
+                merged = {**json.loads(state_json), **session_delta}
+                # The session object carries the last event's timestamp as its last_update_time
+                conn.execute(
+                    "UPDATE sessions SET state = ?, update_time = ? WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                    (json.dumps(merged), events[-1].timestamp, *key)
+                )
+            self._merge_scoped_state(conn, app_name, user_id, app_delta, user_delta, now)
+            conn.execute("COMMIT")
+        except _StaleSessionError:
+            # The turn's events are dropped: they were built on a stale history
+            conn.execute("ROLLBACK")
+            raise
+        except BaseException:
+            conn.execute("ROLLBACK")
+            with self._pending_lock:
+                self._pending[key] = events + self._pending.get(key, [])
+                if since is not None:
+                    self._pending_since[key] = since
+            raise
+
+    def flush_all(self):
+        """Write every buffered turn, e.g. before shutdown"""
+        with self._pending_lock:
+            keys = list(self._pending)
+        for key in keys:
+            self._flush(key)
+
+    def close(self):
+        self.flush_all()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,413 @@
+"""
+Tracing spans for pipelines, stages, agent turns, model calls and tool calls.
+
+Spans nest through a context variable, so a stage started by the pipeline
+engine, the agent turn it runs, the model calls and tool calls of that turn
+and any sub-agent an A2A tool invokes all end up in one trace. Model and tool
+spans come from ADK callbacks (trace_model_start/end/error,
+trace_tool_start/end/error) registered on every agent, so a call that raises
+still closes its span, marked as an error; when ADK drives an agent from its own thread
+(Runner.run), where the context variable is not inherited, they attach to the
+agent turn through its session instead.
+
+Spans carry OpenTelemetry-style attributes (gen_ai.agent.name,
+gen_ai.usage.input_tokens, prompt and response sizes, tool names, cache
+hits) and are written as OTLP/JSON lines, one ExportTraceServiceRequest per
+finished trace, which OpenTelemetry collectors can ingest and trace_report.py
+renders as a per-run waterfall or a hot-span table across runs.
+
+Tracing is off unless a trace file is configured; disabled spans cost one
+attribute check.
+
+Configuration (environment variables):
+    FITTELLIGENCE_TRACE_FILE   OTLP/JSON lines file to append traces to, or "off" (default: off)
+"""
+import atexit
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+
+# Buffered spans that force an export even before their trace's root span ends
+MAX_BUFFERED_SPANS = 512
+
+SERVICE_NAME = 'fittelligence'
+
+_DISABLED_VALUES = {'off', '0', 'false', 'no', 'none', ''}
+
+# Span kinds -> OTLP SpanKind (model calls leave the process, everything else is internal)
+_OTLP_KINDS = {'model': 3}
+_OTLP_KIND_INTERNAL = 1
+_OTLP_STATUS = {'ok': 1, 'error': 2}
+
+_current_span = contextvars.ContextVar('fittelligence_current_span', default=None)
+
+
+@dataclass
+class Span:
+    name: str
+    kind: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: Optional[int] = None
+    attributes: dict = field(default_factory=dict)
+    status: str = 'ok'
+    status_message: str = ""
+
+    def set(self, **attributes):
+        """Set attributes given as keyword arguments (for names without dots)"""
+        self.attributes.update(attributes)
+
+    def set_error(self, message: str):
+        self.status, self.status_message = 'error', message
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_otlp(self) -> dict:
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': _OTLP_KINDS.get(self.kind, _OTLP_KIND_INTERNAL),
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns or self.start_ns),
+            'attributes': [_otlp_attribute(key, value)
+                           for key, value in {'fittelligence.kind': self.kind, **self.attributes}.items()],
+            'status': {'code': _OTLP_STATUS[self.status], 'message': self.status_message},
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+    @classmethod
+    def from_otlp(cls, data: dict) -> "Span":
+        attributes = {item['key']: _attribute_value(item.get('value', {})) for item in data.get('attributes', [])}
+        code = data.get('status', {}).get('code', 1)
+        return cls(
+            name=data['name'],
+            kind=attributes.pop('fittelligence.kind', 'internal'),
+            trace_id=data['traceId'],
+            span_id=data['spanId'],
+            parent_id=data.get('parentSpanId') or None,
+            start_ns=int(data['startTimeUnixNano']),
+            end_ns=int(data['endTimeUnixNano']),
+            attributes=attributes,
+            status='error' if code == 2 else 'ok',
+            status_message=data.get('status', {}).get('message', ""),
+        )
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+def _attribute_value(value: dict):
+    if 'intValue' in value:
+        return int(value['intValue'])
+    if 'doubleValue' in value:
+        return float(value['doubleValue'])
+    if 'boolValue' in value:
+        return bool(value['boolValue'])
+    return value.get('stringValue', "")
+
+
+class OtlpJsonFileExporter:
+    """Appends spans to a file as OTLP/JSON lines (one ExportTraceServiceRequest per export)"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, spans: list):
+        request = {'resourceSpans': [{
+            'resource': {'attributes': [_otlp_attribute('service.name', SERVICE_NAME)]},
+            'scopeSpans': [{'scope': {'name': SERVICE_NAME}, 'spans': [span.to_otlp() for span in spans]}],
+        }]}
+        line = json.dumps(request, separators=(',', ':')) + "\n"
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+
+def read_spans(path) -> list:
+    """Load every span from an OTLP/JSON lines file"""
+    spans = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            for resource_spans in json.loads(line).get('resourceSpans', []):
+                for scope_spans in resource_spans.get('scopeSpans', []):
+                    spans.extend(Span.from_otlp(span) for span in scope_spans.get('spans', []))
+    return spans
+
+
+class Tracer:
+    """Creates spans, tracks the ones opened by callbacks and exports finished traces"""
+
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+        self.enabled = exporter is not None
+        self._buffer = []
+        self._open = {}
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def start_span(self, name: str, kind: str = 'internal', parent: Optional[Span] = None,
+                   attributes: dict = None) -> Span:
+        return Span(
+            name=name,
+            kind=kind,
+            trace_id=parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}",
+            span_id=f"{random.getrandbits(64):016x}",
+            parent_id=parent.span_id if parent is not None else None,
+            start_ns=time.time_ns(),
+            attributes=dict(attributes or {}),
+        )
+
+    def end_span(self, span: Span):
+        span.end_ns = time.time_ns()
+        with self._lock:
+            self._buffer.append(span)
+            if span.parent_id is not None and len(self._buffer) < MAX_BUFFERED_SPANS:
+                return
+            spans, self._buffer = self._buffer, []
+        self.exporter.export(spans)
+
+    def flush(self):
+        with self._lock:
+            spans, self._buffer = self._buffer, []
+        if spans:
+            self.exporter.export(spans)
+
+    def open_span(self, key, span: Span):
+        """Remember a span started in one callback so the matching callback can end it"""
+        with self._lock:
+            self._open[key] = span
+
+    def close_span(self, key) -> Optional[Span]:
+        with self._lock:
+            return self._open.pop(key, None)
+
+    def peek_span(self, key) -> Optional[Span]:
+        with self._lock:
+            return self._open.get(key)
+
+    def bind_session(self, session_key: tuple, span: Optional[Span]):
+        """Make span the parent of callback spans for this (app_name, user_id, session_id)"""
+        with self._lock:
+            if span is None:
+                self._sessions.pop(session_key, None)
+            else:
+                self._sessions[session_key] = span
+
+    def session_span(self, session_key: Optional[tuple]) -> Optional[Span]:
+        with self._lock:
+            return self._sessions.get(session_key)
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer (disabled unless FITTELLIGENCE_TRACE_FILE is set)"""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                setting = os.getenv('FITTELLIGENCE_TRACE_FILE', 'off')
+                exporter = None
+                if setting.strip().lower() not in _DISABLED_VALUES:
+                    exporter = OtlpJsonFileExporter(setting)
+                _tracer = Tracer(exporter)
+                if exporter is not None:
+                    atexit.register(_tracer.flush)
+    return _tracer
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def trace_span(name: str, kind: str = 'internal', attributes: dict = None, session: Optional[tuple] = None):
+    """
+    Run a block inside a span that is a child of the current span.
+
+    Args:
+        name: Span name (e.g., "stage pt", "agent pt_agent")
+        kind: pipeline, stage, agent, model, tool or internal
+        attributes: Initial attributes
+        session: (app_name, user_id, session_id) whose callback spans nest under this one
+
+    Yields:
+        The Span (None when tracing is disabled)
+    """
+    tracer = get_tracer()
+    if not tracer.enabled:
+        yield None
+        return
+    span = tracer.start_span(name, kind, _current_span.get(), attributes)
+    token = _current_span.set(span)
+    if session is not None:
+        tracer.bind_session(session, span)
+    try:
+        yield span
+    except BaseException as e:
+        span.set_error(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        if session is not None:
+            tracer.bind_session(session, None)
+        _current_span.reset(token)
+        tracer.end_span(span)
+
+
+def _session_key(context) -> Optional[tuple]:
+    session = context.session
+    if session is None:
+        return None
+    return (session.app_name, session.user_id, session.id)
+
+
+def _parent_for(tracer: Tracer, context) -> Optional[Span]:
+    return _current_span.get() or tracer.session_span(_session_key(context))
+
+
+def _content_chars(contents) -> int:
+    return sum(len(getattr(part, 'text', None) or "") for content in contents or [] for part in content.parts or [])
+
+
+def trace_model_start(callback_context, llm_request):
+    """before_model_callback: open a model-call span (register after any callback that rewrites the request)"""
+    tracer = get_tracer()
+    if not tracer.enabled:
+        return None
+    span = tracer.start_span(f"model {callback_context.agent_name}", 'model', _parent_for(tracer, callback_context), {
+        'gen_ai.agent.name': callback_context.agent_name,
+        'gen_ai.request.model': str(getattr(llm_request, 'model', None) or ""),
+        'prompt.messages': len(llm_request.contents or []),
+        'prompt.chars': _content_chars(llm_request.contents),
+        'prompt.tools': len(getattr(llm_request, 'tools_dict', None) or {}),
+    })
+    tracer.open_span(('model', callback_context.invocation_id, callback_context.agent_name), span)
+    return None
+
+
+def trace_model_end(callback_context, llm_response):
+    """after_model_callback: record sizes and token counts and close the model-call span"""
+    tracer = get_tracer()
+    if not tracer.enabled:
+        return None
+    key = ('model', callback_context.invocation_id, callback_context.agent_name)
+    if getattr(llm_response, 'partial', False):
+        # Streaming chunk: note the first one, close the span on the final response
+        span = tracer.peek_span(key)
+        if span is not None and 'first_chunk_ms' not in span.attributes:
+            span.set(first_chunk_ms=round((time.time_ns() - span.start_ns) / 1e6, 1))
+        return None
+    span = tracer.close_span(key)
+    if span is None:
+        return None
+    parts = (llm_response.content.parts or []) if llm_response.content else []
+    span.attributes['response.chars'] = sum(len(getattr(part, 'text', None) or "") for part in parts)
+    span.attributes['response.function_calls'] = sum(1 for part in parts if getattr(part, 'function_call', None))
+    usage = getattr(llm_response, 'usage_metadata', None)
+    if usage is not None:
+        span.attributes['gen_ai.usage.input_tokens'] = usage.prompt_token_count or 0
+        span.attributes['gen_ai.usage.output_tokens'] = usage.candidates_token_count or 0
+    if getattr(llm_response, 'error_code', None):
+        span.set_error(f"{llm_response.error_code}: {llm_response.error_message or ''}")
+    tracer.end_span(span)
+    return None
+
+
+def trace_model_error(callback_context, llm_request, error):
+    """on_model_error_callback: mark the model-call span as failed and close it (the error still propagates)"""
+    tracer = get_tracer()
+    if not tracer.enabled:
+        return None
+    span = tracer.close_span(('model', callback_context.invocation_id, callback_context.agent_name))
+    if span is not None:
+        span.set_error(f"{type(error).__name__}: {error}")
+        tracer.end_span(span)
+    return None
+
+
+def trace_tool_start(tool, args, tool_context):
+    """before_tool_callback: open a tool-call span that sub-agent spans nest under"""
+    tracer = get_tracer()
+    if not tracer.enabled:
+        return None
+    span = tracer.start_span(f"tool {tool.name}", 'tool', _parent_for(tracer, tool_context), {
+        'gen_ai.tool.name': tool.name,
+        'gen_ai.agent.name': tool_context.agent_name,
+        'tool.args_chars': len(json.dumps(args, default=str)),
+    })
+    # The tool runs in this task right after the callback, so it sees the span as current
+    parent = _current_span.get()
+    token = _current_span.set(span)
+    tracer.open_span(('tool', tool_context.function_call_id), (span, token, parent))
+    return None
+
+
+def _close_tool_span(tracer: Tracer, tool_context):
+    """Close the tool-call span of a call and make its parent current again"""
+    opened = tracer.close_span(('tool', tool_context.function_call_id))
+    if opened is None:
+        return None
+    span, token, parent = opened
+    try:
+        _current_span.reset(token)
+    except ValueError:
+        # Token from another context; restore the parent directly
+        _current_span.set(parent)
+    return span
+
+
+def trace_tool_end(tool, args, tool_context, tool_response):
+    """after_tool_callback: record the result size and status and close the tool-call span"""
+    tracer = get_tracer()
+    if not tracer.enabled:
+        return None
+    span = _close_tool_span(tracer, tool_context)
+    if span is None:
+        return None
+    if isinstance(tool_response, dict):
+        if tool_response.get('status') == 'error':
+            span.set_error(str(tool_response.get('error_message', "")))
+        if 'source' in tool_response:
+            span.attributes['tool.source'] = str(tool_response['source'])
+    span.attributes['response.chars'] = len(json.dumps(tool_response, default=str))
+    tracer.end_span(span)
+    return None
+
+
+def trace_tool_error(tool, args, tool_context, error):
+    """on_tool_error_callback: mark the tool-call span as failed and close it (the error still propagates)"""
+    tracer = get_tracer()
+    if not tracer.enabled:
+        return None
+    span = _close_tool_span(tracer, tool_context)
+    if span is not None:
+        span.set_error(f"{type(error).__name__}: {error}")
+        tracer.end_span(span)
+    return None
@@ -0,0 +1,365 @@
+"""
+Local vector-indexed memory service for PreloadMemoryTool.
+
+Every agent attaches PreloadMemoryTool, which searches memory on every turn.
+VectorMemoryService answers those searches from a local index: past session
+events and client facts are split into short chunks, embedded with a hashed
+bag-of-words (unigrams and bigrams, no model call), and stored as float32 rows
+in a memory-mapped file. A search scores the user's rows with one matrix-vector
+product, keeps the top-k by cosine similarity and stops adding memories once
+the token cap is reached, so preloading costs milliseconds and a bounded number
+of prompt tokens however long a client's history grows.
+
+On disk the index directory holds:
+    index.json     Embedding dimension
+    vectors.f32    Row-major float32 vectors (capacity grows by doubling)
+    entries.jsonl  One metadata line per vector row (user, app, author, text, ...)
+
+Inserts are incremental: events already indexed (by event id) and chunks whose
+text is already stored for the user are skipped. All five agents serve the same
+client, so memories are scoped per user_id and shared across apps. The entry
+points pass the stable client id as user_id (replanning.plan_client_id), so
+memories follow a client across runs and clients who share a name stay apart
+when they have distinct client ids. The index is meant for a single writer process.
+
+Configuration (environment variables):
+    FITTELLIGENCE_MEMORY_DIR         Index directory, or "off" to run without a memory service
+                                     (default: ~/.cache/fittelligence/memory)
+    FITTELLIGENCE_MEMORY_TOP_K       Memories considered per search (default: 5)
+    FITTELLIGENCE_MEMORY_MAX_TOKENS  Cap on memory tokens injected per turn (default: 600)
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from google.adk.memory import BaseMemoryService
+from google.adk.memory.base_memory_service import SearchMemoryResponse
+from google.adk.memory.memory_entry import MemoryEntry
+from google.genai import types
+
+# Add parent directory to path for shared modules
+_parent_dir = Path(__file__).parent.parent
+if str(_parent_dir) not in sys.path:
+    sys.path.insert(0, str(_parent_dir))
+
+from shared.tracing import current_span, trace_span
+
+
+DEFAULT_MEMORY_DIR = Path.home() / '.cache' / 'fittelligence' / 'memory'
+DEFAULT_DIM = 512
+DEFAULT_TOP_K = 5
+DEFAULT_MAX_TOKENS = 600
+DEFAULT_MIN_SCORE = 0.1
+
+# Rough characters-per-token ratio, as in shared/history_compaction.py
+CHARS_PER_TOKEN = 4
+
+# Longest chunk stored per memory row
+MAX_CHUNK_CHARS = 800
+
+MIN_CAPACITY = 1024
+
+_DISABLED_VALUES = {'off', '0', 'false', 'no', 'none', ''}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have i in is it its me my of on or so that the this "
+    "to was were will with you your".split()
+)
+
+
+def _features(text: str) -> list:
+    tokens = [token for token in _TOKEN_RE.findall(text.lower()) if token not in _STOPWORDS]
+    return tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+
+
+def embed_text(text: str, dim: int = DEFAULT_DIM) -> np.ndarray:
+    """
+    Embed text as a signed, hashed bag of unigrams and bigrams.
+
+    Hashing uses crc32, so vectors are stable across processes and runs.
+
+    Returns:
+        L2-normalized float32 vector (all zeros for text without words)
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    features = _features(text)
+    if not features:
+        return vector
+    hashes = np.fromiter((zlib.crc32(feature.encode('utf-8')) for feature in features), dtype=np.uint32, count=len(features))
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+    np.add.at(vector, hashes % dim, signs)
+    # Sublinear term frequency keeps repeated words from dominating
+    vector = np.sign(vector) * np.log1p(np.abs(vector))
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector /= norm
+    return vector.astype(np.float32, copy=False)
+
+
+def chunk_text(text: str, max_chars: int = MAX_CHUNK_CHARS) -> list:
+    """Split text into chunks of at most max_chars, preferring paragraph boundaries"""
+    chunks = []
+    current = ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = " ".join(paragraph.split())
+        while len(paragraph) > max_chars:
+            cut = paragraph.rfind(' ', 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(paragraph[:cut])
+            paragraph = paragraph[cut:].lstrip()
+        if not paragraph:
+            continue
+        if current and len(current) + len(paragraph) + 1 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _event_text(event) -> str:
+    content = getattr(event, 'content', None)
+    if not content or not content.parts:
+        return ""
+    return "\n".join(part.text for part in content.parts if getattr(part, 'text', None))
+
+
+def _text_digest(user_id: str, text: str) -> str:
+    return hashlib.sha1(f"{user_id}\x1f{' '.join(text.split())}".encode('utf-8')).hexdigest()
+
+
+class VectorMemoryService(BaseMemoryService):
+    """Memory service backed by a memory-mapped NumPy vector index"""
+
+    def __init__(self, directory, dim: int = DEFAULT_DIM, top_k: int = DEFAULT_TOP_K,
+                 max_tokens: int = DEFAULT_MAX_TOKENS, min_score: float = DEFAULT_MIN_SCORE):
+        self.directory = Path(directory)
+        self.top_k = top_k
+        self.max_tokens = max_tokens
+        self.min_score = min_score
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._vectors_path = self.directory / 'vectors.f32'
+        self._entries_path = self.directory / 'entries.jsonl'
+        self._lock = threading.Lock()
+        self.stats = {'rows': 0, 'inserts': 0, 'duplicates': 0, 'searches': 0, 'last_search_ms': 0.0}
+
+        meta_path = self.directory / 'index.json'
+        if meta_path.exists():
+            stored_dim = json.loads(meta_path.read_text())['dim']
+            if stored_dim != dim:
+                raise ValueError(f"Memory index at {self.directory} uses dim={stored_dim}, not {dim}")
+        else:
+            meta_path.write_text(json.dumps({'dim': dim}))
+        self.dim = dim
+
+        self._entries = []
+        self._rows_by_user = {}
+        self._digests = set()
+        self._indexed_events = set()
+        if self._entries_path.exists():
+            good_bytes = 0
+            with open(self._entries_path, 'rb') as f:
+                for line in f:
+                    try:
+                        self._track(json.loads(line))
+                    except ValueError:
+                        break
+                    good_bytes += len(line)
+            if good_bytes < self._entries_path.stat().st_size:
+                # Torn last line from an interrupted write; drop it so appends stay line-aligned
+                with open(self._entries_path, 'r+b') as f:
+                    f.truncate(good_bytes)
+
+        self._capacity = self._vectors_path.stat().st_size // (dim * 4) if self._vectors_path.exists() else 0
+        self._vectors = None
+        if self._capacity:
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode='r+', shape=(self._capacity, dim))
+        self.stats['rows'] = len(self._entries)
+
+    def _track(self, entry: dict):
+        row = len(self._entries)
+        self._entries.append(entry)
+        self._rows_by_user.setdefault(entry['user_id'], []).append(row)
+        self._digests.add(entry['digest'])
+        if entry.get('event_id'):
+            self._indexed_events.add(entry['event_id'])
+
+    def _ensure_capacity(self, rows: int):
+        if rows <= self._capacity:
+            return
+        new_capacity = max(rows, self._capacity * 2, MIN_CAPACITY)
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with open(self._vectors_path, 'ab') as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode='r+', shape=(new_capacity, self.dim))
+        self._capacity = new_capacity
+
+    def _insert(self, records: list) -> int:
+        """Embed and append (user_id, app_name, author, timestamp, text, event_id) records"""
+        with self._lock:
+            entries = []
+            batch_digests = set()
+            for user_id, app_name, author, timestamp, text, event_id in records:
+                digest = _text_digest(user_id, text)
+                if digest in self._digests or digest in batch_digests:
+                    self.stats['duplicates'] += 1
+                    continue
+                batch_digests.add(digest)
+                entries.append({
+                    'user_id': user_id,
+                    'app_name': app_name,
+                    'author': author,
+                    'timestamp': timestamp,
+                    'text': text,
+                    'event_id': event_id,
+                    'digest': digest,
+                })
+            if not entries:
+                return 0
+
+            start = len(self._entries)
+            self._ensure_capacity(start + len(entries))
+            self._vectors[start:start + len(entries)] = np.stack([embed_text(entry['text'], self.dim) for entry in entries])
+            self._vectors.flush()
+            # Metadata is written after the vectors, so a row is never visible without its vector
+            with open(self._entries_path, 'a', encoding='utf-8') as f:
+                f.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries))
+            for entry in entries:
+                self._track(entry)
+            self.stats['rows'] = len(self._entries)
+            self.stats['inserts'] += len(entries)
+            return len(entries)
+
+    def add_text(self, app_name: str, user_id: str, text: str, author: str = 'user') -> int:
+        """
+        Index a free-standing fact about a user, e.g. their client profile.
+
+        Returns:
+            Number of new memory rows
+        """
+        timestamp = datetime.now().isoformat(timespec='seconds')
+        return self._insert([(user_id, app_name, author, timestamp, chunk, None) for chunk in chunk_text(text)])
+
+    def add_session_sync(self, session) -> int:
+        """
+        Index the session events that are not in the index yet.
+
+        Returns:
+            Number of new memory rows
+        """
+        records = []
+        for event in session.events:
+            if getattr(event, 'partial', False) or event.id in self._indexed_events:
+                continue
+            text = _event_text(event)
+            if not text.strip():
+                continue
+            timestamp = datetime.fromtimestamp(event.timestamp).isoformat(timespec='seconds')
+            for index, chunk in enumerate(chunk_text(text)):
+                # Only the first chunk carries the event id; it marks the event as indexed
+                records.append((session.user_id, session.app_name, event.author, timestamp, chunk,
+                                event.id if index == 0 else None))
+        return self._insert(records) if records else 0
+
+    async def add_session_to_memory(self, session):
+        self.add_session_sync(session)
+
+    def search_sync(self, user_id: str, query: str) -> list:
+        """
+        Return the best-matching memories for a query within the token cap.
+
+        Returns:
+            List of entry dicts (with a 'score' key), best match first
+        """
+        start = time.perf_counter()
+        with self._lock:
+            rows = self._rows_by_user.get(user_id)
+            if not rows or not query.strip():
+                return []
+            query_vector = embed_text(query, self.dim)
+            rows = np.asarray(rows, dtype=np.int64)
+            scores = self._vectors[rows] @ query_vector
+            k = min(self.top_k, len(rows))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            candidates = [(float(scores[i]), self._entries[rows[i]]) for i in top if scores[i] >= self.min_score]
+
+        results = []
+        budget = self.max_tokens
+        for score, entry in candidates:
+            text = entry['text']
+            tokens = estimate_tokens(text)
+            if tokens > budget:
+                if results:
+                    break
+                # The best match alone exceeds the cap: keep its beginning
+                text = text[:budget * CHARS_PER_TOKEN].rstrip() + "…"
+                tokens = budget
+            results.append(dict(entry, text=text, score=score))
+            budget -= tokens
+        self.stats['searches'] += 1
+        self.stats['last_search_ms'] = (time.perf_counter() - start) * 1000
+        return results
+
+    async def search_memory(self, *, app_name: str, user_id: str, query: str) -> SearchMemoryResponse:
+        if current_span() is None:
+            entries = self.search_sync(user_id, query)
+        else:
+            with trace_span("memory search", 'tool', {'gen_ai.agent.name': app_name, 'prompt.chars': len(query)}) as span:
+                entries = self.search_sync(user_id, query)
+                span.attributes['memory.results'] = len(entries)
+        memories = [
+            MemoryEntry(
+                content=types.Content(
+                    role='user' if entry['author'] == 'user' else 'model',
+                    parts=[types.Part(text=entry['text'])]
+                ),
+                author=entry['author'],
+                timestamp=entry['timestamp'],
+            )
+            for entry in entries
+        ]
+        return SearchMemoryResponse(memories=memories)
+
+
+_memory_service = None
+_memory_configured = False
+_memory_lock = threading.Lock()
+
+
+def get_memory_service() -> Optional[VectorMemoryService]:
+    """Return the process-wide memory service, or None if memory is disabled"""
+    global _memory_service, _memory_configured
+    if _memory_configured:
+        return _memory_service
+    with _memory_lock:
+        if not _memory_configured:
+            setting = os.getenv('FITTELLIGENCE_MEMORY_DIR', str(DEFAULT_MEMORY_DIR))
+            if setting.strip().lower() not in _DISABLED_VALUES:
+                _memory_service = VectorMemoryService(
+                    setting,
+                    top_k=int(os.getenv('FITTELLIGENCE_MEMORY_TOP_K', DEFAULT_TOP_K)),
+                    max_tokens=int(os.getenv('FITTELLIGENCE_MEMORY_MAX_TOKENS', DEFAULT_MAX_TOKENS)),
+                )
+            _memory_configured = True
+    return _memory_service
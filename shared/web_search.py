@@ -0,0 +1,177 @@
+"""
+Cached, coalescing web search for the FitTelligence agents.
+
+Similar clients trigger the same searches over and over ("beginner full gym
+hypertrophy program", "gluten-free high protein foods"). web_search replaces
+the built-in google_search tool on every agent: queries are normalized (case,
+punctuation, filler words and word order are ignored), answered from a
+SQLite cache with a TTL when possible, and otherwise sent to the search agent
+(shared/search_agent.py) through the runner pool. Identical searches that are
+already in flight on the same event loop wait for that one upstream call
+instead of starting their own (single-flight), which matters when many
+pipelines run concurrently.
+
+Configuration (environment variables):
+    FITTELLIGENCE_SEARCH_CACHE   Path of the SQLite file, or "off" to disable caching
+                                 (default: ~/.cache/fittelligence/search.sqlite)
+    FITTELLIGENCE_SEARCH_TTL     Result lifetime in seconds (default: 1 day)
+"""
+import asyncio
+import os
+import re
+import sys
+import threading
+from pathlib import Path
+from typing import Optional
+
+# Add parent directory to path for cross-agent imports
+_parent_dir = Path(__file__).parent.parent
+if str(_parent_dir) not in sys.path:
+    sys.path.insert(0, str(_parent_dir))
+
+from shared.response_cache import ResponseCache
+
+
+DEFAULT_SEARCH_CACHE_PATH = Path.home() / '.cache' / 'fittelligence' / 'search.sqlite'
+DEFAULT_SEARCH_TTL_SECONDS = 24 * 3600
+DEFAULT_SEARCH_MAX_ENTRIES = 2000
+
+SEARCH_AGENT_NAME = 'search_agent'
+
+_DISABLED_VALUES = {'off', '0', 'false', 'no', 'none', ''}
+
+# Words that do not change what a search returns
+_FILLER_WORDS = frozenset({
+    'a', 'an', 'and', 'are', 'for', 'how', 'in', 'is', 'of', 'on', 'or', 'the', 'to', 'what', 'which', 'with',
+})
+
+
+def normalize_query(query: str) -> str:
+    """
+    Reduce a query to its cache key: lowercase words without punctuation,
+    filler words or duplicates, in sorted order.
+
+    Example: "Gluten-free, high-protein foods?" -> "foods free gluten high protein"
+    """
+    words = re.findall(r'[a-z0-9]+', str(query or '').lower())
+    return " ".join(sorted({word for word in words if word not in _FILLER_WORDS}))
+
+
+async def _search_upstream(query: str) -> str:
+    # Imported here: the pool pulls in google.adk, which the cache layer does not need
+    from shared.agent_pool import get_agent_pool
+    # The search cache applies its own TTL, so bypass the response cache
+    return await get_agent_pool().invoke_async(SEARCH_AGENT_NAME, f"Search query: {query}", use_cache=False)
+
+
+class SearchLayer:
+    """Normalizing TTL cache with single-flight coalescing in front of an upstream search"""
+
+    def __init__(self, cache: Optional[ResponseCache] = None, upstream=None):
+        self.cache = cache
+        self._upstream = upstream or _search_upstream
+        self._inflight = {}
+        self.stats = {'searches': 0, 'cache_hits': 0, 'coalesced': 0, 'upstream_calls': 0, 'errors': 0}
+
+    async def search(self, query: str) -> tuple:
+        """
+        Return the findings for a query.
+
+        Returns:
+            Tuple of (findings text, source), source being "cache", "coalesced" or "upstream"
+
+        Raises:
+            ValueError: If the query has no searchable words
+        """
+        key = normalize_query(query)
+        if not key:
+            raise ValueError("Search query is empty")
+        self.stats['searches'] += 1
+
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.stats['cache_hits'] += 1
+                return cached, 'cache'
+
+        loop = asyncio.get_running_loop()
+        pending = self._inflight.get(key)
+        if pending is not None and pending.get_loop() is loop:
+            self.stats['coalesced'] += 1
+            # shield: a cancelled waiter must not cancel the shared call
+            return await asyncio.shield(pending), 'coalesced'
+
+        # The upstream call runs in its own task, so cancelling the caller that
+        # started it leaves the call running for the coalesced waiters
+        task = loop.create_task(self._fetch(key, query))
+        # Mark a failure retrieved in case every waiter was cancelled
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._inflight[key] = task
+        self.stats['upstream_calls'] += 1
+        return await asyncio.shield(task), 'upstream'
+
+    async def _fetch(self, key: str, query: str) -> str:
+        """Run one upstream search and cache its findings"""
+        try:
+            findings = await self._upstream(query)
+        except Exception:
+            self.stats['errors'] += 1
+            raise
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+        if self.cache is not None and findings:
+            self.cache.put(key, SEARCH_AGENT_NAME, findings)
+        return findings
+
+    def summary(self) -> str:
+        """One-line counter summary for run reports"""
+        stats = self.stats
+        return (f"Search: {stats['searches']} searches, {stats['cache_hits']} from cache, "
+                f"{stats['coalesced']} coalesced, {stats['upstream_calls']} upstream")
+
+
+_layer = None
+_layer_lock = threading.Lock()
+
+
+def get_search_layer() -> SearchLayer:
+    """Return the process-wide search layer"""
+    global _layer
+    if _layer is None:
+        with _layer_lock:
+            if _layer is None:
+                cache = None
+                setting = os.getenv('FITTELLIGENCE_SEARCH_CACHE', str(DEFAULT_SEARCH_CACHE_PATH))
+                if setting.strip().lower() not in _DISABLED_VALUES:
+                    cache = ResponseCache(
+                        setting,
+                        max_entries=DEFAULT_SEARCH_MAX_ENTRIES,
+                        ttl_seconds=float(os.getenv('FITTELLIGENCE_SEARCH_TTL', DEFAULT_SEARCH_TTL_SECONDS)),
+                    )
+                _layer = SearchLayer(cache)
+    return _layer
+
+
+async def web_search(query: str) -> dict:
+    """
+    Search the web with Google Search. Repeated and concurrent identical searches share one result.
+
+    Args:
+        query: What to search for (e.g., "beginner full gym hypertrophy program", "gluten-free high protein foods")
+
+    Returns:
+        Dictionary with status "success", the findings (key points and sources) and where they came
+        from (cache, coalesced or upstream), or status "error" and an error_message
+    """
+    try:
+        findings, source = await get_search_layer().search(query)
+    except ValueError as e:
+        return {'status': 'error', 'error_message': str(e)}
+    except ImportError:
+        return {'status': 'error', 'error_message': "Search agent is not available"}
+    except Exception as e:
+        return {'status': 'error', 'error_message': f"Search failed: {str(e)}"}
+    if not findings:
+        return {'status': 'error', 'error_message': "Search returned no findings"}
+    return {'status': 'success', 'query': query, 'findings': findings, 'source': source}
@@ -0,0 +1,34 @@
+"""
+Shared fixtures for the unit tests.
+
+The tests cover the pure modules under shared/ and the batch runner; none of
+them calls a model. Process-wide stores that would default to files under
+~/.cache/fittelligence/ are pointed at a temporary directory instead.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the repository root to path for shared modules
+_root_dir = Path(__file__).parent.parent
+if str(_root_dir) not in sys.path:
+    sys.path.insert(0, str(_root_dir))
+
+from shared import food_database, mobility_scoring
+
+
+@pytest.fixture(scope='session')
+def food_db(tmp_path_factory):
+    """Food database whose memory-mapped column cache lives in a temporary directory"""
+    return food_database.FoodDatabase(cache_dir=tmp_path_factory.mktemp('food_cache'))
+
+
+@pytest.fixture(autouse=True)
+def isolated_stores(monkeypatch, food_db, tmp_path):
+    """Keep the process-wide food table and mobility history out of the home directory"""
+    monkeypatch.setattr(food_database, '_database', food_db)
+    monkeypatch.setattr(mobility_scoring, '_history', mobility_scoring.MobilityHistory(tmp_path / 'mobility.sqlite'))
+    monkeypatch.setattr(mobility_scoring, '_history_configured', True)
+    yield
+    mobility_scoring._history.close()
@@ -0,0 +1,95 @@
+import pytest
+
+from shared.artifact_store import ArtifactStore, request_key
+
+
+SESSION = ('jane_doe', 'session_1')
+
+
+@pytest.fixture
+def store():
+    return ArtifactStore(max_sessions=2)
+
+
+def test_put_and_get(store):
+    artifact = store.put(*SESSION, 'pt', "Training plan")
+    assert store.get(*SESSION, 'pt') is artifact
+    assert artifact.agent_name == 'pt_agent'
+    assert artifact.reference == f"pt@{artifact.sha256[:8]}"
+    assert store.get('someone_else', 'session_1', 'pt') is None
+
+
+def test_empty_outputs_are_not_stored(store):
+    assert store.put(*SESSION, 'pt', "  ") is None
+    assert store.get(*SESSION, 'pt') is None
+
+
+def test_checkout_returns_the_text_once_then_a_reference(store):
+    artifact = store.put(*SESSION, 'nutrition', "Meal plan")
+    first = store.checkout(SESSION, 'nutrition')
+    second = store.checkout(SESSION, 'nutrition')
+    assert first.endswith("Meal plan")
+    assert artifact.reference in second and "unchanged" in second
+    assert (store.stats['reused'], store.stats['referenced']) == (1, 1)
+    assert store.checkout(SESSION, 'body_scanner') is None
+
+
+def test_changed_artifact_is_delivered_again(store):
+    store.put(*SESSION, 'pt', "Plan v1")
+    store.checkout(SESSION, 'pt')
+    store.put(*SESSION, 'pt', "Plan v2")
+    assert store.checkout(SESSION, 'pt').endswith("Plan v2")
+
+
+def test_a2a_runs_do_not_replace_the_pipeline_artifact(store):
+    store.put(*SESSION, 'pt', "Pipeline plan")
+    request = request_key("run a marathon", "", "")
+    store.record_run(SESSION, 'pt', "Marathon plan", request=request)
+
+    assert store.get(*SESSION, 'pt').text == "Pipeline plan"
+    assert store.get(*SESSION, 'pt', request).text == "Marathon plan"
+    # Only pipeline artifacts reach the head coach digests
+    assert [artifact.text for artifact in store.artifacts(*SESSION)] == ["Pipeline plan"]
+    # The tool already returned the run's output, so a repeat gets a reference
+    assert "unchanged" in store.checkout(SESSION, 'pt', request)
+    assert store.stats['duplicate_runs'] == 0
+
+
+def test_repeated_a2a_run_counts_as_a_duplicate(store):
+    store.record_run(SESSION, 'pt', "Plan A", request='abc')
+    store.record_run(SESSION, 'pt', "Plan B", request='abc')
+    assert store.stats['duplicate_runs'] == 1
+    assert store.get(*SESSION, 'pt', 'abc').text == "Plan B"
+
+
+def test_request_key_normalizes_and_is_empty_for_plain_requests():
+    assert request_key("", None, "  ") == ""
+    assert request_key("Build  Muscle", "") == request_key("build muscle", "")
+    assert request_key("build muscle", "") != request_key("", "build muscle")
+
+
+def test_artifacts_are_in_pipeline_order_and_digested(store):
+    store.put(*SESSION, 'head_coach', "Program")
+    store.put(*SESSION, 'reception', "Intake")
+    store.put(*SESSION, 'nutrition', "Meals")
+    assert [artifact.stage for artifact in store.artifacts(*SESSION)] == ['reception', 'nutrition', 'head_coach']
+    section = store.digest_section(*SESSION, stages=('nutrition',))
+    assert section.startswith("- nutrition@") and "Meals" in section
+
+
+def test_profile_links_resolve_to_the_session(store):
+    store.put(*SESSION, 'pt', "Plan")
+    store.link_profile('profile-1', *SESSION)
+    assert store.resolve_session(None, 'profile-1') == SESSION
+    assert store.resolve_session(('other', 'session'), 'profile-1') == SESSION
+    assert store.resolve_session(None, 'unknown') is None
+
+
+def test_least_recently_used_sessions_are_dropped(store):
+    store.put('a', 's', 'pt', "A")
+    store.link_profile('profile-a', 'a', 's')
+    store.put('b', 's', 'pt', "B")
+    store.put('c', 's', 'pt', "C")
+    assert store.get('a', 's', 'pt') is None
+    assert store.resolve_session(None, 'profile-a') is None
+    assert store.get('c', 's', 'pt').text == "C"
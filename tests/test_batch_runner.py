@@ -0,0 +1,118 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import batch_runner
+from shared.pipeline import StageResult
+
+
+class FakeSessionService:
+    async def delete_session(self, app_name, user_id, session_id):
+        pass
+
+
+@pytest.fixture
+def pipeline_calls(monkeypatch):
+    """Replace the agent pipeline; clients named in fail_clients get a failed PT stage"""
+    calls = SimpleNamespace(clients=[], user_ids=[], fail_clients=set())
+
+    async def run_pipeline(client_info, session_id, user_id, session_service, variant='full', stage_timeout=None,
+                           verbose=True, timings_sink=None, on_stage_done=None, client_id=None):
+        calls.clients.append(client_info['name'])
+        calls.user_ids.append(user_id)
+        responses = {}
+        for stage in ('reception', 'pt', 'head_coach'):
+            failed = stage == 'pt' and client_info['name'] in calls.fail_clients
+            result = StageResult(stage, stage, f"{stage}_agent", status='error' if failed else 'ok',
+                                 text="" if failed else f"{stage} output")
+            responses[stage] = result.text
+            on_stage_done(result)
+        return responses
+
+    monkeypatch.setattr(batch_runner, 'run_pipeline', run_pipeline)
+    monkeypatch.setattr(batch_runner, 'create_session_service', FakeSessionService)
+    monkeypatch.setattr(batch_runner, 'get_session_manager', lambda service: SimpleNamespace(forget_session=lambda *key: None))
+    monkeypatch.setattr(batch_runner, 'release_session_manager', lambda service: None)
+    monkeypatch.setattr(batch_runner, 'get_agent_registry', lambda: SimpleNamespace(startup_report=lambda: ""))
+    return calls
+
+
+def _write_records(path, records):
+    path.write_text("".join(json.dumps(record) + "\n" for record in records), encoding='utf-8')
+
+
+def _read_jsonl(path):
+    return [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()] if path.exists() else []
+
+
+def _run_batch(input_path, output_path):
+    return asyncio.run(batch_runner.run_batch(input_path, output_path, concurrency=2))
+
+
+def test_completed_clients_are_checkpointed_and_skipped_on_resume(tmp_path, pipeline_calls):
+    input_path, output_path = tmp_path / 'clients.jsonl', tmp_path / 'results.jsonl'
+    _write_records(input_path, [{'client_id': 'c1', 'name': 'Ann'}, {'client_id': 'c2', 'name': 'Bob'}])
+
+    summary = _run_batch(input_path, output_path)
+    assert (summary['ok'], summary['error'], summary['skipped']) == (2, 0, 0)
+    assert batch_runner.load_checkpoint(batch_runner.checkpoint_path_for(output_path)) == {'c1', 'c2'}
+
+    _write_records(input_path, [{'client_id': 'c1', 'name': 'Ann'}, {'client_id': 'c2', 'name': 'Bob'},
+                                {'client_id': 'c3', 'name': 'Cat'}])
+    summary = _run_batch(input_path, output_path)
+    assert (summary['ok'], summary['skipped']) == (1, 2)
+    assert pipeline_calls.clients == ['Ann', 'Bob', 'Cat']
+    assert [result['client_id'] for result in _read_jsonl(output_path)] == ['c1', 'c2', 'c3']
+
+
+def test_failed_clients_are_retried_without_duplicating_the_output(tmp_path, pipeline_calls):
+    input_path, output_path = tmp_path / 'clients.jsonl', tmp_path / 'results.jsonl'
+    failures_path = batch_runner.failures_path_for(output_path)
+    _write_records(input_path, [{'client_id': 'c1', 'name': 'Ann'}, {'client_id': 'c2', 'name': 'Bob'}])
+    pipeline_calls.fail_clients = {'Bob'}
+
+    for _ in range(2):
+        summary = _run_batch(input_path, output_path)
+    assert (summary['ok'], summary['error'], summary['skipped']) == (0, 1, 1)
+    failures = _read_jsonl(failures_path)
+    assert [failure['client_id'] for failure in failures] == ['c2', 'c2']
+    assert all(failure['stage_status']['pt'] == 'error' and failure['failed_at'] for failure in failures)
+
+    pipeline_calls.fail_clients = set()
+    summary = _run_batch(input_path, output_path)
+    assert summary['ok'] == 1
+    results = _read_jsonl(output_path)
+    assert [(result['client_id'], result['status']) for result in results] == [('c1', 'ok'), ('c2', 'ok')]
+    assert batch_runner.load_checkpoint(batch_runner.checkpoint_path_for(output_path)) == {'c1', 'c2'}
+
+
+def test_duplicate_records_run_once(tmp_path, pipeline_calls):
+    input_path, output_path = tmp_path / 'clients.jsonl', tmp_path / 'results.jsonl'
+    _write_records(input_path, [{'name': 'Ann', 'age': 30}, {'name': 'Ann', 'age': '30'}])
+    summary = _run_batch(input_path, output_path)
+    assert summary['ok'] == 1
+    assert pipeline_calls.clients == ['Ann']
+
+
+def test_memory_is_scoped_by_the_stable_client_id(tmp_path, pipeline_calls):
+    input_path, output_path = tmp_path / 'clients.jsonl', tmp_path / 'results.jsonl'
+    _write_records(input_path, [{'client_id': 'C-1', 'name': 'Jane Doe'}, {'client_id': 'C-2', 'name': 'Jane Doe'}])
+    _run_batch(input_path, output_path)
+    assert sorted(pipeline_calls.user_ids) == ['c_1', 'c_2']
+
+
+def test_csv_records_get_intake_defaults(tmp_path):
+    path = tmp_path / 'clients.csv'
+    path.write_text("client_id,name,weight\nc1,Ann,61\n", encoding='utf-8')
+    [(client_id, client_info, plan_id)] = batch_runner.load_client_records(path)
+    assert (client_id, plan_id) == ('c1', 'c1')
+    assert client_info['weight'] == '61'
+    assert client_info['equipment'] == batch_runner.CLIENT_INFO_DEFAULTS['equipment']
+
+
+def test_records_without_client_id_get_a_content_hash():
+    info = batch_runner.normalize_client_info({'name': 'Ann'})
+    assert batch_runner.client_record_id({}, info) == batch_runner.client_record_id({}, dict(info))
+    assert batch_runner.client_record_id({}, info) != batch_runner.client_record_id({}, dict(info, weight='90'))
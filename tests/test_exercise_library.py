@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+from shared.exercise_library import EXERCISES_PATH, ExerciseLibrary, equipment_tier_key, find_exercises
+
+
+EXERCISES = [
+    {'name': 'Back Squat', 'equipment': ['barbell', 'rack'], 'muscles': ['quads', 'glutes'], 'pattern': 'squat',
+     'difficulty': 'intermediate', 'contraindications': ['knee', 'lower back']},
+    {'name': 'Goblet Squat', 'equipment': ['dumbbell'], 'muscles': ['quads', 'glutes'], 'pattern': 'squat',
+     'difficulty': 'beginner', 'contraindications': ['knee']},
+    {'name': 'Glute Bridge', 'equipment': [], 'muscles': ['glutes', 'hamstrings'], 'pattern': 'hinge',
+     'difficulty': 'beginner', 'contraindications': []},
+    {'name': 'Pull-up', 'equipment': ['pullup bar'], 'muscles': ['lats', 'biceps'], 'pattern': 'vertical pull',
+     'difficulty': 'advanced', 'contraindications': ['shoulder']},
+]
+
+TIERS = {
+    'bodyweight': [],
+    'limited': ['dumbbell'],
+    'home': ['dumbbell', 'barbell', 'rack', 'pullup bar'],
+    'full': ['dumbbell', 'barbell', 'rack', 'pullup bar'],
+}
+
+
+@pytest.fixture
+def library():
+    return ExerciseLibrary(EXERCISES, TIERS)
+
+
+def _names(result):
+    return [exercise['name'] for exercise in result[1]]
+
+
+def test_empty_filters_match_everything(library):
+    assert library.search() == (4, EXERCISES)
+
+
+def test_equipment_tier_limits_to_available_equipment(library):
+    assert _names(library.search(equipment="Limited equipment (dumbbells, bands)")) == ['Goblet Squat', 'Glute Bridge']
+    assert _names(library.search(equipment="Bodyweight only")) == ['Glute Bridge']
+
+
+def test_filters_intersect(library):
+    assert _names(library.search(muscle_group="glutes", movement_pattern="squat", difficulty="beginner")) == ['Goblet Squat']
+
+
+def test_muscle_group_aliases_expand(library):
+    assert _names(library.search(muscle_group="hamstring")) == ['Glute Bridge']
+    assert _names(library.search(muscle_group="lat, quadriceps")) == ['Back Squat', 'Goblet Squat', 'Pull-up']
+
+
+def test_difficulty_includes_easier_levels(library):
+    assert library.search(difficulty="intermediate")[0] == 3
+    assert library.search(difficulty="advanced")[0] == 4
+
+
+def test_injuries_exclude_contraindicated_exercises(library):
+    assert library.contraindication_areas("lower back pain and bad knees") == ['knee', 'lower back']
+    assert _names(library.search(avoid="bad knees, sore shoulders")) == ['Glute Bridge']
+
+
+def test_limit_caps_returned_exercises_but_not_the_total(library):
+    total, exercises = library.search(limit=1)
+    assert total == 4
+    assert len(exercises) == 1
+
+
+@pytest.mark.parametrize('filters', [
+    {'equipment': "spaceship"},
+    {'muscle_group': "wings"},
+    {'movement_pattern': "teleport"},
+    {'difficulty': "legendary"},
+])
+def test_unknown_filter_values_raise(library, filters):
+    with pytest.raises(ValueError):
+        library.search(**filters)
+
+
+def test_equipment_tier_keys():
+    assert equipment_tier_key("Full gym access") == 'full'
+    assert equipment_tier_key("Home gym (weights, bench, etc.)") == 'home'
+    assert equipment_tier_key("Bodyweight only") == 'bodyweight'
+    assert equipment_tier_key("None") is None
+
+
+def test_bundled_library_respects_every_filter():
+    result = find_exercises(equipment="home gym", muscle_group="glutes", difficulty="beginner", avoid="knee", limit=50)
+    assert result['status'] == 'success'
+    assert result['total_matches'] == len(result['exercises']) > 0
+    with open(EXERCISES_PATH, encoding='utf-8') as f:
+        home = set(json.load(f)['equipment_tiers']['home'])
+    for exercise in result['exercises']:
+        assert 'glutes' in exercise['muscles']
+        assert exercise['difficulty'] == 'beginner'
+        assert 'knee' not in exercise['contraindications']
+        assert set(exercise['equipment']) <= home
+
+
+def test_find_exercises_reports_errors():
+    result = find_exercises(muscle_group="wings")
+    assert result['status'] == 'error'
+    assert 'wings' in result['error_message']
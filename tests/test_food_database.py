@@ -0,0 +1,73 @@
+import pytest
+
+from shared.food_database import calculate_meal_macros, find_foods
+
+
+def _food(db, item):
+    label, row, grams = db.parse_item(item)
+    return label, (db.names[row] if row is not None else None), grams
+
+
+@pytest.mark.parametrize('item, expected', [
+    ("150 g chicken breast", ('', 'chicken breast cooked', 150.0)),
+    ("lunch: 150g chicken breast", ('lunch', 'chicken breast cooked', 150.0)),
+    ("2 eggs", ('', 'egg', 100.0)),
+    ("an egg", ('', 'egg', 50.0)),
+    ("1 banana", ('', 'banana', 118.0)),
+    ("1 cup milk", ('', 'milk whole', 244.0)),
+    ("1 cup brown rice", ('', 'brown rice cooked', 195.0)),
+    ("2 tbsp peanut butter", ('', 'peanut butter', 32.0)),
+    ("1 tbsp olive oil", ('', 'olive oil', 14.0)),
+    ("4 oz chicken", ('', 'chicken breast cooked', pytest.approx(113.4))),
+    ("grilled chicken breast with herbs", ('', 'chicken breast cooked', 120.0)),
+])
+def test_parse_item(food_db, item, expected):
+    assert _food(food_db, item) == expected
+
+
+@pytest.mark.parametrize('fraction, whole, factor', [
+    ("1/2 cup milk", "1 cup milk", 0.5),
+    ("½ cup milk", "1 cup milk", 0.5),
+    ("1 1/2 cups oats", "1 cup oats", 1.5),
+    ("1½ cups oats", "1 cup oats", 1.5),
+    ("half banana", "1 banana", 0.5),
+])
+def test_parse_item_fractions(food_db, fraction, whole, factor):
+    assert food_db.parse_item(fraction)[2] == pytest.approx(factor * food_db.parse_item(whole)[2])
+
+
+def test_parse_item_plurals(food_db):
+    assert _food(food_db, "3 bananas")[1] == 'banana'
+
+
+def test_unknown_food_has_no_row(food_db):
+    assert food_db.parse_item("200 g unobtainium") == ('', None, None)
+
+
+def test_meal_macros_total_per_meal_and_overall():
+    result = calculate_meal_macros([
+        "breakfast: 2 eggs", "breakfast: 1 banana", "lunch: 100 g chicken breast", "200 g unobtainium",
+    ])
+    assert result['status'] == 'success'
+    assert [meal['meal'] for meal in result['meals']] == ['breakfast', 'lunch']
+    assert result['meals'][1]['kcal'] == 165.0
+    assert result['total']['kcal'] == pytest.approx(143.0 + 0.89 * 118 + 165.0, abs=0.2)
+    assert result['unmatched'] == ["200 g unobtainium"]
+
+
+def test_meal_macros_without_items_is_an_error():
+    assert calculate_meal_macros([])['status'] == 'error'
+
+
+def test_find_foods_filters_by_every_tag_and_sorts():
+    result = find_foods("vegan, high-protein", sort_by="protein", limit=5)
+    assert result['status'] == 'success'
+    proteins = [food['per_100g']['protein_g'] for food in result['foods']]
+    assert proteins == sorted(proteins, reverse=True)
+    assert 0 < len(result['foods']) <= 5
+
+
+def test_find_foods_unknown_tag_is_an_error():
+    result = find_foods("carnivore")
+    assert result['status'] == 'error'
+    assert 'carnivore' in result['error_message']
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from shared.food_database import get_food_database
+from shared.meal_optimizer import allowed_food_mask, complete_targets, optimize_meal_plan
+
+
+def _plan_foods(plan):
+    return [item.rsplit(' ', 2)[0] for day in plan['days'] for foods in day['meals'].values() for item in foods]
+
+
+def test_missing_macros_take_their_share_of_the_remaining_calories():
+    targets = complete_targets([2000], [150], [0], [0])
+    # 2000 - 150 * 4 = 1400 kcal left, split 40:30 between carbs and fat
+    assert targets[0].tolist() == pytest.approx([2000, 150, 800 / 4, 600 / 9])
+
+
+def test_all_macros_derived_from_calories():
+    assert complete_targets([2000], [0], [0], [0])[0].tolist() == pytest.approx([2000, 150, 200, 600 / 9])
+
+
+def test_plan_hits_its_targets():
+    result = optimize_meal_plan([2400], [160], [250], [80], [""])
+    assert result['status'] == 'success'
+    plan = result['plans'][0]
+    # Portions are rounded to 5 g and capped at a few servings, so targets are met within a few percent
+    assert all(abs(error) < 10 for error in plan['mean_error_pct'].values())
+    assert plan['days'][0]['totals']['kcal'] == pytest.approx(2400, rel=0.1)
+
+
+def test_restrictions_exclude_foods():
+    database = get_food_database()
+    mask = allowed_food_mask(database, "vegan, peanut allergy")
+    allowed = {name for name, ok in zip(database.names, mask) if ok}
+    assert allowed
+    assert allowed <= {name for name, vegan in zip(database.names, database.tags['vegan']) if vegan}
+    assert not any('peanut' in name for name in allowed)
+
+    plan = optimize_meal_plan([2000], [0], [0], [0], ["vegan, peanut allergy"])['plans'][0]
+    assert set(_plan_foods(plan)) <= allowed
+
+
+def test_days_rotate_foods():
+    plan = optimize_meal_plan([2200], [0], [0], [0], [""], days=3)['plans'][0]
+    assert [day['day'] for day in plan['days']] == [1, 2, 3]
+    assert plan['days'][0]['meals'] != plan['days'][1]['meals']
+
+
+def test_batch_plans_match_single_plans():
+    batch = optimize_meal_plan([1800, 2600], [120, 180], [0, 0], [0, 0], ["", "gluten-free"])
+    single = optimize_meal_plan([2600], [180], [0], [0], ["gluten-free"])
+    assert batch['plans'][1] == single['plans'][0]
+
+
+def test_portions_are_rounded_to_five_grams():
+    plan = optimize_meal_plan([2000], [0], [0], [0], [""])['plans'][0]
+    grams = [float(item.rsplit(' ', 2)[1]) for foods in plan['days'][0]['meals'].values() for item in foods]
+    assert grams and np.all(np.mod(grams, 5) == 0)
+
+
+@pytest.mark.parametrize('arguments', [
+    ([2000, 1800], [0], [0], [0], [""]),
+    ([0], [0], [0], [0], [""]),
+    ([], [], [], [], []),
+])
+def test_invalid_targets_return_an_error(arguments):
+    assert optimize_meal_plan(*arguments)['status'] == 'error'
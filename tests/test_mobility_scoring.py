@@ -0,0 +1,109 @@
+import pytest
+
+from shared.mobility_scoring import (
+    MobilityHistory,
+    client_key,
+    get_mobility_norms,
+    mobility_history_line,
+    score_measurements,
+    score_mobility_tests,
+)
+
+
+@pytest.fixture
+def norms():
+    return get_mobility_norms()
+
+
+def _parsed(norms, measurement):
+    return [(norms.tests[test]['key'], side, value) for test, side, value in norms.parse(measurement)]
+
+
+@pytest.mark.parametrize('measurement, expected', [
+    ("left hip flexion 110°", [('hip_flexion', 'left', 110.0)]),
+    ("knee to wall R 8 cm", [('knee_to_wall', 'right', 8.0)]),
+    ("hip IR 30/25", [('hip_internal_rotation', 'left', 30.0), ('hip_internal_rotation', 'right', 25.0)]),
+    ("deep squat 2/3", [('deep_squat', '', 2.0)]),
+    ("sit and reach -4 cm", [('sit_and_reach', '', -4.0)]),
+    ("active straight leg raise left 2", [('active_straight_leg_raise', 'left', 2.0)]),
+])
+def test_parse(norms, measurement, expected):
+    assert _parsed(norms, measurement) == expected
+
+
+@pytest.mark.parametrize('measurement', ["wing flap 20", "hip flexion", "deep squat 5", "hip flexion 90 100 110"])
+def test_parse_rejects_unknown_or_invalid_measurements(norms, measurement):
+    with pytest.raises(ValueError):
+        norms.parse(measurement)
+
+
+def test_scores_are_linear_between_poor_and_good(norms):
+    hip = norms.index['hip_flexion']  # poor 85, good 115
+    gap = norms.index['back_scratch_gap']  # lower is better: poor 15, good 0
+    scores, _ = norms.scores([hip, hip, hip, gap], [85.0, 100.0, 130.0, 3.0])
+    assert scores.tolist() == pytest.approx([0.0, 50.0, 100.0, 80.0])
+
+
+def test_score_mobility_tests_rates_flags_asymmetry_and_totals_the_screen():
+    result = score_mobility_tests([
+        "left hip flexion 115", "right hip flexion 95",
+        "deep squat 2", "hurdle step 2/1",
+    ], client_id="Jane Doe", record_history=False)
+
+    assert result['status'] == 'success'
+    client = result['clients'][0]
+    assert client['client'] == 'jane_doe'
+    ratings = {(item['test'], item['side']): item['rating'] for item in client['items']}
+    assert ratings[('Hip flexion', 'left')] == 'within normal limits'
+    assert ratings[('Hip flexion', 'right')] != 'within normal limits'
+    summary = client['summary']
+    assert summary['asymmetries'] == ["Hip flexion: left 115°, right 95°", "FMS hurdle step: left 2/3, right 1/3"]
+    # Each screening test counts with its lower side
+    assert summary['Functional Movement Screen']['total'] == 3
+    assert 'elevated_injury_risk' not in summary['Functional Movement Screen']
+
+
+def test_follow_up_reports_change_since_the_previous_assessment(tmp_path):
+    history = MobilityHistory(tmp_path / 'history.sqlite')
+    norms = get_mobility_norms()
+    hip = norms.index['hip_flexion']
+    history.record([('jane', 'hip_flexion', 'left', 100.0)], recorded_at=1.0)
+
+    item = score_measurements([('jane', hip, 'left', 110.0)], history, record=False)['jane']['items'][0]
+    history.close()
+    assert item['previous'] == "100°"
+    assert item['change'] == "+10"
+    assert item['trend'] == 'improved'
+    assert item['score_change'] == 33
+
+
+def test_history_keeps_the_latest_values_per_test(tmp_path):
+    history = MobilityHistory(tmp_path / 'history.sqlite', max_per_test=2)
+    for day, value in enumerate([90.0, 95.0, 100.0], start=1):
+        history.record([('jane', 'hip_flexion', 'left', value)], recorded_at=float(day))
+    assert history.latest(['jane']) == {('jane', 'hip_flexion', 'left'): (100.0, 3.0)}
+    (count,) = history._conn.execute("SELECT COUNT(*) FROM mobility_history").fetchone()
+    history.close()
+    assert count == 2
+
+
+def test_recorded_results_feed_the_prompt_line():
+    assert mobility_history_line("Jane Doe") == ""
+    score_mobility_tests(["left hip flexion 90", "deep squat 3"], client_id="Jane Doe")
+    line = mobility_history_line("Jane Doe")
+    assert line.startswith("Mobility on record")
+    assert "client_id=jane_doe" in line
+    # Restrictions are listed first
+    assert line.index("Hip flexion left 90°") < line.index("FMS deep squat 3/3")
+
+
+def test_several_clients_in_one_call():
+    result = score_mobility_tests(["Ann | deep squat 3", "Bob | deep squat 1", "flying 10"], record_history=False)
+    assert [client['client'] for client in result['clients']] == ['ann', 'bob']
+    assert len(result['unmatched']) == 1
+
+
+def test_client_key():
+    assert client_key("Jane  Doe") == 'jane_doe'
+    assert client_key("C-17") == 'c_17'
+    assert client_key(None) == ''
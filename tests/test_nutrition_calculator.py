@@ -0,0 +1,93 @@
+import pytest
+
+from shared.nutrition_calculator import (
+    MIN_TARGET_CALORIES,
+    activity_level_key,
+    calculate_energy_targets,
+    goal_parameters,
+    sex_offset,
+)
+
+
+def _single(weight=80, height=180, age=30, gender='Male', activity='Sedentary', goals='General fitness'):
+    result = calculate_energy_targets([weight], [height], [age], [gender], [activity], [goals])
+    assert result['status'] == 'success', result
+    return result['results'][0]
+
+
+def test_mifflin_st_jeor_for_a_maintenance_client():
+    targets = _single()
+    # 10 * 80 + 6.25 * 180 - 5 * 30 + 5 = 1780 kcal; sedentary x1.2
+    assert targets['bmr'] == 1780
+    assert targets['tdee'] == 2136
+    assert targets['target_calories'] == 2136
+    assert targets['protein_g'] == 128  # 1.6 g/kg
+    assert targets['fat_g'] == 59  # 25% of calories
+    assert targets['goal'] == 'maintenance'
+    assert targets['activity_level'] == 'sedentary'
+
+
+def test_macros_add_up_to_the_calorie_target():
+    targets = _single(goals='Build muscle')
+    kcal = targets['protein_g'] * 4 + targets['carbs_g'] * 4 + targets['fat_g'] * 9
+    assert kcal == pytest.approx(targets['target_calories'], abs=10)
+
+
+@pytest.mark.parametrize('goals, adjustment, label', [
+    ('Lose weight/fat', -0.20, 'fat loss'),
+    ('Build muscle', 0.10, 'muscle gain'),
+    ('Build muscle, Lose weight/fat', -0.10, 'recomposition'),
+    ('Improve flexibility', 0.0, 'maintenance'),
+])
+def test_goal_parameters(goals, adjustment, label):
+    assert goal_parameters(goals)[0] == adjustment
+    assert goal_parameters(goals)[2] == label
+
+
+@pytest.mark.parametrize('value, level', [
+    ('Moderately Active', 'moderately active'),
+    ('3', 'moderately active'),
+    ('very_active', 'very active'),
+    ('light', 'lightly active'),
+])
+def test_activity_levels_accept_menu_numbers_and_free_text(value, level):
+    assert activity_level_key(value) == level
+
+
+def test_unknown_activity_level_is_an_error():
+    with pytest.raises(ValueError):
+        activity_level_key('couch')
+    result = calculate_energy_targets([80], [180], [30], ['Male'], ['couch'], [''])
+    assert result['status'] == 'error'
+    assert 'couch' in result['error_message']
+
+
+def test_sex_offsets():
+    assert sex_offset('M') == 5.0
+    assert sex_offset('female') == -161.0
+    assert sex_offset('Other') == -78.0
+
+
+def test_deficit_never_goes_below_the_minimum():
+    targets = _single(weight=40, height=150, age=80, gender='Female', goals='Lose weight')
+    assert targets['target_calories'] == MIN_TARGET_CALORIES
+
+
+def test_batch_matches_single_client_results():
+    batch = calculate_energy_targets(
+        [80, 62], [180, 168], [30, 45], ['Male', 'Female'], ['Sedentary', 'Very Active'], ['', 'Lose fat'],
+    )
+    assert batch['results'] == [
+        _single(),
+        _single(weight=62, height=168, age=45, gender='Female', activity='Very Active', goals='Lose fat'),
+    ]
+
+
+@pytest.mark.parametrize('arguments', [
+    ([80, 70], [180], [30], ['Male'], ['Sedentary'], ['']),
+    ([], [], [], [], [], []),
+    ([-80], [180], [30], ['Male'], ['Sedentary'], ['']),
+    (['heavy'], [180], [30], ['Male'], ['Sedentary'], ['']),
+])
+def test_invalid_input_returns_an_error(arguments):
+    assert calculate_energy_targets(*arguments)['status'] == 'error'
@@ -0,0 +1,172 @@
+import asyncio
+
+import pytest
+
+from shared.pipeline import Pipeline, PipelineContext, Stage
+
+
+def _prompt(context):
+    return "prompt"
+
+
+def _context():
+    return PipelineContext(client_info={}, user_id='user', session_id='session')
+
+
+def _run(pipeline, execute, **kwargs):
+    kwargs.setdefault('retries', 0)
+    kwargs.setdefault('retry_backoff', 0.0)
+    return asyncio.run(pipeline.run(_context(), execute, verbose=False, **kwargs))
+
+
+def test_levels_follow_dependencies():
+    pipeline = Pipeline('test', [
+        Stage('c', 'C', 'agent_c', _prompt, depends_on=('a', 'b')),
+        Stage('a', 'A', 'agent_a', _prompt),
+        Stage('b', 'B', 'agent_b', _prompt, depends_on=('a',)),
+    ])
+    assert pipeline.levels == [['a'], ['b'], ['c']]
+    assert pipeline.describe() == "A → B → C"
+
+
+@pytest.mark.parametrize('stages, message', [
+    ([Stage('a', 'A', 'agent', _prompt), Stage('a', 'A2', 'agent', _prompt)], "Duplicate stage"),
+    ([Stage('a', 'A', 'agent', _prompt, depends_on=('missing',))], "unknown stage"),
+    ([Stage('a', 'A', 'agent', _prompt, depends_on=('b',)),
+      Stage('b', 'B', 'agent', _prompt, depends_on=('a',))], "cycle"),
+    ([Stage('a', 'A')], "neither an agent nor a fast path"),
+    ([Stage('a', 'A', 'agent')], "no prompt builder"),
+])
+def test_invalid_pipelines_are_rejected(stages, message):
+    with pytest.raises(ValueError, match=message):
+        Pipeline('test', stages)
+
+
+def test_independent_stages_run_concurrently_after_their_dependency():
+    events = []
+
+    async def execute(stage, prompt, context):
+        events.append(('start', stage.key))
+        await asyncio.sleep(0.05)
+        events.append(('end', stage.key))
+        return f"{stage.key} done"
+
+    pipeline = Pipeline('test', [
+        Stage('root', 'Root', 'agent', _prompt),
+        Stage('left', 'Left', 'agent', _prompt, depends_on=('root',)),
+        Stage('right', 'Right', 'agent', _prompt, depends_on=('root',)),
+    ])
+    run = _run(pipeline, execute)
+
+    assert events[:2] == [('start', 'root'), ('end', 'root')]
+    # Both branches start before either finishes
+    assert {events[2], events[3]} == {('start', 'left'), ('start', 'right')}
+    assert run.responses == {'root': "root done", 'left': "left done", 'right': "right done"}
+    assert all(result.status == 'ok' for result in run.results.values())
+
+
+def test_timeout_is_retried_and_reported():
+    attempts = []
+
+    async def execute(stage, prompt, context):
+        attempts.append(stage.key)
+        await asyncio.sleep(1.0)
+        return "too late"
+
+    pipeline = Pipeline('test', [Stage('slow', 'Slow', 'agent', _prompt)])
+    run = _run(pipeline, execute, timeout=0.01, retries=2)
+
+    result = run.results['slow']
+    assert result.status == 'timeout'
+    assert result.attempts == 3
+    assert attempts == ['slow'] * 3
+    assert result.text == ""
+
+
+def test_failed_attempt_is_retried_until_it_succeeds():
+    calls = []
+
+    async def execute(stage, prompt, context):
+        calls.append(stage.key)
+        if len(calls) == 1:
+            raise RuntimeError("transient")
+        return "recovered"
+
+    pipeline = Pipeline('test', [Stage('flaky', 'Flaky', 'agent', _prompt)])
+    run = _run(pipeline, execute, retries=1)
+
+    result = run.results['flaky']
+    assert (result.status, result.attempts, result.text, result.error) == ('ok', 2, "recovered", "")
+
+
+def test_stage_retries_override_the_run_default():
+    calls = []
+
+    async def execute(stage, prompt, context):
+        calls.append(stage.key)
+        raise RuntimeError("down")
+
+    pipeline = Pipeline('test', [Stage('once', 'Once', 'agent', _prompt, retries=0)])
+    run = _run(pipeline, execute, retries=3)
+
+    assert run.results['once'].status == 'error'
+    assert calls == ['once']
+
+
+def test_dependents_run_with_empty_output_after_a_failure():
+    seen = {}
+
+    async def execute(stage, prompt, context):
+        if stage.key == 'broken':
+            raise RuntimeError("boom")
+        seen[stage.key] = dict(context.responses)
+        return "summary"
+
+    pipeline = Pipeline('test', [
+        Stage('broken', 'Broken', 'agent', _prompt),
+        Stage('summary', 'Summary', 'agent', _prompt, depends_on=('broken',)),
+    ])
+    run = _run(pipeline, execute)
+
+    assert run.results['broken'].status == 'error'
+    assert run.results['broken'].error == "boom"
+    assert run.results['summary'].status == 'ok'
+    assert seen['summary'] == {'broken': ""}
+
+
+def test_fast_path_skips_the_agent():
+    executed = []
+
+    async def execute(stage, prompt, context):
+        executed.append(stage.key)
+        return "from the model"
+
+    pipeline = Pipeline('test', [
+        Stage('profile', 'Profile', fast_path=lambda context: "profile text"),
+        Stage('stored', 'Stored', 'agent', _prompt, depends_on=('profile',),
+              fast_path=lambda context: "stored output"),
+        Stage('fresh', 'Fresh', 'agent', _prompt, depends_on=('profile',), fast_path=lambda context: None),
+    ])
+    run = _run(pipeline, execute)
+
+    assert executed == ['fresh']
+    assert run.results['profile'].status == 'fast_path'
+    assert run.results['stored'].status == 'fast_path'
+    assert run.responses == {'stored': "stored output", 'fresh': "from the model"}
+
+
+def test_max_concurrency_one_runs_stages_one_at_a_time():
+    running = []
+    peak = []
+
+    async def execute(stage, prompt, context):
+        running.append(stage.key)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(stage.key)
+        return stage.key
+
+    pipeline = Pipeline('test', [Stage(key, key.upper(), 'agent', _prompt) for key in 'abc'])
+    _run(pipeline, execute, max_concurrency=1)
+
+    assert max(peak) == 1
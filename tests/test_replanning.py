@@ -0,0 +1,117 @@
+import pytest
+
+from shared.pipeline import Pipeline, Stage
+from shared.replanning import FIELD_STAGES, PlanHistory, changed_fields, plan_client_id, plan_replan
+
+
+INTAKE = {
+    'name': 'Jane Doe',
+    'age': '32',
+    'weight': '62',
+    'height': '168',
+    'gender': 'Female',
+    'activity_level': 'Moderately Active',
+    'fitness_goals': 'Build muscle',
+    'experience': 'Beginner (0-6 months)',
+    'equipment': 'Full gym access',
+    'medical_conditions': 'None',
+    'additional_notes': 'None',
+}
+
+AGENT_STAGES = ('reception', 'body_scanner', 'pt', 'nutrition', 'head_coach')
+
+
+def _prompt(context):
+    return ""
+
+
+def full_pipeline():
+    """Same shape as demo.build_pipeline('full'): reception, the profile, three specialists, the head coach"""
+    return Pipeline('full', [
+        Stage('reception', 'Reception Agent', 'reception_agent', _prompt),
+        Stage('profile', 'Client Profile', depends_on=('reception',), fast_path=lambda context: ""),
+        Stage('body_scanner', 'Body Scanner Agent', 'body_scanner_agent', _prompt, depends_on=('profile',)),
+        Stage('pt', 'PT Agent', 'pt_agent', _prompt, depends_on=('profile',)),
+        Stage('nutrition', 'Nutrition Agent', 'nutrition_agent', _prompt, depends_on=('profile',)),
+        Stage('head_coach', 'Head Coach Agent', 'head_coach_agent', _prompt,
+              depends_on=('body_scanner', 'pt', 'nutrition')),
+    ])
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = PlanHistory(tmp_path / 'plans.sqlite')
+    history.save('jane_doe', INTAKE, {stage: f"{stage} output" for stage in AGENT_STAGES})
+    yield history
+    history.close()
+
+
+def test_changed_fields_compare_normalized_values():
+    assert changed_fields(INTAKE, dict(INTAKE, weight='62 kg')) == ()
+    assert changed_fields(INTAKE, dict(INTAKE, weight='60', equipment='Bodyweight only')) == ('weight', 'equipment')
+
+
+def test_field_stages_only_name_pipeline_agent_stages():
+    assert set(FIELD_STAGES) == set(INTAKE)
+    assert {stage for stages in FIELD_STAGES.values() for stage in stages} <= set(AGENT_STAGES)
+
+
+def test_unchanged_intake_reuses_every_stage(history):
+    decision = plan_replan('Jane Doe', INTAKE, full_pipeline(), history)
+    assert decision.rerun == ()
+    assert decision.reused == {stage: f"{stage} output" for stage in AGENT_STAGES}
+
+
+@pytest.mark.parametrize('field, value', [
+    ('weight', '58'),
+    ('equipment', 'Bodyweight only'),
+    ('medical_conditions', 'Knee pain'),
+    ('name', 'Jane Smith'),
+])
+def test_changed_field_reruns_its_stages_and_everything_downstream(history, field, value):
+    pipeline = full_pipeline()
+    decision = plan_replan('jane_doe', dict(INTAKE, **{field: value}), pipeline, history)
+
+    expected = set(FIELD_STAGES[field])
+    for key in [key for level in pipeline.levels for key in level]:
+        if any(dep in expected for dep in pipeline.stages[key].depends_on):
+            expected.add(key)
+    assert decision.changed_fields == (field,)
+    assert set(decision.rerun) == expected & set(AGENT_STAGES)
+    assert set(decision.reused) == set(AGENT_STAGES) - expected
+
+
+def test_weight_change_reruns_pt_nutrition_and_head_coach(history):
+    decision = plan_replan('jane_doe', dict(INTAKE, weight='58'), full_pipeline(), history)
+    assert decision.rerun == ('pt', 'nutrition', 'head_coach')
+    assert set(decision.reused) == {'reception', 'body_scanner'}
+    assert decision.changed_fields == ('weight',)
+
+
+def test_reception_change_reruns_every_stage_behind_the_profile(history):
+    decision = plan_replan('jane_doe', dict(INTAKE, additional_notes='Training for a 10k'), full_pipeline(), history)
+    assert decision.rerun == ('reception', 'body_scanner', 'pt', 'nutrition', 'head_coach')
+    assert decision.reused == {}
+
+
+def test_stage_without_stored_output_reruns(tmp_path):
+    history = PlanHistory(tmp_path / 'plans.sqlite')
+    outputs = {stage: f"{stage} output" for stage in AGENT_STAGES}
+    outputs['nutrition'] = ""  # failed stages are not stored
+    history.save('jane_doe', INTAKE, outputs)
+    decision = plan_replan('jane_doe', INTAKE, full_pipeline(), history)
+    history.close()
+    assert decision.rerun == ('nutrition', 'head_coach')
+
+
+def test_unknown_client_reruns_everything(history):
+    decision = plan_replan('someone_else', INTAKE, full_pipeline(), history)
+    assert set(decision.rerun) == set(AGENT_STAGES)
+    assert decision.reused == {}
+    assert "running every stage" in decision.describe()
+
+
+def test_plan_client_id_prefers_the_client_id():
+    assert plan_client_id({'client_id': 'C-17', 'name': 'Jane Doe'}) == 'c_17'
+    assert plan_client_id({'name': 'Jane Doe'}) == 'jane_doe'
+    assert plan_client_id({}) == ""
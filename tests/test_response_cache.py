@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import pytest
+
+from shared.response_cache import ResponseCache, cache_key_for_agent, make_cache_key, model_string
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(tmp_path / 'responses.sqlite', max_entries=3, ttl_seconds=60)
+    yield cache
+    cache.close()
+
+
+def test_round_trip_counts_hits_and_misses(cache):
+    assert cache.get('key') is None
+    cache.put('key', 'pt_agent', "plan")
+    assert cache.get('key') == "plan"
+    assert (cache.stats['hits'], cache.stats['misses'], cache.stats['stores']) == (1, 1, 1)
+    assert cache.hit_rate() == 0.5
+
+
+def test_least_recently_used_entries_are_evicted(cache, monkeypatch):
+    clock = iter(range(100, 200))
+    monkeypatch.setattr('shared.response_cache.time.time', lambda: next(clock))
+    for key in ('a', 'b', 'c'):
+        cache.put(key, 'agent', key)
+    cache.get('a')
+    cache.put('d', 'agent', 'd')
+
+    assert cache.get('b') is None
+    assert [cache.get(key) for key in ('a', 'c', 'd')] == ['a', 'c', 'd']
+    assert cache.stats['evictions'] == 1
+
+
+def test_expired_entries_are_misses(cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('shared.response_cache.time.time', lambda: now[0])
+    cache.put('old', 'agent', "stale")
+    cache.put('new', 'agent', "fresh")
+    now[0] += 61
+
+    assert cache.get('old') is None
+    assert cache.stats['expired'] == 1
+    assert cache.purge_expired() == 1
+
+
+def test_entries_survive_reopening(tmp_path):
+    path = tmp_path / 'responses.sqlite'
+    first = ResponseCache(path)
+    first.put('key', 'agent', "kept")
+    first.close()
+    second = ResponseCache(path)
+    assert second.get('key') == "kept"
+    second.close()
+
+
+def test_cache_key_ignores_whitespace_only_differences():
+    assert make_cache_key('pt', 'model', 'abc', "Plan  for\nJane") == make_cache_key('pt', 'model', 'abc', "Plan for Jane")
+    assert make_cache_key('pt', 'model', 'abc', "Plan for Jane") != make_cache_key('pt', 'model', 'abc', "Plan for John")
+
+
+def test_cache_key_depends_on_agent_model_and_instruction():
+    agent = SimpleNamespace(name='pt_agent', model='gemini-2.0-flash', instruction="Write a plan")
+    key = cache_key_for_agent(agent, "prompt")
+    assert key != cache_key_for_agent(SimpleNamespace(name='pt_agent', model='other', instruction="Write a plan"), "prompt")
+    assert key != cache_key_for_agent(SimpleNamespace(name='pt_agent', model='gemini-2.0-flash', instruction="Changed"), "prompt")
+    assert key != cache_key_for_agent(SimpleNamespace(name='nutrition_agent', model='gemini-2.0-flash', instruction="Write a plan"), "prompt")
+
+
+def test_model_objects_are_keyed_by_class_and_name():
+    class FakeLlm:
+        model = 'gemini-2.0-flash'
+
+    assert model_string(SimpleNamespace(model='gemini-2.0-flash')) == 'gemini-2.0-flash'
+    assert model_string(SimpleNamespace(model=FakeLlm())) == 'FakeLlm:gemini-2.0-flash'
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from shared.response_cache import ResponseCache
+from shared.web_search import SearchLayer, normalize_query
+
+
+class Upstream:
+    """Counts calls and returns findings once release is set"""
+
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.fail = fail
+        self.release = None
+
+    async def __call__(self, query: str) -> str:
+        self.calls.append(query)
+        await self.release.wait()
+        if self.fail:
+            raise RuntimeError("search backend down")
+        return f"findings for {query}"
+
+
+def _run(coroutine_function):
+    return asyncio.run(coroutine_function())
+
+
+def test_normalize_query_ignores_order_case_punctuation_and_filler():
+    assert normalize_query("Gluten-free, high-protein foods?") == "foods free gluten high protein"
+    assert normalize_query("what are the best HIGH protein foods") == normalize_query("best foods, high protein")
+
+
+def test_concurrent_identical_searches_share_one_upstream_call():
+    upstream = Upstream()
+    layer = SearchLayer(upstream=upstream)
+
+    async def scenario():
+        upstream.release = asyncio.Event()
+        searches = [asyncio.create_task(layer.search(query))
+                    for query in ("high protein foods", "High-protein foods?", "foods high in protein")]
+        await asyncio.sleep(0)
+        upstream.release.set()
+        return await asyncio.gather(*searches)
+
+    results = _run(scenario)
+    assert len(upstream.calls) == 1
+    assert [source for _, source in results] == ['upstream', 'coalesced', 'coalesced']
+    assert len({findings for findings, _ in results}) == 1
+    assert (layer.stats['upstream_calls'], layer.stats['coalesced']) == (1, 2)
+
+
+def test_cancelling_the_first_caller_keeps_the_call_alive_for_the_others():
+    upstream = Upstream()
+    layer = SearchLayer(upstream=upstream)
+
+    async def scenario():
+        upstream.release = asyncio.Event()
+        first = asyncio.create_task(layer.search("squat progression"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(layer.search("squat progression"))
+        await asyncio.sleep(0)
+        first.cancel()
+        upstream.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    findings, source = _run(scenario)
+    assert (findings, source) == ("findings for squat progression", 'coalesced')
+    assert len(upstream.calls) == 1
+
+
+def test_failure_reaches_every_waiter_and_is_not_remembered():
+    upstream = Upstream(fail=True)
+    layer = SearchLayer(upstream=upstream)
+
+    async def scenario():
+        upstream.release = asyncio.Event()
+        searches = [asyncio.create_task(layer.search("deadlift form")) for _ in range(3)]
+        await asyncio.sleep(0)
+        upstream.release.set()
+        return await asyncio.gather(*searches, return_exceptions=True)
+
+    results = _run(scenario)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert layer.stats['errors'] == 1
+    assert layer._inflight == {}
+
+    upstream.fail = False
+
+    async def retry():
+        upstream.release = asyncio.Event()
+        upstream.release.set()
+        return await layer.search("deadlift form")
+
+    assert _run(retry) == ("findings for deadlift form", 'upstream')
+
+
+def test_findings_are_cached(tmp_path):
+    cache = ResponseCache(tmp_path / 'search.sqlite')
+    upstream = Upstream()
+    layer = SearchLayer(cache, upstream=upstream)
+
+    async def search_twice():
+        upstream.release = asyncio.Event()
+        upstream.release.set()
+        return [await layer.search("mobility drills"), await layer.search("Mobility drills!")]
+
+    results = _run(search_twice)
+    cache.close()
+    assert [source for _, source in results] == ['upstream', 'cache']
+    assert len(upstream.calls) == 1
+
+
+def test_empty_query_is_rejected():
+    layer = SearchLayer(upstream=Upstream())
+    with pytest.raises(ValueError):
+        _run(lambda: layer.search("the, of and?"))
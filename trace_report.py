@@ -0,0 +1,185 @@
+"""
+FitTelligence - Trace Report
+
+Reads the OTLP/JSON lines trace file written when FITTELLIGENCE_TRACE_FILE is
+set and prints either a waterfall per pipeline run (every stage, agent turn,
+model call and tool call on the run's time axis, with token counts, cache hits
+and errors) or a hot-span table that ranks span names across all runs by the
+time spent in them.
+
+Self time is a span's duration minus the time covered by its children, so an
+agent turn that mostly waits on its model calls ranks below those calls.
+
+Usage:
+    python trace_report.py traces.jsonl                  # waterfall of the latest run
+    python trace_report.py traces.jsonl --last 3         # waterfalls of the last 3 runs
+    python trace_report.py traces.jsonl --trace 4bf92f   # one run by trace id prefix
+    python trace_report.py traces.jsonl --hot --top 15   # hottest spans across runs
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from shared.tracing import read_spans
+
+
+BAR_WIDTH = 40
+NAME_WIDTH = 44
+
+# Attributes shown after a span in the waterfall, with their labels
+WATERFALL_ATTRIBUTES = (
+    ('gen_ai.usage.input_tokens', 'in'),
+    ('gen_ai.usage.output_tokens', 'out'),
+    ('first_chunk_ms', 'first chunk ms'),
+    ('stage.attempts', 'attempts'),
+    ('tool.source', 'source'),
+    ('memory.results', 'memories'),
+)
+
+
+def group_traces(spans: list) -> list:
+    """Return [(trace_id, spans)] ordered by the start of each trace"""
+    traces = {}
+    for span in spans:
+        traces.setdefault(span.trace_id, []).append(span)
+    return sorted(traces.items(), key=lambda item: min(span.start_ns for span in item[1]))
+
+
+def children_by_parent(spans: list) -> tuple:
+    """Return (roots, {span_id: children}); spans whose parent is missing count as roots"""
+    ids = {span.span_id for span in spans}
+    roots, children = [], {}
+    for span in sorted(spans, key=lambda s: s.start_ns):
+        if span.parent_id in ids:
+            children.setdefault(span.parent_id, []).append(span)
+        else:
+            roots.append(span)
+    return roots, children
+
+
+def self_time_ms(span, children: list) -> float:
+    """Duration not covered by any child (concurrent children are merged, not summed)"""
+    covered, cursor = 0, span.start_ns
+    for child in sorted(children, key=lambda c: c.start_ns):
+        start, end = max(child.start_ns, cursor), min(child.end_ns, span.end_ns)
+        if end > start:
+            covered += end - start
+            cursor = end
+    return max(0.0, span.duration_ms - covered / 1e6)
+
+
+def _notes(span) -> str:
+    notes = [f"{label} {span.attributes[key]}" for key, label in WATERFALL_ATTRIBUTES if key in span.attributes]
+    if span.attributes.get('cache.hit'):
+        notes.append("cache hit")
+    if span.attributes.get('stage.status') == 'fast_path':
+        notes.append("fast path")
+    if span.status == 'error':
+        notes.append(f"❌ {span.status_message}" if span.status_message else "❌ error")
+    return ", ".join(notes)
+
+
+def format_waterfall(trace_id: str, spans: list) -> str:
+    """Indented span tree with a bar per span on the trace's time axis"""
+    roots, children = children_by_parent(spans)
+    trace_start = min(span.start_ns for span in spans)
+    trace_end = max(span.end_ns for span in spans)
+    total_ms = (trace_end - trace_start) / 1e6
+    scale = BAR_WIDTH / total_ms if total_ms > 0 else 0.0
+
+    lines = [f"🧵 Trace {trace_id} ({len(spans)} spans, {total_ms:.1f} ms)",
+             f"  {'Span':<{NAME_WIDTH}} {'Start':>9} {'Duration':>10}"]
+
+    def add(span, depth):
+        start_ms = (span.start_ns - trace_start) / 1e6
+        offset = int(start_ms * scale)
+        bar = " " * offset + "█" * max(1, int((start_ms + span.duration_ms) * scale) - offset)
+        name = ("  " * depth + span.name)[:NAME_WIDTH]
+        notes = _notes(span)
+        lines.append(f"  {name:<{NAME_WIDTH}} {start_ms:7.1f}ms {span.duration_ms:8.1f}ms  {bar:<{BAR_WIDTH}}"
+                     + (f"  {notes}" if notes else ""))
+        for child in children.get(span.span_id, []):
+            add(child, depth + 1)
+
+    for root in roots:
+        add(root, 0)
+    return "\n".join(lines)
+
+
+def hot_spans(spans: list) -> list:
+    """Aggregate spans by name: count, total, mean, p95 and self time in ms, hottest self time first"""
+    _, children = children_by_parent(spans)
+    by_name = {}
+    for span in spans:
+        entry = by_name.setdefault(span.name, {'name': span.name, 'kind': span.kind, 'durations': [],
+                                               'self_ms': 0.0, 'errors': 0})
+        entry['durations'].append(span.duration_ms)
+        entry['self_ms'] += self_time_ms(span, children.get(span.span_id, []))
+        entry['errors'] += span.status == 'error'
+
+    rows = []
+    for entry in by_name.values():
+        durations = sorted(entry.pop('durations'))
+        entry.update({
+            'count': len(durations),
+            'total_ms': sum(durations),
+            'mean_ms': sum(durations) / len(durations),
+            'p95_ms': durations[min(len(durations) - 1, int(0.95 * len(durations)))],
+        })
+        rows.append(entry)
+    return sorted(rows, key=lambda row: row['self_ms'], reverse=True)
+
+
+def format_hot_spans(rows: list, top: int) -> str:
+    total_self = sum(row['self_ms'] for row in rows) or 1.0
+    lines = [f"🔥 Hot spans by self time ({len(rows)} span names)",
+             f"  {'Span':<32} {'Kind':<9} {'Count':>6} {'Total':>11} {'Mean':>10} {'p95':>10} {'Self':>11} {'Self %':>7} {'Err':>4}"]
+    for row in rows[:top]:
+        lines.append(f"  {row['name'][:32]:<32} {row['kind']:<9} {row['count']:>6} {row['total_ms']:9.1f}ms "
+                     f"{row['mean_ms']:8.1f}ms {row['p95_ms']:8.1f}ms {row['self_ms']:9.1f}ms "
+                     f"{row['self_ms'] / total_self:6.1%} {row['errors']:>4}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print waterfalls and hot spans from a FitTelligence trace file")
+    parser.add_argument('trace_file', nargs='?', type=Path, default=os.getenv('FITTELLIGENCE_TRACE_FILE'),
+                        help="OTLP/JSON lines trace file (default: $FITTELLIGENCE_TRACE_FILE)")
+    parser.add_argument('--trace', help="Show the trace whose id starts with this prefix")
+    parser.add_argument('--last', type=int, default=1, help="Show waterfalls of the last N traces (default: 1)")
+    parser.add_argument('--hot', action='store_true', help="Rank span names across all traces by self time")
+    parser.add_argument('--top', type=int, default=20, help="Rows in the hot-span table (default: 20)")
+    args = parser.parse_args()
+
+    if not args.trace_file or not Path(args.trace_file).exists():
+        print(f"❌ Trace file not found: {args.trace_file or '(none given)'}")
+        print("   Set FITTELLIGENCE_TRACE_FILE=traces.jsonl while running the pipeline to record one.")
+        sys.exit(1)
+
+    spans = read_spans(args.trace_file)
+    if not spans:
+        print(f"⚠️  No spans in {args.trace_file}")
+        return
+
+    traces = group_traces(spans)
+    if args.hot:
+        print(f"📊 {len(traces)} traces, {len(spans)} spans\n")
+        print(format_hot_spans(hot_spans(spans), args.top))
+        return
+
+    if args.trace:
+        selected = [(trace_id, trace) for trace_id, trace in traces if trace_id.startswith(args.trace)]
+        if not selected:
+            print(f"❌ No trace id starts with {args.trace}")
+            sys.exit(1)
+    else:
+        selected = traces[-max(1, args.last):]
+    print("\n\n".join(format_waterfall(trace_id, trace) for trace_id, trace in selected))
+
+
+if __name__ == "__main__":
+    main()